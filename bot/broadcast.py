@@ -0,0 +1,113 @@
+"""Scheduled broadcasts driven by the ``broadcast_schedules`` table.
+
+Each active schedule runs as a ``bot.scheduler`` job, so a broadcast missed during
+a restart is still sent within ``BROADCAST_GRACE_MINUTES`` and replicas do not send
+it twice. The table is polled for changes and the jobs replaced without a restart.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from telegram.error import TelegramError
+
+from bot.scheduler import CronJob, job_scheduler
+from config.constants import BROADCAST_GRACE_MINUTES, BROADCAST_RELOAD_SECONDS, CADET_CHAT_ID, DAILY_MSGS
+from db import crud
+from utils.cron import CronSchedule
+from utils.time_utils import DAILY_MSG_TIME
+
+
+class _Broadcast:
+    __slots__ = ("id", "name", "cron", "chat_id", "topic_id", "template", "parse_mode")
+
+    def __init__(self, row, cron: CronSchedule):
+        self.id = row.id
+        self.name = row.name
+        self.cron = cron
+        self.chat_id = row.chat_id
+        self.topic_id = row.topic_id
+        self.template = row.template
+        self.parse_mode = row.parse_mode
+
+
+def default_schedules() -> list[dict]:
+    """The weekday messages previously hard-coded in DAILY_MSGS, used to seed an empty table."""
+    return [
+        {
+            "name": f"{day} message",
+            "cron": f"{DAILY_MSG_TIME.minute} {DAILY_MSG_TIME.hour} * * {day[:3].lower()}",
+            "chat_id": CADET_CHAT_ID,
+            "topic_id": None,
+            "template": text,
+            "parse_mode": "HTML",
+        }
+        for day, text in DAILY_MSGS.items()
+    ]
+
+
+def render_template(template: str, when: datetime) -> str:
+    # Plain replacement so literal braces in messages need no escaping
+    return (
+        template
+        .replace("{date}", when.strftime("%d%m%y"))
+        .replace("{day}", when.strftime("%A"))
+        .replace("{time}", when.strftime("%H%M"))
+    )
+
+
+def _load_schedules(seed: bool = False) -> tuple[tuple, list[_Broadcast]]:
+    if seed and crud.seed_broadcast_schedules(default_schedules()):
+        print("[BROADCAST] Seeded the default schedules", flush=True)
+    version = crud.get_broadcast_schedules_version()
+    broadcasts = []
+    for row in crud.get_active_broadcast_schedules():
+        try:
+            broadcasts.append(_Broadcast(row, CronSchedule(row.cron)))
+        except ValueError as e:
+            print(f"[BROADCAST] Skipping schedule {row.id} ({row.name}): {e}")
+    return version, broadcasts
+
+
+def _broadcast_job(broadcast: _Broadcast) -> CronJob:
+    async def send(context, due: datetime):
+        try:
+            await context.bot.send_message(
+                chat_id=broadcast.chat_id,
+                message_thread_id=broadcast.topic_id,
+                text=render_template(broadcast.template, due),
+                parse_mode=broadcast.parse_mode,
+            )
+            print(f"---- {broadcast.name} sent ----")
+        except TelegramError as e:
+            print(f"[BROADCAST] Failed to send {broadcast.name} ({broadcast.id}): {e}")
+
+    return CronJob(f"broadcast:{broadcast.id}", broadcast.cron, send, timedelta(minutes=BROADCAST_GRACE_MINUTES))
+
+
+class BroadcastScheduler:
+    def __init__(self):
+        self._version = None
+
+    def install(self, job_queue):
+        """Loads the schedules once the job queue runs and keeps watching the table."""
+        job_queue.run_repeating(
+            self._check_for_changes,
+            interval=BROADCAST_RELOAD_SECONDS,
+            first=0,
+            name="broadcast_reload",
+        )
+
+    async def reload(self):
+        # Seeding is tried on this process's first load only; crud makes it once per database
+        version, broadcasts = await asyncio.to_thread(_load_schedules, self._version is None)
+        self._version = version
+        await job_scheduler.replace("broadcast:", [_broadcast_job(broadcast) for broadcast in broadcasts])
+        print(f"[BROADCAST] {len(broadcasts)} schedule(s) loaded", flush=True)
+
+    async def _check_for_changes(self, context):
+        version = await asyncio.to_thread(crud.get_broadcast_schedules_version)
+        if version != self._version:
+            await self.reload()
+
+
+broadcast_scheduler = BroadcastScheduler()
@@ -1,27 +1,156 @@
 from config.constants import (
-    IC_GROUP_CHAT_ID,
-    CET_TOPIC_ID,
-    CADET_CET_TOPIC_ID,
-    CADET_CHAT_ID,
+    CET_ALBUM_WINDOW_SECONDS,
     CET_KEYWORDS,
+    CET_ROUTES,
 )
+import asyncio
 import logging
+import re
 from telegram import Update
-from telegram.ext import ContextTypes
+from telegram.ext import ContextTypes, filters
+
+from services.tenants import tenant_registry
 
 logger = logging.getLogger(__name__)
 
 
+def _compile_keywords(keywords) -> re.Pattern:
+    """One case-insensitive alternation; longest first so overlapping keywords match whole."""
+    alternation = "|".join(re.escape(word) for word in sorted(set(keywords), key=len, reverse=True))
+    # Lookarounds rather than \b so keywords starting/ending in punctuation still work.
+    return re.compile(rf"(?<!\w)(?:{alternation})(?!\w)", re.IGNORECASE)
+
+
+CET_PATTERN = _compile_keywords(CET_KEYWORDS)
+
+# Extra routes for the default tenant: (chat_id, topic_id, keywords or None for any)
+# with keywords lowercased for matching
+_ROUTES = [
+    (
+        route["chat_id"],
+        route.get("topic_id"),
+        frozenset(word.lower() for word in route["keywords"]) if route.get("keywords") else None,
+    )
+    for route in CET_ROUTES
+]
+
+
+class _MediaGroupFilter(filters.MessageFilter):
+    """Album parts, which usually carry no text or caption of their own."""
+
+    def filter(self, message) -> bool:
+        return message.media_group_id is not None
+
+
+MEDIA_GROUP = _MediaGroupFilter(name="MEDIA_GROUP")
+
+
+class _TenantIcGroupFilter(filters.MessageFilter):
+    """Messages in any tenant's IC group; one dictionary lookup per message."""
+
+    def filter(self, message) -> bool:
+        return tenant_registry.is_ic_group(message.chat_id)
+
+
+TENANT_IC_GROUP = _TenantIcGroupFilter(name="TENANT_IC_GROUP")
+
+
+class _PendingAlbum:
+    __slots__ = ("messages", "deadline")
+
+    def __init__(self):
+        self.messages = []
+        self.deadline = 0.0
+
+
+# media_group_id -> album parts collected so far
+_pending_albums: dict[str, _PendingAlbum] = {}
+
+
 def _message_text(msg) -> str:
     """Returns text content from either message text or caption."""
     return (msg.text or msg.caption or "").strip()
 
 
-def _should_forward_cet(text: str) -> bool:
-    """Determines whether a message is CET content that should be mirrored."""
-    lowered = text.lower()
+def _matched_keywords(text: str) -> set[str]:
+    """Lowercased CET keywords present in the message, in a single scan."""
+    return {match.lower() for match in CET_PATTERN.findall(text)}
+
+
+def _destinations_for(tenant, matched: set[str]) -> list[tuple[int, int | None]]:
+    destinations = [(tenant.cadet_chat_id, tenant.cadet_cet_topic_id)] if tenant.cadet_chat_id else []
+    if tenant.is_default:
+        destinations += [
+            (chat_id, topic_id)
+            for chat_id, topic_id, keywords in _ROUTES
+            if keywords is None or keywords & matched
+        ]
+    return destinations
+
+
+async def _copy_to_destination(bot, from_chat_id: int, message_ids: list[int], chat_id: int, topic_id: int | None) -> bool:
+    async def copy(thread_id):
+        if len(message_ids) == 1:
+            await bot.copy_message(
+                chat_id=chat_id,
+                message_thread_id=thread_id,
+                from_chat_id=from_chat_id,
+                message_id=message_ids[0],
+            )
+        else:
+            # One call keeps album parts together and in order
+            await bot.copy_messages(
+                chat_id=chat_id,
+                message_thread_id=thread_id,
+                from_chat_id=from_chat_id,
+                message_ids=message_ids,
+            )
+
+    try:
+        await copy(topic_id)
+        return True
+    except Exception as exc:
+        if topic_id is None:
+            logger.exception("Failed to copy CET into chat %s: %s", chat_id, exc)
+            return False
+        logger.exception("Failed to copy CET into topic %s of chat %s: %s", topic_id, chat_id, exc)
+
+    # Fallback to the chat without topic so CET is still delivered.
+    try:
+        await copy(None)
+        return True
+    except Exception as exc:
+        logger.exception("Failed to copy CET into chat %s: %s", chat_id, exc)
+        return False
+
+
+async def _forward_cet(bot, from_chat_id: int, message_ids: list[int], text: str):
+    matched = _matched_keywords(text)
+    if not matched:
+        return
+
+    destinations = _destinations_for(tenant_registry.for_chat(from_chat_id), matched)
+    results = await asyncio.gather(
+        *(_copy_to_destination(bot, from_chat_id, message_ids, chat_id, topic_id) for chat_id, topic_id in destinations)
+    )
+
+    cet_title = text.split("\n")[0]
+    print(f"--- {cet_title} sent to {sum(results)}/{len(destinations)} destination(s) ---")
+
+
+async def _flush_album_later(bot, media_group_id: str):
+    """Waits until no new part has arrived for the window, then forwards the album once."""
+    loop = asyncio.get_running_loop()
+    album = _pending_albums[media_group_id]
+    while (delay := album.deadline - loop.time()) > 0:
+        await asyncio.sleep(delay)
+    del _pending_albums[media_group_id]
+
+    messages = sorted(album.messages, key=lambda m: m.message_id)
+    # The caption normally sits on one part only; any part may carry the keyword
+    text = "\n".join(t for t in (_message_text(m) for m in messages) if t)
+    await _forward_cet(bot, messages[0].chat_id, [m.message_id for m in messages], text)
 
-    return any(word.lower() in lowered for word in CET_KEYWORDS)
 
 async def cet_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = update.message
@@ -29,35 +158,28 @@ async def cet_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not msg:
         return
 
-    text = _message_text(msg)
-    if not text:
+    tenant = tenant_registry.for_chat(msg.chat_id)
+    if tenant is None or msg.chat_id != tenant.ic_group_chat_id:
         return
 
-    if msg.chat_id != IC_GROUP_CHAT_ID:
+    if msg.message_thread_id != tenant.cet_topic_id:
         return
 
-    if msg.message_thread_id != CET_TOPIC_ID:
-        return
+    bot = context.application.bot
 
-    if not _should_forward_cet(text):
+    if msg.media_group_id:
+        album = _pending_albums.get(msg.media_group_id)
+        first_part = album is None
+        if first_part:
+            album = _pending_albums[msg.media_group_id] = _PendingAlbum()
+        album.messages.append(msg)
+        album.deadline = asyncio.get_running_loop().time() + CET_ALBUM_WINDOW_SECONDS
+        if first_part:
+            await _flush_album_later(bot, msg.media_group_id)
         return
 
-    try:
-        await context.application.bot.copy_message(
-            chat_id=CADET_CHAT_ID,
-            message_thread_id=CADET_CET_TOPIC_ID,
-            from_chat_id=msg.chat_id,
-            message_id=msg.message_id,
-        )
-
-    except Exception as exc:
-        logger.exception("Failed to copy CET into cadet CET topic: %s", exc)
-        # Fallback to cadet chat without topic so CET is still delivered.
-        await context.application.bot.copy_message(
-            chat_id=CADET_CHAT_ID,
-            from_chat_id=msg.chat_id,
-            message_id=msg.message_id,
-        )
+    text = _message_text(msg)
+    if not text:
+        return
 
-    cet_title = text.split("\n")[0]
-    print(f"--- {cet_title} sent ---")
+    await _forward_cet(bot, msg.chat_id, [msg.message_id], text)
@@ -0,0 +1,61 @@
+import asyncio
+import html
+
+from bot.helpers import reply
+from config.constants import (
+    MEDICAL_TRENDS_DEFAULT_WEEKS,
+    MEDICAL_TRENDS_MAX_WEEKS,
+    MEDICAL_TRENDS_TOP_N,
+    REPEAT_REPORTER_MIN_REPORTS,
+)
+from db.analytics import TREND_SECTIONS, TrendReport, medical_trends
+from services.auth_service import is_tenant_admin
+from services.tenants import tenant_for_update
+from utils.datetime_utils import now_sg
+
+
+def format_trend_report(report: TrendReport) -> str:
+    table = ["WEEK   " + "".join(f"{section:>5}" for section in TREND_SECTIONS)]
+    for week in report.weeks:
+        table.append(week.week_start.strftime("%d/%m  ") + "".join(f"{week.counts[section]:>5}" for section in TREND_SECTIONS))
+
+    lines = [
+        f"📈 <b>MEDICAL TRENDS</b> (last {len(report.weeks)} weeks, by week starting)",
+        "<pre>" + "\n".join(table) + "</pre>",
+        "MC counts new MC statuses by start date.",
+        "",
+        "<b>TOP DIAGNOSES</b> (RSO/RSI)",
+    ]
+    if report.top_diagnoses:
+        lines += [f"{n}. {html.escape(name)}: {count}" for n, (name, count) in enumerate(report.top_diagnoses, start=1)]
+    else:
+        lines.append("None recorded.")
+
+    lines += ["", f"<b>REPEAT REPORTERS</b> ({REPEAT_REPORTER_MIN_REPORTS}+ RSO/RSI)"]
+    if report.repeat_reporters:
+        lines += [f"- {html.escape(name)}: {count}" for name, count in report.repeat_reporters]
+    else:
+        lines.append("None.")
+    return "\n".join(lines)
+
+
+async def medical_stats(update, context):
+    if not is_tenant_admin(update):
+        await reply(update, "❌ You are not authorized to use /medstats.")
+        return
+
+    args = context.args or []
+    if args and not (args[0].isdigit() and 1 <= int(args[0]) <= MEDICAL_TRENDS_MAX_WEEKS):
+        await reply(update, f"Usage: /medstats [weeks, 1-{MEDICAL_TRENDS_MAX_WEEKS}]")
+        return
+    weeks = int(args[0]) if args else MEDICAL_TRENDS_DEFAULT_WEEKS
+
+    report = await asyncio.to_thread(
+        medical_trends.report,
+        weeks,
+        now_sg().date(),
+        MEDICAL_TRENDS_TOP_N,
+        REPEAT_REPORTER_MIN_REPORTS,
+        tenant_for_update(update).id,
+    )
+    await reply(update, format_trend_report(report), parse_mode="HTML")
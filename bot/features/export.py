@@ -0,0 +1,80 @@
+import asyncio
+from datetime import timedelta
+
+from telegram import InputFile
+
+from bot.helpers import reply
+from config.constants import EXPORT_DEFAULT_DAYS, TELEGRAM_DOCUMENT_LIMIT_BYTES
+from db.exports import EXPORTS, write_export
+from services.auth_service import is_tenant_admin
+from services.tenants import tenant_for_update
+from utils.datetime_utils import now_sg
+from utils.input_normalizers import parse_date_flexible
+from utils.rate_limiter import user_rate_limiter
+
+
+def _usage() -> str:
+    kinds = "\n".join(f"- {name}: {kind.label}" for name, kind in EXPORTS.items())
+    return (
+        "Usage: /export <type> [from DDMMYY] [to DDMMYY] [gz]\n\n"
+        f"{kinds}\n\n"
+        f"Dated exports cover the last {EXPORT_DEFAULT_DAYS} days unless a range is given. "
+        "Add gz for a compressed file."
+    )
+
+
+async def send_export(update, context, name: str, start=None, end=None, compress: bool = False):
+    """Builds the tenant's export off the event loop and uploads it to the current chat."""
+    tenant = tenant_for_update(update)
+    result = await asyncio.to_thread(write_export, name, start, end, compress, tenant.id)
+    try:
+        if result.size > TELEGRAM_DOCUMENT_LIMIT_BYTES:
+            await reply(update, "❌ Export is too large to upload. Narrow the date range or add gz.")
+            return
+        caption = f"{tenant.name} {EXPORTS[name].label.lower()}: {result.rows} row(s)"
+        if EXPORTS[name].dated:
+            caption += f", {start.strftime('%d%m%y')} to {end.strftime('%d%m%y')}"
+        if result.excluded:
+            caption += f"\n{result.excluded} row(s) of deleted users are not tied to a wing and are left out"
+        # Handed over unread so the upload streams from the spooled file; it has no
+        # name to guess from, so the filename is passed explicitly
+        result.file.seek(0)
+        await context.bot.send_document(
+            chat_id=update.effective_chat.id,
+            message_thread_id=getattr(update.effective_message, "message_thread_id", None),
+            document=InputFile(result.file, filename=result.filename, read_file_handle=False),
+            caption=caption,
+        )
+    finally:
+        result.file.close()
+
+
+async def export(update, context):
+    user_id = update.effective_user.id if update.effective_user else None
+    if not is_tenant_admin(update):
+        await reply(update, "❌ You are not authorized to use /export.")
+        return
+
+    args = [arg.lower() for arg in (context.args or [])]
+    compress = "gz" in args
+    args = [arg for arg in args if arg != "gz"]
+    if not args or args[0] not in EXPORTS or len(args) > 3:
+        await reply(update, _usage())
+        return
+
+    if not user_rate_limiter.allow(user_id, "export_cmd", max_requests=3, window_seconds=60):
+        await reply(update, "⏳ Too many exports. Please wait 1 minute and try again.")
+        return
+
+    name, dates = args[0], args[1:]
+    try:
+        end = parse_date_flexible(dates[1]) if len(dates) > 1 else now_sg().date()
+        start = parse_date_flexible(dates[0]) if dates else end - timedelta(days=EXPORT_DEFAULT_DAYS - 1)
+    except ValueError as e:
+        await reply(update, f"❌ {e}")
+        return
+    if start > end:
+        await reply(update, "❌ The start date must not be after the end date.")
+        return
+
+    await send_export(update, context, name, start, end, compress)
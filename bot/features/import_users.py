@@ -5,23 +5,25 @@ from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 from bot.helpers import reply
 from bot.shared.state import reset_session
-from config.constants import MAX_IMPORT_CSV_SIZE_BYTES
+from config.constants import ADMIN_IDS, MAX_IMPORT_CSV_SIZE_BYTES
 from db.crud import (
     clear_all_data,
     clear_database_approvals,
     clear_user_data,
-    list_users,
     register_clear_database_approval,
 )
 from db.import_users_csv import import_users
-from services.auth_service import is_admin_user
+from services.audit import audit
+from services.auth_service import is_tenant_admin
+from services.tenants import tenant_for_update, tenant_registry
 from utils.rate_limiter import user_rate_limiter
 
 CLEAR_CONFIRM_WINDOW_MINUTES = 10
 
 
-def _is_admin(user_id: int | None) -> bool:
-    return is_admin_user(user_id)
+def _may_clear_everything(user_id: int | None) -> bool:
+    # The full wipe spans every wing, so with several wings only owners may start it
+    return user_id in ADMIN_IDS or len(tenant_registry.all()) == 1
 
 
 def _clear_cancel_keyboard() -> InlineKeyboardMarkup:
@@ -32,7 +34,7 @@ def _clear_cancel_keyboard() -> InlineKeyboardMarkup:
 
 async def import_user(update, context):
     user_id = update.effective_user.id if update.effective_user else None
-    if not _is_admin(user_id):
+    if not is_tenant_admin(update):
         await reply(update, "❌ You are not authorized to use /import_user.")
         return
 
@@ -43,7 +45,7 @@ async def import_user(update, context):
     reset_session(context)
     keyboard = [
         [InlineKeyboardButton("📥 Import users (CSV)", callback_data="import_user|import")],
-        [InlineKeyboardButton("👥 Display current users", callback_data="import_user|list")],
+        [InlineKeyboardButton("👥 Export current users (CSV)", callback_data="import_user|list")],
         [InlineKeyboardButton("🧹 Clear database", callback_data="import_user|clear")],
     ]
     await reply(update, "Choose an action:", reply_markup=InlineKeyboardMarkup(keyboard))
@@ -56,7 +58,7 @@ async def import_user_callback(update, context):
     await query.answer()
 
     user_id = update.effective_user.id if update.effective_user else None
-    if not _is_admin(user_id):
+    if not is_tenant_admin(update):
         await reply(update, "❌ You are not authorized to manage imports.")
         return
 
@@ -67,11 +69,16 @@ async def import_user_callback(update, context):
         context.user_data["import_clear"] = True
         await reply(
             update,
-            "📥 Send the CSV file to import users. Existing users and medical records will be cleared before import.",
+            f"📥 Send the CSV file to import users into {tenant_for_update(update).name}. "
+            "Its existing users and medical records will be cleared before import. "
+            "An optional wing column puts a user in another tenant.",
         )
         return
 
     if action == "clear":
+        if not _may_clear_everything(user_id):
+            await reply(update, "❌ Only bot owners can clear every wing's data.")
+            return
         approval_count = register_clear_database_approval(user_id, window_minutes=CLEAR_CONFIRM_WINDOW_MINUTES)
         if approval_count < 2:
             await reply(
@@ -92,22 +99,16 @@ async def import_user_callback(update, context):
         return
 
     if action == "list":
-        users = list_users()
-        if not users:
-            await reply(update, "No users found.")
-            return
-        lines = ["Current users:"]
-        for user in users[:200]:
-            admin_flag = " (admin)" if user.is_admin else ""
-            lines.append(f"- {user.rank} {user.full_name} [{user.role}]{admin_flag}")
-        if len(users) >= 200:
-            lines.append("\nShowing first 200 users.")
-        await reply(update, "\n".join(lines))
+        from bot.features.export import send_export
+
+        await send_export(update, context, "roster")
 
 
 async def _clear_database_now(update):
     cleared = clear_all_data()
+    audit(update, "data.clear_all", **cleared)
     clear_database_approvals()
+    tenant_registry.invalidate()
     await reply(
         update,
         "✅ Database fully cleared after 2-admin confirmation.\n\n"
@@ -125,7 +126,7 @@ async def import_user_document(update, context):
         return
 
     user_id = update.effective_user.id if update.effective_user else None
-    if not _is_admin(user_id):
+    if not is_tenant_admin(update):
         await reply(update, "❌ You are not authorized to import users.")
         return
 
@@ -154,8 +155,11 @@ async def _handle_import_csv(update, context, clear_first: bool):
         await reply(update, "❌ Only .csv files are supported.")
         return
 
+    tenant = tenant_for_update(update)
     if clear_first:
-        cleared = clear_user_data()
+        cleared = clear_user_data(tenant.id)
+        audit(update, "users.clear", **cleared)
+        tenant_registry.invalidate()
         await reply(
             update,
             "🧹 Cleared existing data: "
@@ -171,7 +175,10 @@ async def _handle_import_csv(update, context, clear_first: bool):
     try:
         file = await context.bot.get_file(document.file_id)
         await file.download_to_drive(tmp_path)
-        result = import_users(tmp_path)
+        result = import_users(tmp_path, tenant_id=tenant.id)
+        audit(update, "users.import", subject=document.file_name, **result)
+        # Users may have moved between tenants
+        tenant_registry.invalidate()
     except ValueError as exc:
         await reply(update, f"❌ Import failed: {exc}")
         return
@@ -1,28 +1,32 @@
+import asyncio
+from collections import defaultdict
+
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
-from bot.helpers import reply
+from bot.headcount_board import headcount_board
+from bot.helpers import edit_reply_markup_if_changed, pack_message_blocks, reply
+from bot.shared.callback_data import pack_callbacks, unpack_callback
 from bot.shared.state import reset_session
-from config.constants import IC_GROUP_CHAT_ID, LOCATIONS, MOVEMENT_TOPIC_ID
 from core.report_manager import ReportManager
-from db.crud import get_all_cadet_names
-from services.auth_service import get_all_admin_user_ids
+from db.crud import get_all_cadet_names, get_current_locations, get_movement_history, record_movement
+from services.audit import audit
+from services.auth_service import get_all_admin_user_ids, is_tenant_admin
+from services.idempotency import callback_action, once_button, once_callback
+from services.tenants import tenant_for_update
 from utils.time_utils import is_valid_24h_time, now_hhmm
 
 
 async def start_movement(update, context):
     reset_session(context, mode="MOVEMENT")
-    names = get_all_cadet_names()
+    names = get_all_cadet_names(tenant_for_update(update).id)
     context.user_data["selected"] = set()
     context.user_data["all_names"] = names
 
-    keyboard = [[InlineKeyboardButton(f"⬜ {name}", callback_data=f"mov:name|{name}")] for name in names]
-    keyboard.append([InlineKeyboardButton("✅ Done Selecting", callback_data="mov:done")])
-
     await reply(
         update,
         "🚶 *Movement reporting started*\n"
         "Step 1/4: Select personnel.",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=_movement_keyboard(context),
         parse_mode="Markdown",
     )
 
@@ -31,16 +35,20 @@ def _movement_keyboard(context):
     names = context.user_data.get("all_names", [])
     selected = context.user_data.get("selected", set())
     keyboard = [
-        [InlineKeyboardButton(f"{'✅' if name in selected else '⬜'} {name}", callback_data=f"mov:name|{name}")]
-        for name in names
+        [InlineKeyboardButton(f"{'✅' if name in selected else '⬜'} {name}", callback_data=data)]
+        for name, data in zip(names, pack_callbacks("mov:name", names))
     ]
     keyboard.append([InlineKeyboardButton("✅ Done Selecting", callback_data="mov:done")])
     return InlineKeyboardMarkup(keyboard)
 
 
-def _location_keyboard(prefix: str):
+def _location_keyboard(update, prefix: str):
+    locations = tenant_for_update(update).locations
     return InlineKeyboardMarkup(
-        [[InlineKeyboardButton(location, callback_data=f"{prefix}|{location}")] for location in LOCATIONS]
+        [
+            [InlineKeyboardButton(location, callback_data=data)]
+            for location, data in zip(locations, pack_callbacks(prefix, locations))
+        ]
     )
 
 
@@ -50,13 +58,17 @@ async def handle_movement_callbacks(update, context):
     data = query.data
 
     if data.startswith("mov:name|"):
-        _, name = data.split("|", 1)
+        _, name = unpack_callback(data)
+        if name is None:
+            await reply(update, "Session expired. Please start again.")
+            reset_session(context)
+            return
         selected = context.user_data.setdefault("selected", set())
         if name in selected:
             selected.remove(name)
         else:
             selected.add(name)
-        await query.edit_message_reply_markup(reply_markup=_movement_keyboard(context))
+        await edit_reply_markup_if_changed(query, _movement_keyboard(context))
         return
 
     if data == "mov:done":
@@ -64,21 +76,29 @@ async def handle_movement_callbacks(update, context):
             await reply(update, "❌ Please select at least one cadet.")
             return
         context.user_data["awaiting_from"] = True
-        keyboard = _location_keyboard("mov:from")
+        keyboard = _location_keyboard(update, "mov:from")
         keyboard.inline_keyboard.append([InlineKeyboardButton("⬅️ Back", callback_data="mov:back|names")])
         await reply(update, "Step 2/4: 📍 Where are they moving from?", reply_markup=keyboard)
         return
 
     if data.startswith("mov:from|"):
-        _, from_loc = data.split("|", 1)
+        _, from_loc = unpack_callback(data)
+        if from_loc is None:
+            await reply(update, "Session expired. Please start again.")
+            reset_session(context)
+            return
         context.user_data.update({"from": from_loc, "awaiting_from": False, "awaiting_to": True})
-        keyboard = _location_keyboard("mov:to")
+        keyboard = _location_keyboard(update, "mov:to")
         keyboard.inline_keyboard.append([InlineKeyboardButton("⬅️ Back", callback_data="mov:back|from")])
         await reply(update, "Step 3/4: 📍 Where are they moving to?", reply_markup=keyboard)
         return
 
     if data.startswith("mov:to|"):
-        _, to_loc = data.split("|", 1)
+        _, to_loc = unpack_callback(data)
+        if to_loc is None:
+            await reply(update, "Session expired. Please start again.")
+            reset_session(context)
+            return
         if to_loc == context.user_data.get("from"):
             await reply(update, "❌ 'From' and 'To' locations cannot be the same.")
             return
@@ -98,14 +118,14 @@ async def handle_movement_callbacks(update, context):
 
     if data == "mov:back|from":
         context.user_data.update({"awaiting_to": False, "awaiting_from": True})
-        keyboard = _location_keyboard("mov:from")
+        keyboard = _location_keyboard(update, "mov:from")
         keyboard.inline_keyboard.append([InlineKeyboardButton("⬅️ Back", callback_data="mov:back|names")])
         await reply(update, "Step 2/4: 📍 Where are they moving from?", reply_markup=keyboard)
         return
 
     if data == "mov:back|to":
         context.user_data.update({"awaiting_time": False, "awaiting_to": True})
-        keyboard = _location_keyboard("mov:to")
+        keyboard = _location_keyboard(update, "mov:to")
         keyboard.inline_keyboard.append([InlineKeyboardButton("⬅️ Back", callback_data="mov:back|from")])
         await reply(update, "Step 3/4: 📍 Where are they moving to?", reply_markup=keyboard)
         return
@@ -124,18 +144,40 @@ async def handle_movement_callbacks(update, context):
         await reply(update, "❌ Movement reporting cancelled.")
         return
 
-    if data == "mov:confirm":
-        if context.user_data.get("movement_sent"):
-            await reply(update, "ℹ️ Movement report already sent.")
-            return
+    if callback_action(data) == "mov:confirm":
         msg = context.user_data.get("final_message")
         if not msg:
             await reply(update, "❌ No movement data found.")
             return
+        async with once_button(update) as first:
+            if not first:
+                await reply(update, "ℹ️ Movement report already sent.")
+                return
 
-        context.user_data["movement_sent"] = True
-        await context.bot.send_message(chat_id=IC_GROUP_CHAT_ID, message_thread_id=MOVEMENT_TOPIC_ID, text=msg)
-        for admin in get_all_admin_user_ids():
+            tenant = tenant_for_update(update)
+            # Send before saving: if the save fails, a retry repeats the message rather than the log rows
+            await context.bot.send_message(chat_id=tenant.ic_group_chat_id, message_thread_id=tenant.movement_topic_id, text=msg)
+            transitions = await asyncio.to_thread(
+                record_movement,
+                names=sorted(context.user_data["selected"]),
+                from_location=context.user_data["from"],
+                to_location=context.user_data["to"],
+                time_hhmm=context.user_data["time"],
+                created_by=update.effective_user.id,
+                tenant_id=tenant.id,
+            )
+            if transitions:
+                # Back-dated reports and moves to where cadets already are change no count
+                headcount_board(tenant).refresh_soon(context.job_queue)
+            audit(
+                update,
+                "movement.send",
+                names=sorted(context.user_data["selected"]),
+                from_location=context.user_data["from"],
+                to_location=context.user_data["to"],
+                time=context.user_data["time"],
+            )
+        for admin in get_all_admin_user_ids(tenant.id):
             await context.bot.send_message(chat_id=admin, text="Movement report sent:\n\n" + msg)
 
         await reply(update, "✅ Movement report sent.")
@@ -150,8 +192,9 @@ async def _prepare_movement_preview(update, context, hhmm: str):
         time_hhmm=hhmm,
     )
     context.user_data["final_message"] = msg
+    context.user_data["time"] = hhmm
     keyboard = [[
-        InlineKeyboardButton("✅ Confirm & Send", callback_data="mov:confirm"),
+        InlineKeyboardButton("✅ Confirm & Send", callback_data=once_callback("mov:confirm")),
         InlineKeyboardButton("❌ Cancel", callback_data="mov:cancel"),
     ]]
     await reply(update, "📋 Preview\n\n" + msg, reply_markup=InlineKeyboardMarkup(keyboard))
@@ -185,3 +228,50 @@ async def movement_text_input(update, context):
             return
         context.user_data["awaiting_time"] = False
         await _prepare_movement_preview(update, context, value)
+
+
+async def where_is_everyone(update, context):
+    """/whereis — latest known location of every cadet, or recent movements of one cadet."""
+    if not is_tenant_admin(update):
+        await reply(update, "❌ You are not authorized to view locations.")
+        return
+
+    if context.args:
+        name = " ".join(context.args)
+        try:
+            history = await asyncio.to_thread(get_movement_history, name, tenant_id=tenant_for_update(update).id)
+        except ValueError:
+            await reply(update, "❌ Use the full name with rank, e.g. /whereis CDT JOHN TAN")
+            return
+        if not history:
+            await reply(update, f"No movements recorded for {name}.")
+            return
+        lines = [f"📍 Recent movements of {name}"]
+        lines += [f"{log.moved_at.strftime('%d%m%y')} {log.time}H: {log.from_location} → {log.to_location}" for log in history]
+        await reply(update, "\n".join(lines))
+        return
+
+    tenant = tenant_for_update(update)
+    by_location = defaultdict(list)
+    for rank, full_name, location, moved_at in await asyncio.to_thread(get_current_locations, tenant.id):
+        since = f" ({moved_at.strftime('%H%M')}H)" if moved_at else ""
+        by_location[location or "UNKNOWN"].append(f"{rank} {full_name}{since}")
+
+    order = [location for location in tenant.locations if location in by_location]
+    order += sorted(location for location in by_location if location not in order)
+    blocks = [f"{location}: {len(by_location[location])}\n" + "\n".join(by_location[location]) for location in order]
+    if not blocks:
+        await reply(update, "No cadets found.")
+        return
+    for text in pack_message_blocks(["📍 Where is everyone", *blocks]):
+        await reply(update, text)
+
+
+async def post_headcount_board(update, context):
+    """/board — post and pin a fresh headcount board that then follows confirmed movements."""
+    if not is_tenant_admin(update):
+        await reply(update, "❌ You are not authorized to post the headcount board.")
+        return
+
+    await headcount_board(tenant_for_update(update)).post(context.bot)
+    await reply(update, "✅ Headcount board posted and pinned.")
@@ -1,5 +1,5 @@
 from bot.helpers import reply
-from services.auth_service import is_admin_user
+from services.auth_service import is_tenant_admin
 
 
 def _status_opt_out_set(context) -> set[int]:
@@ -12,7 +12,7 @@ def admin_wants_status_notifications(context, admin_id: int) -> bool:
 
 async def notifications(update, context):
     user_id = update.effective_user.id if update.effective_user else None
-    if not is_admin_user(user_id):
+    if not is_tenant_admin(update):
         await reply(update, "❌ Only admins can configure notification preferences.")
         return
 
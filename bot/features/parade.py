@@ -1,43 +1,173 @@
-from bot.helpers import parade_state_cancel_button, reply
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import TelegramError
+
+from bot.helpers import parade_state_cancel_button, parade_state_start_buttons, reply
 from bot.shared.state import reset_session
-from config.constants import IC_GROUP_CHAT_ID, PARADE_STATE_TOPIC_ID
-from services.auth_service import is_admin_user
+from config.constants import PARADE_STATE_PREWARM_MINUTES
+from db import crud
+from db.parade import PARADE_DRAFTS_KEY, PARADE_LAST_SENT_KEY, PARADE_OUT_OF_CAMP_KEY, encode_sent_snapshot
+from services.audit import audit
+from services.auth_service import get_all_admin_user_ids, is_tenant_admin
+from services.idempotency import callback_action, once, once_button
+from services.tenants import tenant_for_update, tenant_registry
 
 
 async def start_parade_state(update, context):
     reset_session(context, mode="PARADE_STATE")
 
-    user_id = update.effective_user.id if update.effective_user else None
-    if not is_admin_user(user_id):
+    if not is_tenant_admin(update):
         await reply(update, "❌ You are not authorized to generate parade state.")
         return
 
     await reply(
         update,
         "📋Parade State started.\n\nPlease input the number of out-of-camp personnel:",
-        reply_markup=parade_state_cancel_button(),
+        reply_markup=parade_state_start_buttons(),
     )
 
 
+async def send_to_parade_topic(context, tenant, messages, sent_snapshot=None):
+    for text in messages:
+        await context.bot.send_message(chat_id=tenant.ic_group_chat_id, message_thread_id=tenant.parade_state_topic_id, text=text)
+    # Baseline for the "changes since last sent" view
+    if sent_snapshot:
+        await asyncio.to_thread(crud.set_app_state, tenant.state_key(PARADE_LAST_SENT_KEY), sent_snapshot)
+
+
+async def prepare_scheduled_parade_state(context, due: datetime):
+    """Scheduler job: render each tenant's parade state ahead of a parade and DM it to its admins as a draft.
+
+    ``due`` is when the job was scheduled, ``PARADE_STATE_PREWARM_MINUTES`` before
+    the parade. Out-of-camp defaults to the last figure typed in through
+    /start_parade_state; admins can send the draft as-is, re-enter the figure, or
+    discard it. Drafts are kept in app_state, so a tap on one reaching any replica,
+    or arriving after a restart, finds it.
+    """
+    generated_at = due + timedelta(minutes=PARADE_STATE_PREWARM_MINUTES)
+
+    today_prefix = generated_at.strftime("%d%m%y")
+    stored = json.loads(await asyncio.to_thread(crud.get_app_state, PARADE_DRAFTS_KEY) or "{}")
+    drafts = {draft_id: draft for draft_id, draft in stored.items() if draft_id.startswith(today_prefix)}
+
+    for tenant in tenant_registry.all():
+        await _prepare_tenant_draft(context, tenant, generated_at, drafts)
+
+
+async def _prepare_tenant_draft(context, tenant, generated_at, drafts):
+    from bot.parade_state import build_parade_state_messages, load_parade_data
+
+    snapshot, total_strength = await asyncio.to_thread(load_parade_data, generated_at.date(), tenant.id)
+    last_out_of_camp = await asyncio.to_thread(crud.get_app_state, tenant.state_key(PARADE_OUT_OF_CAMP_KEY))
+    out_of_camp = min(int(last_out_of_camp or 0), total_strength)
+    messages = build_parade_state_messages(snapshot, total_strength, out_of_camp, generated_at, tenant.parade_header)
+
+    draft_id = f"{generated_at.strftime('%d%m%y%H%M')}-{tenant.id}"
+    drafts[draft_id] = {
+        "tenant_id": tenant.id,
+        "messages": messages,
+        "snapshot": encode_sent_snapshot(snapshot, total_strength, out_of_camp),
+    }
+    # Saved before any admin can see the buttons
+    await asyncio.to_thread(crud.set_app_state, PARADE_DRAFTS_KEY, json.dumps(drafts))
+
+    keyboard = InlineKeyboardMarkup([
+        [InlineKeyboardButton("📤 Send", callback_data=f"parade|draft_send|{draft_id}")],
+        [
+            InlineKeyboardButton("✏️ Edit out of camp", callback_data=f"parade|draft_edit|{draft_id}"),
+            InlineKeyboardButton("❌ Discard", callback_data=f"parade|draft_cancel|{draft_id}"),
+        ],
+    ])
+
+    for admin_id in await asyncio.to_thread(get_all_admin_user_ids, tenant.id):
+        try:
+            await context.bot.send_message(
+                chat_id=admin_id,
+                text=f"🕒 Draft {tenant.name} parade state for {generated_at.strftime('%H%M')}H (out of camp: {out_of_camp}).",
+            )
+            for i, text in enumerate(messages, 1):
+                await context.bot.send_message(
+                    chat_id=admin_id,
+                    text=text,
+                    reply_markup=keyboard if i == len(messages) else None,
+                )
+        except TelegramError as e:
+            print(f"[PARADE] Failed to send draft {draft_id} to {admin_id}: {e}")
+
+
+async def handle_parade_draft_callback(update, context):
+    # Answers go below the draft rather than editing it, so the draft stays readable
+    query = update.callback_query
+    _, action, draft_id = query.data.split("|", 2)
+    stored = await asyncio.to_thread(crud.get_app_state, PARADE_DRAFTS_KEY)
+    draft = json.loads(stored).get(draft_id) if stored else None
+    await query.edit_message_reply_markup(reply_markup=None)
+    if not draft:
+        await query.message.reply_text("Draft expired. Use /start_parade_state instead.")
+        reset_session(context)
+        return
+
+    if action == "draft_send":
+        # Drafts go to every admin; only the first tap posts it
+        async with once(f"parade:draft_send:{draft_id}") as first:
+            if first:
+                await send_to_parade_topic(context, tenant_registry.get(draft["tenant_id"]), draft["messages"], draft["snapshot"])
+                audit(update, "parade.send", draft=draft_id)
+        await query.message.reply_text("✅ Parade state sent." if first else "ℹ️ This parade state was already sent.")
+        reset_session(context)
+        return
+
+    if action == "draft_edit":
+        reset_session(context, mode="PARADE_STATE")
+        # Owners receive every tenant's drafts, so remember whose this was
+        context.user_data["parade_tenant_id"] = draft["tenant_id"]
+        await query.message.reply_text(
+            "Please input the number of out-of-camp personnel:",
+            reply_markup=parade_state_cancel_button(),
+        )
+        return
+
+    await query.message.reply_text("❌ Draft discarded.")
+    reset_session(context)
+
+
 async def handle_parade_callbacks(update, context):
     query = update.callback_query
     await query.answer()
 
-    user_id = update.effective_user.id if update.effective_user else None
-    if not is_admin_user(user_id):
+    if not is_tenant_admin(update):
         await query.edit_message_text("❌ You are not authorized to send parade state.")
         reset_session(context)
         return
 
     data = query.data
-    text = context.user_data.get("generated_text")
-    if not text and data != "parade|cancel":
+    if data.startswith("parade|draft_"):
+        await handle_parade_draft_callback(update, context)
+        return
+
+    if data == "parade|delta":
+        from bot.parade_state import generate_parade_delta
+        await generate_parade_delta(update, context)
+        return
+
+    messages = context.user_data.get("generated_messages")
+    if not messages and data != "parade|cancel":
         await query.edit_message_text("Session expired. Please start again.")
         reset_session(context)
         return
 
-    if data == "parade|send":
-        await context.bot.send_message(chat_id=IC_GROUP_CHAT_ID, message_thread_id=PARADE_STATE_TOPIC_ID, text=text)
+    if callback_action(data) == "parade|send":
+        async with once_button(update) as first:
+            if not first:
+                await query.edit_message_text("ℹ️ This parade state was already sent.")
+                reset_session(context)
+                return
+            tenant = tenant_registry.get(context.user_data.get("generated_tenant_id")) or tenant_for_update(update)
+            await send_to_parade_topic(context, tenant, messages, context.user_data.get("generated_snapshot"))
+            audit(update, "parade.send")
         await query.edit_message_text("✅ Parade state sent.")
         reset_session(context)
         return
@@ -1,15 +1,18 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 from bot.helpers import reply
+from bot.shared.callback_data import pack_callbacks
 from bot.shared.state import reset_session
 from config.constants import ACTIVITIES
 from db.crud import get_user_by_telegram_id
-from services.db_service import SFTService, get_sft_window
+from services.audit import audit
+from services.db_service import SFTService, SFTWindow, get_sft_windows
+from services.tenants import tenant_for_update
 
 
 async def start_sft(update, context):
-    window = get_sft_window()
-    if not window:
+    windows = get_sft_windows(tenant_for_update(update).id)
+    if not windows:
         await reply(
             update,
             "❌ PT SFT has not been opened by IC yet.\nPlease wait for instructions.",
@@ -17,17 +20,40 @@ async def start_sft(update, context):
         return
 
     reset_session(context, mode="SFT")
-    context.user_data.update({"start": window.start, "end": window.end, "date": window.date})
+    if len(windows) == 1:
+        await show_activities(update, context, windows[0])
+        return
+
+    keyboard = [[InlineKeyboardButton(f"🕒 {window.label}", callback_data=f"sft_window|{window.id}")] for window in windows]
+    await reply(update, "🏋️ *PT SFT Open*\n\nSelect SFT window:", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode="Markdown")
+
 
-    keyboard = [[InlineKeyboardButton(activity, callback_data=f"sft_activity|{activity}")] for activity in ACTIVITIES]
+async def show_activities(update, context, window: SFTWindow):
+    context.user_data.update({"sft_window_id": window.id, "start": window.start_hhmm, "end": window.end_hhmm, "date": window.date_label})
     await reply(
         update,
-        f"🏋️ *PT SFT Open*\n\nTime: {window.start}-{window.end}\n\nSelect activity:",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        f"🏋️ *PT SFT Open*\n\nDate: {window.date_label}\nTime: {window.start_hhmm}-{window.end_hhmm}\n\nSelect activity:",
+        reply_markup=activity_keyboard(window.id),
         parse_mode="Markdown",
     )
 
 
+def activity_keyboard(window_id: int) -> InlineKeyboardMarkup:
+    """Activity buttons labelled with how many cadets are in each so far, and the cap."""
+    counts = SFTService.activity_counts(window_id)
+    keyboard = []
+    for (activity, rules), data in zip(ACTIVITIES.items(), pack_callbacks("sft_activity", list(ACTIVITIES))):
+        participants, busiest = counts.get(activity, (0, 0))
+        capacity = rules.get("max")
+        if capacity is None:
+            label = f"{activity} ({participants})"
+        else:
+            # Capacity is per slot, so show the busiest slot against it
+            label = f"{'🔴 ' if busiest >= capacity else ''}{activity} ({busiest}/{capacity})"
+        keyboard.append([InlineKeyboardButton(label, callback_data=data)])
+    return InlineKeyboardMarkup(keyboard)
+
+
 async def quit_sft(update, context):
     telegram_id = update.effective_user.id if update.effective_user else None
     if telegram_id is None:
@@ -41,6 +67,7 @@ async def quit_sft(update, context):
 
     removed = SFTService.remove_submission(user.id)
     if removed:
+        audit(update, "sft.quit", subject=f"{user.rank} {user.full_name}")
         await reply(update, "✅ You have quit SFT. All your submitted SFT entries were removed.")
         return
 
@@ -3,13 +3,15 @@ from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from bot.helpers import reply
 from bot.shared.state import reset_session
 from db.crud import get_all_cadet_names, get_all_instructor_names
+from services.tenants import tenant_for_update
 
 
 async def start_status(update, context):
     """Main menu for RSO/MA/RSI reporting."""
     reset_session(context)
-    context.user_data["all_names"] = get_all_cadet_names()
-    context.user_data["all_instructors"] = get_all_instructor_names()
+    tenant = tenant_for_update(update)
+    context.user_data["all_names"] = get_all_cadet_names(tenant.id)
+    context.user_data["all_instructors"] = get_all_instructor_names(tenant.id)
 
     keyboard = [
         [InlineKeyboardButton("📋 Report RSO", callback_data="status_menu|report_rso")],
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import re
+
+from sqlalchemy.exc import IntegrityError
+
+from bot.helpers import reply
+from config.constants import ADMIN_IDS
+from db.crud import create_tenant, update_tenant
+from services.audit import audit
+from services.auth_service import is_tenant_admin
+from services.tenants import tenant_for_update, tenant_registry
+
+# /tenant set <field> -> (Tenant column, kind)
+TENANT_FIELDS = {
+    "name": ("name", "text"),
+    "header": ("parade_header", "text"),
+    "cadet_chat": ("cadet_chat_id", "chat"),
+    "movement_topic": ("movement_topic_id", "topic"),
+    "sft_topic": ("sft_topic_id", "topic"),
+    "parade_topic": ("parade_state_topic_id", "topic"),
+    "cet_topic": ("cet_topic_id", "topic"),
+    "cadet_cet_topic": ("cadet_cet_topic_id", "topic"),
+    "locations": ("locations", "list"),
+}
+
+
+def _usage() -> str:
+    return (
+        "Usage:\n"
+        "/tenant - show this chat's tenant\n"
+        "/tenant add <slug> <name> - register this group as a new wing's IC group\n"
+        "/tenant set <field> [value] - change a setting\n\n"
+        f"Fields: {', '.join(TENANT_FIELDS)}\n"
+        "Topic fields take the current topic when no value is given; 'none' clears a setting. "
+        "Locations are comma-separated."
+    )
+
+
+def _describe(tenant) -> str:
+    return "\n".join([
+        f"🏷️ {tenant.name} ({tenant.slug}){' - default' if tenant.is_default else ''}",
+        f"Parade header: {tenant.parade_header}",
+        f"IC group: {tenant.ic_group_chat_id}",
+        f"Cadet chat: {tenant.cadet_chat_id}",
+        f"Topics: movement {tenant.movement_topic_id}, SFT {tenant.sft_topic_id}, parade {tenant.parade_state_topic_id}, "
+        f"CET {tenant.cet_topic_id}, cadet CET {tenant.cadet_cet_topic_id}",
+        f"Locations: {', '.join(tenant.locations)}",
+    ])
+
+
+def _parse_value(kind: str, raw: str, thread_id: int | None):
+    """Column value for a /tenant set argument; raises ValueError when it does not parse."""
+    if raw.lower() == "none":
+        if kind == "text":
+            raise ValueError("This setting cannot be cleared.")
+        return None
+    if kind == "text":
+        if not raw:
+            raise ValueError("A value is required.")
+        return raw
+    if kind == "list":
+        locations = [location.strip().upper() for location in raw.split(",") if location.strip()]
+        if not locations:
+            raise ValueError("Give at least one location.")
+        return json.dumps(locations)
+    if kind == "topic" and not raw:
+        if thread_id is None:
+            raise ValueError("Run this inside the topic, or give the topic id.")
+        return thread_id
+    if not re.fullmatch(r"-?\d+", raw):
+        raise ValueError("Expected a numeric id.")
+    return int(raw)
+
+
+async def _add_tenant(update, context, args):
+    user_id = update.effective_user.id
+    chat = update.effective_chat
+    if user_id not in ADMIN_IDS:
+        await reply(update, "❌ Only bot owners can add tenants.")
+        return
+    if chat.type == "private":
+        await reply(update, "❌ Run /tenant add inside the new wing's IC group.")
+        return
+    if len(args) < 3 or not re.fullmatch(r"[a-z0-9-]+", args[1].lower()):
+        await reply(update, "Usage: /tenant add <slug, a-z 0-9 -> <name>")
+        return
+
+    slug, name = args[1].lower(), " ".join(args[2:]).upper()
+    try:
+        await asyncio.to_thread(create_tenant, slug, name, f"{name} PARADE STATE", chat.id)
+    except ValueError as e:
+        await reply(update, f"❌ {e}")
+        return
+    tenant_registry.invalidate()
+    audit(update, "tenant.add", subject=slug, name=name)
+    await reply(update, f"✅ Tenant {name} created for this group. Set its topics with /tenant set.\n\n{_usage()}")
+
+
+async def _set_field(update, context, args):
+    tenant = tenant_for_update(update)
+    user = update.effective_user
+    if user.id not in ADMIN_IDS and tenant_registry.for_user(user.id, user.username) != tenant:
+        await reply(update, f"❌ Only {tenant.name} admins can change its settings.")
+        return
+    if len(args) < 2 or args[1].lower() not in TENANT_FIELDS:
+        await reply(update, _usage())
+        return
+
+    column, kind = TENANT_FIELDS[args[1].lower()]
+    thread_id = getattr(update.effective_message, "message_thread_id", None)
+    try:
+        value = _parse_value(kind, " ".join(args[2:]).strip(), thread_id)
+        if kind == "text":
+            value = value.upper()
+        await asyncio.to_thread(update_tenant, tenant.id, **{column: value})
+    except ValueError as e:
+        await reply(update, f"❌ {e}")
+        return
+    except IntegrityError:
+        await reply(update, "❌ That chat already belongs to another tenant.")
+        return
+    tenant_registry.invalidate()
+    audit(update, "tenant.set", subject=tenant.slug, field=column, value=value)
+    await reply(update, "✅ Updated.\n\n" + _describe(tenant_registry.get(tenant.id)))
+
+
+async def tenant(update, context):
+    if not is_tenant_admin(update):
+        await reply(update, "❌ You are not authorized to use /tenant.")
+        return
+
+    args = context.args or []
+    if not args:
+        await reply(update, _describe(tenant_for_update(update)))
+        return
+    if args[0].lower() == "add":
+        await _add_tenant(update, context, args)
+        return
+    if args[0].lower() == "set":
+        await _set_field(update, context, args)
+        return
+    await reply(update, _usage())
@@ -0,0 +1,93 @@
+"""Pinned per-location headcount board in each tenant's IC group movement topic.
+
+Every edit re-reads the counts from ``current_locations`` and the board's message id
+from app_state, so movements confirmed on any replica, and a board posted by another
+one, are reflected. Edits are debounced: the first change schedules a single edit
+``HEADCOUNT_BOARD_DEBOUNCE_SECONDS`` later, and changes arriving meanwhile ride along
+with it.
+"""
+
+import asyncio
+from collections import Counter
+
+from telegram.error import BadRequest, TelegramError
+
+from config.constants import HEADCOUNT_BOARD_DEBOUNCE_SECONDS
+from db import crud
+from utils.datetime_utils import now_sg
+
+BOARD_MESSAGE_KEY = "movement.board_message_id"
+
+
+class HeadcountBoard:
+    def __init__(self, tenant):
+        self._tenant = tenant
+        self._counts = Counter()
+        self._total = 0
+        self._message_id: int | None = None
+        self._pending = False
+
+    async def _hydrate(self):
+        counts, total = await asyncio.to_thread(crud.get_location_headcounts, self._tenant.id)
+        stored_id = await asyncio.to_thread(crud.get_app_state, self._tenant.state_key(BOARD_MESSAGE_KEY))
+        self._counts = Counter(counts)
+        self._total = total
+        self._message_id = int(stored_id) if stored_id else None
+
+    def render(self) -> str:
+        counts = self._counts
+        locations = list(self._tenant.locations)
+        locations += sorted(location for location in counts if location not in self._tenant.locations)
+        lines = [f"📊 HEADCOUNT BOARD ({now_sg().strftime('%H%M')}H)", ""]
+        lines += [f"{location}: {counts[location]}" for location in locations]
+        unaccounted = self._total - sum(counts.values())
+        lines += ["", f"TOTAL: {self._total}", f"NO MOVEMENT RECORDED: {max(unaccounted, 0)}"]
+        return "\n".join(lines)
+
+    def refresh_soon(self, job_queue):
+        """Schedules an edit, unless one is already waiting to pick this change up."""
+        if not self._pending:
+            self._pending = True
+            job_queue.run_once(self._flush, when=HEADCOUNT_BOARD_DEBOUNCE_SECONDS, name=f"headcount_board_{self._tenant.id}")
+
+    async def _flush(self, context):
+        self._pending = False
+        await self._hydrate()
+        if self._message_id is None:
+            return
+        try:
+            await context.bot.edit_message_text(
+                chat_id=self._tenant.ic_group_chat_id,
+                message_id=self._message_id,
+                text=self.render(),
+            )
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                print(f"[BOARD] Failed to update headcount board: {e}")
+
+    async def post(self, bot):
+        """Posts a fresh board, pins it and makes it the one kept up to date."""
+        await self._hydrate()
+        message = await bot.send_message(
+            chat_id=self._tenant.ic_group_chat_id,
+            message_thread_id=self._tenant.movement_topic_id,
+            text=self.render(),
+        )
+        try:
+            await bot.pin_chat_message(chat_id=self._tenant.ic_group_chat_id, message_id=message.message_id, disable_notification=True)
+        except TelegramError as e:
+            print(f"[BOARD] Failed to pin headcount board: {e}")
+        self._message_id = message.message_id
+        await asyncio.to_thread(crud.set_app_state, self._tenant.state_key(BOARD_MESSAGE_KEY), str(message.message_id))
+
+
+# tenant id -> board
+_boards: dict[int, HeadcountBoard] = {}
+
+
+def headcount_board(tenant) -> HeadcountBoard:
+    """The tenant's board, rebuilt when the tenant's settings have been edited."""
+    board = _boards.get(tenant.id)
+    if board is None or board._tenant != tenant:
+        board = _boards[tenant.id] = HeadcountBoard(tenant)
+    return board
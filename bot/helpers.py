@@ -1,4 +1,53 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
+
+from config.constants import TELEGRAM_MESSAGE_LIMIT
+
+# How Telegram's copy of a message reads back in each parse mode; the entities of
+# formatted text are stripped from message.text
+_SHOWN_TEXT = {
+    None: lambda message: message.text,
+    "HTML": lambda message: message.text_html,
+    "MarkdownV2": lambda message: message.text_markdown_v2,
+    "Markdown": lambda message: message.text_markdown,
+}
+
+
+def _shows_text(message, text, parse_mode) -> bool:
+    """Whether the message already reads ``text``, compared with Telegram's own copy.
+
+    Markup written differently (tag case, escapes) reads back unequal; that only costs the edit.
+    """
+    shown = _SHOWN_TEXT.get(parse_mode)
+    if shown is None or message.text is None:
+        return False
+    try:
+        return shown(message) == text
+    except ValueError:
+        # Legacy Markdown cannot express some entities (e.g. underline)
+        return False
+
+
+async def _edit_callback_message(query, text, reply_markup, parse_mode):
+    message = query.message
+    if not message:
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+        return
+
+    same_text = _shows_text(message, text, parse_mode)
+    same_markup = message.reply_markup == reply_markup
+
+    try:
+        if same_text and same_markup:
+            return
+        if same_text:
+            await query.edit_message_reply_markup(reply_markup=reply_markup)
+        else:
+            await query.edit_message_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            raise
+
 
 async def reply(update, text, reply_markup=None, parse_mode=None):
     if update.message:
@@ -8,12 +57,79 @@ async def reply(update, text, reply_markup=None, parse_mode=None):
             parse_mode=parse_mode,
         )
     elif update.callback_query:
-        await update.callback_query.edit_message_text(
-            text,
-            reply_markup=reply_markup,
-            parse_mode=parse_mode,
-        )
+        # Identical re-renders (re-pressed buttons, back to the same screen) cost no API call
+        await _edit_callback_message(update.callback_query, text, reply_markup, parse_mode)
+
+async def edit_reply_markup_if_changed(query, reply_markup) -> bool:
+    """Edits a message's keyboard only when it differs from what is already shown."""
+    if query.message and query.message.reply_markup == reply_markup:
+        return False
+    await query.edit_message_reply_markup(reply_markup=reply_markup)
+    return True
 
 def parade_state_cancel_button():
     keyboard = [[InlineKeyboardButton("❌ Cancel Generation", callback_data="parade|cancel")]] 
-    return InlineKeyboardMarkup(keyboard)
\ No newline at end of file
+    return InlineKeyboardMarkup(keyboard)
+
+def parade_state_start_buttons():
+    keyboard = [
+        [InlineKeyboardButton("🔁 Changes Since Last Sent", callback_data="parade|delta")],
+        [InlineKeyboardButton("❌ Cancel Generation", callback_data="parade|cancel")],
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+
+def _split_oversized_block(block: str, limit: int) -> list[str]:
+    pieces, current = [], ""
+    for line in block.split("\n"):
+        while len(line) > limit:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:limit])
+            line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            pieces.append(current)
+            candidate = line
+        current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def pack_message_blocks(blocks, limit=TELEGRAM_MESSAGE_LIMIT, separator="\n\n", droppable=frozenset()):
+    """Packs text blocks into as few messages as fit, breaking only between blocks.
+
+    Blocks listed in ``droppable`` (e.g. separator lines) are left out at the start or
+    end of a message. When more than one message is needed each is prefixed "[i/n]",
+    so callers should pass a limit that leaves room for it.
+    """
+    messages = []
+    current = []
+    size = 0
+
+    def flush():
+        while current and current[-1] in droppable:
+            current.pop()
+        if current:
+            messages.append(separator.join(current))
+        current.clear()
+
+    for block in blocks:
+        for piece in ([block] if len(block) <= limit else _split_oversized_block(block, limit)):
+            added = len(piece) + (len(separator) if current else 0)
+            if current and size + added > limit:
+                flush()
+                size = 0
+                added = len(piece)
+            if not current and piece in droppable:
+                continue
+            current.append(piece)
+            size += added
+    flush()
+
+    if len(messages) > 1:
+        total = len(messages)
+        messages = [f"[{i}/{total}]\n{text}" for i, text in enumerate(messages, 1)]
+    return messages
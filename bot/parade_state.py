@@ -1,104 +1,61 @@
+import asyncio
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from db import crud
+from db.parade import PARADE_LAST_SENT_KEY, PARADE_OUT_OF_CAMP_KEY, diff_against_sent, encode_sent_snapshot, parade_read_model
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from bot.helpers import parade_state_cancel_button
-
-def categorise_medical_events(events):
-	"""Categorise medical events as MA, RSO or RSI"""
-	ma_events = []
-	rso_events = []
-	rsi_events = []
-
-	for event in events:
-		if event[0].event_type == "MA":
-			ma_events.append(event)
-		elif event[0].event_type == "RSO":
-			rso_events.append(event)
-		elif event[0].event_type == "RSI":
-			rsi_events.append(event)
-		else:
-			print("Unsupported event_type. Only RSO, RSI or MA.")
-
-	categorised_medical_events = {"ma": ma_events, "rso": rso_events, "rsi": rsi_events}
-	return categorised_medical_events
-
-def categorise_medical_statuses(statuses):
-	"""Categorise medical statuses as MC, LD, EUL or RMJ"""
-	mc_statuses = []
-	ld_statuses = []
-	eul_statuses = []
-	rmj_statuses = []
-
-	for status in statuses:
-		if status[0].status_type == "MC":
-			mc_statuses.append(status)
-		elif status[0].status_type == "LD":
-			ld_statuses.append(status)
-		elif status[0].status_type == "EUL":
-			eul_statuses.append(status)
-		elif status[0].status_type == "RMJ":
-			rmj_statuses.append(status)
-		else:
-			print("Unsupported event_type. Only MC, LD, EUL or RMJ.")
+from bot.helpers import pack_message_blocks, parade_state_cancel_button
+from config.constants import DEFAULT_PARADE_HEADER, PARADE_STATE_SEPARATOR, TELEGRAM_MESSAGE_LIMIT
+from services.idempotency import once_callback
+from services.tenants import tenant_for_update, tenant_registry
 
-	categorised_medical_statuses = {"mc": mc_statuses, "ld": ld_statuses, "eul": eul_statuses, "rmj": rmj_statuses}
-	return categorised_medical_statuses
+# Leaves room for the "[i/n]" marker added when a parade state spans several messages
+PARADE_STATE_MESSAGE_LIMIT = TELEGRAM_MESSAGE_LIMIT - 16
 
 def format_ma(events):
-	"""Format MA events for parade state"""
-	final_text = ""
-	for i, event in enumerate(events):
-		medical_event = event[0]
-		user = event[1]
-
-		if medical_event.endorsed_by is None:
+	"""Format MA events as one parade state entry each"""
+	entries = []
+	for i, row in enumerate(events):
+		if row.endorsed_by is None:
 			endorsed_by = ""
 		else:
-			endorsed_by = medical_event.endorsed_by
-
-		final_text += f"""{i+1}. {user.rank} {user.full_name}
-a. NAME: {medical_event.appointment_type}
-LOCATION: {medical_event.location}
-DATE: {medical_event.event_datetime.strftime("%d%m%y")}
-TIME OF APPOINTMENT: {medical_event.event_datetime.strftime("%H%M")}
-ENDORSED BY: {endorsed_by}
-
-"""
-	return final_text
-		
-def format_rso_rsi(events):
-	"""Format RSO and RSI events for parade state"""
-	final_text = ""
-	for i, event in enumerate(events):
-		medical_event = event[0]
-		user = event[1]
-
-		final_text += f"""{i+1}. {user.rank} {user.full_name}
-SYMPTOMS: {medical_event.symptoms}
-DIAGNOSIS: 
-STATUS: 
+			endorsed_by = row.endorsed_by
+
+		entries.append("\n".join([
+			f"{i+1}. {row.rank} {row.full_name}",
+			f"a. NAME: {row.appointment_type}",
+			f"LOCATION: {row.location}",
+			f"DATE: {row.event_datetime.strftime('%d%m%y')}",
+			f"TIME OF APPOINTMENT: {row.event_datetime.strftime('%H%M')}",
+			f"ENDORSED BY: {endorsed_by}",
+		]))
+	return entries
 
-"""
-	return final_text
+def format_rso_rsi(events):
+	"""Format RSO and RSI events as one parade state entry each"""
+	entries = []
+	for i, row in enumerate(events):
+		entries.append("\n".join([
+			f"{i+1}. {row.rank} {row.full_name}",
+			f"SYMPTOMS: {row.symptoms}",
+			"DIAGNOSIS: ",
+			"STATUS: ",
+		]))
+	return entries
 
 def format_status(statuses):
-	"""Format statuses for parade state"""
-	final_text = ""
-	for i, status in enumerate(statuses):
-		medical_status = status[0]
-		user = status[1]
-		medical_event = status[2]
-
-		status_start = medical_status.start_date
-		status_end = medical_status.end_date
+	"""Format statuses as one parade state entry each"""
+	entries = []
+	for i, row in enumerate(statuses):
+		status_start = row.start_date
+		status_end = row.end_date
 		status_duration = status_end - status_start + timedelta(days=1)
 
 		status_start_date = status_start.strftime("%d%m%y")
 		status_end_date = status_end.strftime("%d%m%y")
 		status_duration_days = status_duration.days
 
-		status_type = medical_status.status_type
+		status_type = row.section
 		if status_type == "LD":
 			status_type = "LIGHT DUTY"
 		elif status_type == "EUL":
@@ -106,19 +63,86 @@ def format_status(statuses):
 		elif status_type == "RMJ":
 			status_type = "EXCUSED RUNNING, MARCHING, JUMPING"
 
-		final_text += f"""{i+1}. {user.rank} {user.full_name}
-SYMPTOMS: {medical_event.symptoms}
-DIAGNOSIS: {medical_event.diagnosis}
-STATUS: {status_duration_days} DAY(S) {status_type} ({status_start_date}-{status_end_date})
+		entries.append("\n".join([
+			f"{i+1}. {row.rank} {row.full_name}",
+			f"SYMPTOMS: {row.symptoms}",
+			f"DIAGNOSIS: {row.diagnosis}",
+			f"STATUS: {status_duration_days} DAY(S) {status_type} ({status_start_date}-{status_end_date})",
+		]))
+	return entries
+
+def build_section_blocks(title, entries, limit=PARADE_STATE_MESSAGE_LIMIT):
+	"""Render a section as text blocks, continuing it in a new block where it would not fit one message"""
+	blocks = []
+	parts = [title]
+	size = len(title)
+	for entry in entries:
+		if size + len(entry) + 2 > limit and len(parts) > 1:
+			blocks.append("\n".join(parts[:1]) + "\n" + "\n\n".join(parts[1:]))
+			parts = [f"{title} (CONT.)"]
+			size = len(parts[0])
+		parts.append(entry)
+		size += len(entry) + 2
+
+	if len(parts) == 1:
+		blocks.append(title)
+	else:
+		blocks.append(parts[0] + "\n" + "\n\n".join(parts[1:]))
+	return blocks
+
+def load_parade_data(current_date, tenant_id=None):
+	"""Reads the parade read model and strength; called off the event loop so other users are not blocked"""
+	snapshot = parade_read_model.snapshot(current_date, tenant_id)
+	total_strength = crud.count_cadets(tenant_id)
+	return snapshot, total_strength
+
+def build_parade_state_messages(snapshot, total_strength, out_of_camp, generated_at, title=DEFAULT_PARADE_HEADER):
+	"""Renders a parade state snapshot into the messages to send, in order"""
+	ma_events = snapshot.events["MA"]
+	rso_events = snapshot.events["RSO"]
+	rsi_events = snapshot.events["RSI"]
+	mc_statuses = snapshot.statuses["MC"]
+	temp_statuses_list = [row for section in ("LD", "EUL", "RMJ") for row in snapshot.statuses[section]]  # temp status are statuses that are not MC
+
+	ma_count = snapshot.counts["MA"]
+	rso_count = snapshot.counts["RSO"]
+	rsi_count = snapshot.counts["RSI"]
+	mc_count = snapshot.counts["MC"]
+	temp_status_count = len(temp_statuses_list)
+	others_count = perm_status_count = 0
 
-"""
-	return final_text
+	current_strength = total_strength - out_of_camp
 
-def count_temp_statuses(temp_statuses):
-	count = 0
-	for key, value in temp_statuses.items():
-		count += len(value)
-	return count
+	header = "\n".join([
+		f"{title} {generated_at.strftime('%d%m%y')}, {generated_at.strftime('%H%M')}H",
+		PARADE_STATE_SEPARATOR,
+		"",
+		f"TOTAL STRENGTH: {total_strength}",
+		"",
+		f"CURRENT STRENGTH: {current_strength}",
+		f"OUT OF CAMP: {out_of_camp}",
+	])
+
+	blocks = [
+		header,
+		PARADE_STATE_SEPARATOR,
+		*build_section_blocks(f"MA: {ma_count:02d}", format_ma(ma_events)),
+		PARADE_STATE_SEPARATOR,
+		*build_section_blocks(f"RSI : {rsi_count:02d}", format_rso_rsi(rsi_events)),
+		*build_section_blocks(f"RSO : {rso_count:02d}", format_rso_rsi(rso_events)),
+		PARADE_STATE_SEPARATOR,
+		*build_section_blocks(f"MC: {mc_count:02d}", format_status(mc_statuses)),
+		PARADE_STATE_SEPARATOR,
+		*build_section_blocks(f"OTHERS: {others_count:02d}", []),
+		PARADE_STATE_SEPARATOR,
+		*build_section_blocks(f"STATUSES: {temp_status_count:02d}", format_status(temp_statuses_list)),
+		*build_section_blocks(f"PERMANENT STATUS: {perm_status_count:02d}", []),
+	]
+	return pack_message_blocks(
+		blocks,
+		limit=PARADE_STATE_MESSAGE_LIMIT,
+		droppable={PARADE_STATE_SEPARATOR},
+	)
 
 async def generate_parade_state(update, context):
 	"""Generates the current parade state"""
@@ -126,58 +150,11 @@ async def generate_parade_state(update, context):
 	tz_singapore = ZoneInfo("Asia/Singapore")
 
 	current_datetime = datetime.now(tz_singapore)
-	current_time = current_datetime.time()
 	current_date = current_datetime.date()
 
-	all_medical_events = crud.get_medical_events()
-	all_medical_statuses = crud.get_active_statuses(current_date.strftime('%Y-%m-%d'))
-	all_cadets = crud.get_all_cadets()
-	active_medical_events = [item for item in all_medical_events if item[0].diagnosis == "" or item[0].diagnosis == None]
-	categorised_medical_events = categorise_medical_events(active_medical_events)
-	categorised_medical_statuses = categorise_medical_statuses(all_medical_statuses)
-
-	ma_events = categorised_medical_events["ma"]
-	rso_events = categorised_medical_events["rso"]
-	rsi_events = categorised_medical_events["rsi"]
-	mc_statuses = categorised_medical_statuses["mc"]
-	temp_statuses = {key: value for key, value in categorised_medical_statuses.items() if key != "mc"}
-
-	ma_count = len(ma_events)
-	rso_count = len(rso_events)
-	rsi_count = len(rsi_events)
-	mc_count = len(mc_statuses)
-	temp_status_count = count_temp_statuses(temp_statuses)
-	
-	if ma_count > 0:
-		ma_text = format_ma(ma_events)
-	else:
-		ma_text = ""
-
-	if rso_count > 0:
-		rso_text = format_rso_rsi(rso_events)
-	else:
-		rso_text = ""
-	
-	if rsi_count > 0:
-		rsi_text = format_rso_rsi(rsi_events)
-	else:
-		rsi_text = ""
-
-	if mc_count > 0:
-		mc_text = format_status(mc_statuses)
-	else:
-		mc_text = ""
-
-	if temp_status_count > 0:  # temp status are statuses that are not MC
-		temp_statuses_list = [item for sublist in temp_statuses.values() for item in sublist]
-		temp_status_text = format_status(temp_statuses_list)
-	else:
-		temp_status_text = ""
+	tenant = tenant_registry.get(context.user_data.get("parade_tenant_id")) or tenant_for_update(update)
+	snapshot, total_strength = await asyncio.to_thread(load_parade_data, current_date, tenant.id)
 
-	others_text = perm_status_text = ""
-	others_count = perm_status_count = 0
-	
-	total_strength = len(all_cadets)
 	out_of_camp = update.message.text.strip()
 	if not out_of_camp.isdigit():
 		await update.message.reply_text("❌ Only digits are allowed.\n\nPlease input the number of out-of-camp personnel:", reply_markup=parade_state_cancel_button())
@@ -186,67 +163,80 @@ async def generate_parade_state(update, context):
 	if out_of_camp > total_strength:
 		await update.message.reply_text("❌ Number of personnel cannot be greater than total strength.\n\nPlease input the number of out-of-camp personnel:", reply_markup=parade_state_cancel_button())
 		return
-	current_strength = total_strength - out_of_camp
-	
-	ma_section = "\n" + ma_text.rstrip() if ma_text else ""
-	rsi_section = "\n" + rsi_text.rstrip() if rsi_text else ""
-	rso_section = "\n" + rso_text.rstrip() if rso_text else ""
-	mc_section = "\n" + mc_text.rstrip() if mc_text else ""
-	others_section = "\n" + others_text.rstrip() if others_text else ""
-	statuses_section = "\n" + temp_status_text.rstrip() if temp_status_text else ""
-	perm_status_section = "\n" + perm_status_text.rstrip() if perm_status_text else ""
-
-	parade_state_text = f"""
-	DIS WING 14/26 PRE-MDST PARADE STATE {current_date.strftime('%d%m%y')}, {current_time.strftime('%H%M')}H
-	-------------------------------------------------------- 
-
-	TOTAL STRENGTH: {total_strength}
-
-	CURRENT STRENGTH: {current_strength}
-	OUT OF CAMP: {out_of_camp}
-
-	-------------------------------------------------------- 
-
-	MA: {ma_count:02d}{ma_section}
-
-	-------------------------------------------------------- 
-
-	RSI : {rsi_count:02d}{rsi_section}
 
-	RSO : {rso_count:02d}{rso_section}
+	parade_state_messages = build_parade_state_messages(snapshot, total_strength, out_of_camp, current_datetime, tenant.parade_header)
 
-	-------------------------------------------------------- 
-
-	MC: {mc_count:02d}{mc_section}
-
-	-------------------------------------------------------- 
-
-	OTHERS: {others_count:02d}{others_section}
-
-	--------------------------------------------------------
-
-	STATUSES: {temp_status_count:02d}{statuses_section}
-
-	PERMANENT STATUS: {perm_status_count:02d}{perm_status_section}
-	"""
-	if len(parade_state_text) > 4096:
-		parade_state_text = parade_state_text[:4000] + "\n\n Output truncated: parade_state_text too long."
-
-	context.user_data["generated_text"] = parade_state_text
+	# Scheduled drafts start from the most recent figure typed in
+	await asyncio.to_thread(crud.set_app_state, tenant.state_key(PARADE_OUT_OF_CAMP_KEY), str(out_of_camp))
+	context.user_data["generated_tenant_id"] = tenant.id
+	context.user_data["generated_messages"] = parade_state_messages
+	context.user_data["generated_snapshot"] = encode_sent_snapshot(snapshot, total_strength, out_of_camp)
 	context.user_data["mode"] = "PARADE_CONFIRM"
 
 	keyboard = [
 		[
-			InlineKeyboardButton("📤 Send", callback_data="parade|send"),
+			InlineKeyboardButton("📤 Send", callback_data=once_callback("parade|send")),
 			InlineKeyboardButton("❌ Cancel", callback_data="parade|cancel")
 		]
 	]
 
 	reply_markup = InlineKeyboardMarkup(keyboard)
 
-	await context.bot.send_message(
-		chat_id=update.effective_chat.id, 
-		message_thread_id=update.effective_message.message_thread_id,
-    	text=f"{parade_state_text}",
-		reply_markup=reply_markup
-	)
+	for i, message_text in enumerate(parade_state_messages, 1):
+		is_last = i == len(parade_state_messages)
+		await context.bot.send_message(
+			chat_id=update.effective_chat.id,
+			message_thread_id=update.effective_message.message_thread_id,
+			text=message_text,
+			reply_markup=reply_markup if is_last else None
+		)
+
+def summarise_delta_row(row):
+	"""One-line description of a parade state entry for the delta view"""
+	if row.section == "MA":
+		when = row.event_datetime.strftime('%d%m%y %H%M') if row.event_datetime else ""
+		return f"{row.rank} {row.full_name} - {row.appointment_type} @ {row.location} {when}".rstrip()
+	if row.start_date and row.end_date:
+		return f"{row.rank} {row.full_name} - {row.start_date.strftime('%d%m%y')}-{row.end_date.strftime('%d%m%y')}"
+	return f"{row.rank} {row.full_name} - {row.symptoms}"
+
+def load_parade_delta(current_date, tenant):
+	"""Reads the current snapshot and the last sent one; called off the event loop"""
+	snapshot, total_strength = load_parade_data(current_date, tenant.id)
+	return snapshot, total_strength, crud.get_app_state(tenant.state_key(PARADE_LAST_SENT_KEY))
+
+async def generate_parade_delta(update, context):
+	"""Shows only what changed since the parade state was last sent to the IC topic"""
+	current_datetime = datetime.now(ZoneInfo("Asia/Singapore"))
+	snapshot, total_strength, last_sent = await asyncio.to_thread(load_parade_delta, current_datetime.date(), tenant_for_update(update))
+	delta = diff_against_sent(snapshot, last_sent)
+
+	if delta.previous_day is None:
+		header = "No parade state has been sent yet, so everything below is new."
+	else:
+		header = f"CHANGES SINCE LAST SENT ({delta.previous_day.strftime('%d%m%y')}), AS AT {current_datetime.strftime('%H%M')}H"
+	blocks = [header]
+	if delta.previous_total is not None and delta.previous_total != total_strength:
+		blocks.append(f"TOTAL STRENGTH: {delta.previous_total} -> {total_strength}")
+	if delta.added:
+		blocks.append("ADDED\n" + "\n".join(f"+ [{row.section}] {summarise_delta_row(row)}" for row in delta.added))
+	if delta.removed:
+		blocks.append("REMOVED\n" + "\n".join(f"- [{section}] {name}" for section, name in delta.removed))
+	if delta.changed:
+		lines = []
+		for previous_section, row in delta.changed:
+			section = row.section if previous_section == row.section else f"{previous_section} -> {row.section}"
+			lines.append(f"~ [{section}] {summarise_delta_row(row)}")
+		blocks.append("CHANGED\n" + "\n".join(lines))
+	if len(blocks) == 1:
+		blocks.append("No changes.")
+
+	for message_text in pack_message_blocks(blocks, limit=PARADE_STATE_MESSAGE_LIMIT):
+		await context.bot.send_message(
+			chat_id=update.effective_chat.id,
+			message_thread_id=update.effective_message.message_thread_id,
+			text=message_text,
+		)
+
+	# Still waiting for the out-of-camp figure if the full report is wanted after all
+	context.user_data["mode"] = "PARADE_STATE"
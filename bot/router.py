@@ -1,10 +1,8 @@
 from telegram.ext import CallbackQueryHandler
 
-from bot.features.movement import handle_movement_callbacks, movement_text_input
-from bot.features.parade import handle_parade_callbacks
 from bot.helpers import reply
+from bot.shared.lazy import lazy_callback
 from bot.shared.state import reset_session
-from core.sft_manager import handle_sft_callbacks
 from utils.rate_limiter import user_rate_limiter
 
 
@@ -19,16 +17,19 @@ async def callback_router(update, context):
 
     if data.startswith("mov"):
         context.user_data["mode"] = "MOVEMENT"
+        from bot.features.movement import handle_movement_callbacks
         await handle_movement_callbacks(update, context)
         return
 
     if data.startswith("sft"):
         context.user_data["mode"] = "SFT"
+        from core.sft_manager import handle_sft_callbacks
         await handle_sft_callbacks(update, context)
         return
 
     if data.startswith("parade"):
         context.user_data["mode"] = "PARADE_CONFIRM"
+        from bot.features.parade import handle_parade_callbacks
         await handle_parade_callbacks(update, context)
 
 
@@ -40,6 +41,7 @@ async def text_input_router(update, context):
 
     mode = context.user_data.get("mode")
     if mode == "MOVEMENT":
+        from bot.features.movement import movement_text_input
         await movement_text_input(update, context)
         return
 
@@ -87,37 +89,23 @@ async def status_menu_handler(update, context):
 
 
 def register_status_handlers(dispatcher):
-    from bot.rso_handler import (
-        cancel,
-        cancel_batch_send_handler,
-        confirm_handler,
-        confirm_ma_handler,
-        confirm_ma_update_handler,
-        confirm_rsi_report_handler,
-        confirm_rsi_update_handler,
-        continue_reporting_handler,
-        done_reporting_handler,
-        instructor_selection_handler,
-        mc_days_button_handler,
-        name_selection_handler,
-        rsi_days_button_handler,
-        rsi_status_type_handler,
-        send_batch_to_ic_handler,
-    )
+    # bot.rso_handler is large; it is imported when the first status button is pressed.
+    def rso(name):
+        return lazy_callback("bot.rso_handler", name)
 
     dispatcher.add_handler(CallbackQueryHandler(status_menu_handler, pattern=r"^status_menu\|"))
-    dispatcher.add_handler(CallbackQueryHandler(name_selection_handler, pattern=r"^(name|rsi_name|update_name|update_ma_name|update_rsi_name)\|"))
-    dispatcher.add_handler(CallbackQueryHandler(mc_days_button_handler, pattern=r"^mc_days\|"))
-    dispatcher.add_handler(CallbackQueryHandler(confirm_handler, pattern=r"^confirm$"))
-    dispatcher.add_handler(CallbackQueryHandler(cancel, pattern=r"^cancel$"))
-    dispatcher.add_handler(CallbackQueryHandler(confirm_ma_handler, pattern=r"^confirm_ma$"))
-    dispatcher.add_handler(CallbackQueryHandler(confirm_ma_update_handler, pattern=r"^confirm_ma_update$"))
-    dispatcher.add_handler(CallbackQueryHandler(instructor_selection_handler, pattern=r"^instructor\|"))
-    dispatcher.add_handler(CallbackQueryHandler(rsi_days_button_handler, pattern=r"^rsi_days\|"))
-    dispatcher.add_handler(CallbackQueryHandler(rsi_status_type_handler, pattern=r"^rsi_type\|"))
-    dispatcher.add_handler(CallbackQueryHandler(confirm_rsi_report_handler, pattern=r"^confirm_rsi_report$"))
-    dispatcher.add_handler(CallbackQueryHandler(confirm_rsi_update_handler, pattern=r"^confirm_rsi_update$"))
-    dispatcher.add_handler(CallbackQueryHandler(continue_reporting_handler, pattern=r"^continue_reporting\|"))
-    dispatcher.add_handler(CallbackQueryHandler(done_reporting_handler, pattern=r"^done_reporting$"))
-    dispatcher.add_handler(CallbackQueryHandler(send_batch_to_ic_handler, pattern=r"^send_batch_ic$"))
-    dispatcher.add_handler(CallbackQueryHandler(cancel_batch_send_handler, pattern=r"^cancel_batch_send$"))
+    dispatcher.add_handler(CallbackQueryHandler(rso("name_selection_handler"), pattern=r"^(name|rsi_name|update_name|update_ma_name|rsi_update_name)\|"))
+    dispatcher.add_handler(CallbackQueryHandler(rso("mc_days_button_handler"), pattern=r"^mc_days\|"))
+    dispatcher.add_handler(CallbackQueryHandler(rso("confirm_handler"), pattern=r"^confirm(\|.*)?$"))
+    dispatcher.add_handler(CallbackQueryHandler(rso("cancel"), pattern=r"^cancel$"))
+    dispatcher.add_handler(CallbackQueryHandler(rso("confirm_ma_handler"), pattern=r"^confirm_ma(\|.*)?$"))
+    dispatcher.add_handler(CallbackQueryHandler(rso("confirm_ma_update_handler"), pattern=r"^confirm_ma_update(\|.*)?$"))
+    dispatcher.add_handler(CallbackQueryHandler(rso("instructor_selection_handler"), pattern=r"^instructor\|"))
+    dispatcher.add_handler(CallbackQueryHandler(rso("rsi_days_button_handler"), pattern=r"^rsi_days\|"))
+    dispatcher.add_handler(CallbackQueryHandler(rso("rsi_status_type_handler"), pattern=r"^rsi_type\|"))
+    dispatcher.add_handler(CallbackQueryHandler(rso("confirm_rsi_report_handler"), pattern=r"^confirm_rsi_report(\|.*)?$"))
+    dispatcher.add_handler(CallbackQueryHandler(rso("confirm_rsi_update_handler"), pattern=r"^confirm_rsi_update(\|.*)?$"))
+    dispatcher.add_handler(CallbackQueryHandler(rso("continue_reporting_handler"), pattern=r"^continue_reporting\|"))
+    dispatcher.add_handler(CallbackQueryHandler(rso("done_reporting_handler"), pattern=r"^done_reporting$"))
+    dispatcher.add_handler(CallbackQueryHandler(rso("send_batch_to_ic_handler"), pattern=r"^send_batch_ic(\|.*)?$"))
+    dispatcher.add_handler(CallbackQueryHandler(rso("cancel_batch_send_handler"), pattern=r"^cancel_batch_send$"))
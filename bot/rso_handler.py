@@ -7,23 +7,23 @@ from telegram.ext import CallbackContext
 
 from db.crud import (
     get_user_records,
-    update_user_record,
-    create_user_record,
     get_ma_records,
     create_ma_record,
     update_ma_record,
     get_user_rsi_records,
-    create_rsi_record,
-    update_rsi_record,
     get_all_cadet_names,
     get_all_instructor_names,
+    save_pending_reports,
 )
 
 from bot.features.notifications import admin_wants_status_notifications
 from bot.helpers import reply
+from bot.shared.callback_data import pack_callbacks, unpack_callback
+from services.audit import audit
 from services.auth_service import get_all_admin_user_ids
+from services.idempotency import once_button, once_callback
+from services.tenants import tenant_for_update
 
-from config.constants import IC_GROUP_CHAT_ID, PARADE_STATE_TOPIC_ID, CADET_CHAT_ID
 from utils.input_normalizers import to_ddmmyy, to_hhmm
 
 # ------------ Common Utility Functions ------------ #
@@ -80,14 +80,6 @@ def pending_update_exists(context: CallbackContext, record_id: int | None, modes
     return False
 
 
-def mark_action_once(context: CallbackContext, action_key: str) -> bool:
-    completed = context.user_data.setdefault("completed_actions", set())
-    if action_key in completed:
-        return False
-    completed.add(action_key)
-    return True
-
-
 def format_pending_reports(reports: list[dict], mode: str) -> str:
     lines = []
     if mode =='rsi_report' or mode == 'rsi_update':
@@ -108,46 +100,20 @@ def format_pending_reports(reports: list[dict], mode: str) -> str:
     return "\n".join(lines).strip()
 
 
-def persist_pending_reports(reports: list[dict]):
-    for report in reports:
-        mode = report.get("mode")
-        if mode == "report":
-            create_user_record(
-                name=report.get("name", ""),
-                symptoms=report.get("symptoms", ""),
-                diagnosis=report.get("diagnosis", ""),
-            )
-        elif mode == "update":
-            update_user_record(
-                record_id=report.get("record_id"),
-                symptoms=report.get("symptoms", ""),
-                diagnosis=report.get("diagnosis", ""),
-                status=report.get("status", ""),
-                start_date=report.get("start_date", ""),
-                end_date=report.get("end_date", ""),
-            )
-        elif mode == "rsi_report":
-            create_rsi_record(
-                name=report.get("name", ""),
-                symptoms=report.get("symptoms", ""),
-                diagnosis=report.get("diagnosis", ""),
-            )
-        elif mode == "rsi_update":
-            update_rsi_record(
-                record_id=report.get("record_id"),
-                diagnosis=report.get("diagnosis", ""),
-                status_type=report.get("status_type", "MC"),
-                status=report.get("status", ""),
-                start_date=report.get("start_date", ""),
-                end_date=report.get("end_date", ""),
-            )
+# Pending report mode -> audit action
+MEDICAL_AUDIT_ACTIONS = {
+    "report": "medical.rso_report",
+    "update": "medical.rso_update",
+    "rsi_report": "medical.rsi_report",
+    "rsi_update": "medical.rsi_update",
+}
 
 
 def make_name_keyboard(context, prefix: str) -> InlineKeyboardMarkup:
     names = context.user_data.get('all_names', [])
     keyboard = [
-        [InlineKeyboardButton(name, callback_data=f"{prefix}|{name}")]
-        for name in names
+        [InlineKeyboardButton(name, callback_data=data)]
+        for name, data in zip(names, pack_callbacks(prefix, names))
     ]
     return InlineKeyboardMarkup(keyboard)
 
@@ -158,16 +124,21 @@ async def prompt_name_selection(update: Update, context: CallbackContext, mode:
 
 
 async def send_to_ic_group(update: Update, context: CallbackContext, message: str):
+    tenant = tenant_for_update(update)
     await context.bot.send_message(
-        chat_id=IC_GROUP_CHAT_ID,
+        chat_id=tenant.ic_group_chat_id,
         text=message,
-        message_thread_id=PARADE_STATE_TOPIC_ID,
+        message_thread_id=tenant.parade_state_topic_id,
     )
     await notify_admins(update, context, message, destination_label="IC parade thread")
 
 async def send_to_cadet_chat(update: Update, context: CallbackContext, message: str):
+    tenant = tenant_for_update(update)
+    if tenant.cadet_chat_id is None:
+        print(f"[RSO] Tenant {tenant.slug} has no cadet chat; report not posted there")
+        return
     await context.bot.send_message(
-        chat_id=CADET_CHAT_ID,
+        chat_id=tenant.cadet_chat_id,
         text=message,
     )
 
@@ -186,7 +157,7 @@ async def notify_admins(update: Update, context: CallbackContext, message: str,
     payload = f"🔔 Status update by {actor} sent to {destination_label}:\n\n{message}"
     sender_id = update.effective_user.id if update and update.effective_user else None
 
-    for admin_id in get_all_admin_user_ids():
+    for admin_id in get_all_admin_user_ids(tenant_for_update(update).id):
         if sender_id and admin_id == sender_id:
             continue
         if not admin_wants_status_notifications(context, admin_id):
@@ -202,7 +173,10 @@ async def notify_admins(update: Update, context: CallbackContext, message: str,
 async def name_selection_handler(update: Update, context: CallbackContext):  # manual input for symptoms
     query = update.callback_query
     await query.answer()
-    key, name = query.data.split("|", 1)
+    key, name = unpack_callback(query.data)
+    if name is None:
+        await reply(update, "Session expired. Please start again.")
+        return
 
     if key == "name" and context.user_data.get("mode") == "report":
         # Check for duplicate cadets in batch for new RSO reports
@@ -242,7 +216,7 @@ async def name_selection_handler(update: Update, context: CallbackContext):  # m
         context.user_data["updating"] = True
         context.user_data["awaiting_diagnosis"] = True
 
-        records = get_user_records(name)
+        records = get_user_records(name, tenant_for_update(update).id)
         if not records:
             await reply(
                 update,
@@ -275,7 +249,7 @@ async def name_selection_handler(update: Update, context: CallbackContext):  # m
 
     if key == "update_ma_name":
         context.user_data["name"] = name
-        user_records = get_ma_records(name)
+        user_records = get_ma_records(name, tenant_for_update(update).id)
         if not user_records:
             await reply(update, f"No existing MA reports found for {name}.")
             context.user_data.clear()
@@ -297,17 +271,17 @@ async def name_selection_handler(update: Update, context: CallbackContext):  # m
 
         context.user_data["record_id"] = getattr(latest_record, "id", None)
 
-        instructors = get_all_instructor_names()
+        instructors = get_all_instructor_names(tenant_for_update(update).id)
         keyboard = [
-            [InlineKeyboardButton(instructor, callback_data=f"instructor|{instructor}")]
-            for instructor in instructors
+            [InlineKeyboardButton(instructor, callback_data=data)]
+            for instructor, data in zip(instructors, pack_callbacks("instructor", instructors))
         ]
         await reply(update, "Select who endorsed:", reply_markup=InlineKeyboardMarkup(keyboard))
         return
 
     if key == "rsi_update_name":
         context.user_data["name"] = name
-        records = get_user_rsi_records(name)
+        records = get_user_rsi_records(name, tenant_for_update(update).id)
         if not records:
             await reply(update, f"No existing RSI report found for {name}.")
             context.user_data.clear()
@@ -606,7 +580,7 @@ async def show_preview_summary(update: Update, context: CallbackContext):
 
     keyboard = [
         [
-            InlineKeyboardButton("Confirm", callback_data="confirm"),
+            InlineKeyboardButton("Confirm", callback_data=once_callback("confirm")),
             InlineKeyboardButton("Cancel", callback_data="cancel")
         ]
     ]
@@ -623,44 +597,45 @@ async def confirm_handler(update: Update, context: CallbackContext):
     if not query:
         return
     await query.answer()
-    if not mark_action_once(context, "confirm_rso"):
-        await reply(update, "ℹ️ This report was already confirmed.")
-        return
+    async with once_button(update) as first:
+        if not first:
+            await reply(update, "ℹ️ This report was already confirmed.")
+            return
 
-    name = context.user_data.get('name', 'N/A')
-    symptoms = context.user_data.get('symptoms', '')
-    diagnosis = context.user_data.get('diagnosis', '')
-    status = context.user_data.get('status', '')
-    mode = context.user_data.get("mode")
+        name = context.user_data.get('name', 'N/A')
+        symptoms = context.user_data.get('symptoms', '')
+        diagnosis = context.user_data.get('diagnosis', '')
+        status = context.user_data.get('status', '')
+        mode = context.user_data.get("mode")
 
-    if status != '':
-        start_date = context.user_data.get('start_date', '')
-        end_date = context.user_data.get('end_date', '')
-        status += f" ({start_date}-{end_date})"
+        if status != '':
+            start_date = context.user_data.get('start_date', '')
+            end_date = context.user_data.get('end_date', '')
+            status += f" ({start_date}-{end_date})"
 
-    else:
-        start_date = ''
-        end_date = ''
+        else:
+            start_date = ''
+            end_date = ''
 
 
-    if mode == "update" and pending_update_exists(context, context.user_data.get("record_id"), {"update"}):
-        await reply(update, "This update is already queued in the current batch.")
-        reset_entry_state(context)
-        return
+        if mode == "update" and pending_update_exists(context, context.user_data.get("record_id"), {"update"}):
+            await reply(update, "This update is already queued in the current batch.")
+            reset_entry_state(context)
+            return
 
-    add_pending_report(
-        context,
-        {
-            "mode": mode,
-            "name": name,
-            "symptoms": symptoms,
-            "diagnosis": diagnosis,
-            "status": status,
-            "start_date": start_date,
-            "end_date": end_date,
-            "record_id": context.user_data.get("record_id"),
-        },
-    )
+        add_pending_report(
+            context,
+            {
+                "mode": mode,
+                "name": name,
+                "symptoms": symptoms,
+                "diagnosis": diagnosis,
+                "status": status,
+                "start_date": start_date,
+                "end_date": end_date,
+                "record_id": context.user_data.get("record_id"),
+            },
+        )
 
     keyboard = [
         [InlineKeyboardButton("➕ Report Another", callback_data=f"continue_reporting|{mode}")],
@@ -711,7 +686,7 @@ async def done_reporting_handler(update: Update, context: CallbackContext):
     context.user_data["last_batch_summary"] = summary
     context.user_data["last_batch_reports"] = reports
     keyboard = [
-        [InlineKeyboardButton("📤 Send to IC Group", callback_data="send_batch_ic")],
+        [InlineKeyboardButton("📤 Send to IC Group", callback_data=once_callback("send_batch_ic"))],
         [InlineKeyboardButton("Cancel", callback_data="cancel_batch_send")],
     ]
     await reply(
@@ -731,10 +706,23 @@ async def send_batch_to_ic_handler(update: Update, context: CallbackContext):
     if not summary or not reports:
         await reply(update, "No batch summary found to send.")
         return
+    async with once_button(update) as first:
+        if not first:
+            await reply(update, "ℹ️ This batch was already sent.")
+            return
 
-
-    persist_pending_reports(reports)
-    await send_to_ic_group(update, context, summary)
+        # Send before saving: if the save fails, a retry repeats the message rather than the records
+        await send_to_ic_group(update, context, summary)
+        save_pending_reports(reports, tenant_for_update(update).id)
+        for report in reports:
+            audit(
+                update,
+                MEDICAL_AUDIT_ACTIONS.get(report.get("mode"), f"medical.{report.get('mode')}"),
+                subject=report.get("name"),
+                record_id=report.get("record_id"),
+                diagnosis=report.get("diagnosis"),
+                status=report.get("status"),
+            )
     context.user_data.clear()
     await reply(update, "✅ Sent to IC group.")
 
@@ -781,7 +769,7 @@ async def show_ma_preview_summary(update: Update, context: CallbackContext):
 
     keyboard = [
         [
-            InlineKeyboardButton("Confirm", callback_data="confirm_ma"),
+            InlineKeyboardButton("Confirm", callback_data=once_callback("confirm_ma")),
             InlineKeyboardButton("Cancel", callback_data="cancel")
         ]
     ]
@@ -797,34 +785,37 @@ async def confirm_ma_handler(update: Update, context: CallbackContext):
     if not query:
         return
     await query.answer()
-    if not mark_action_once(context, "confirm_ma"):
-        await reply(update, "ℹ️ This MA report was already confirmed.")
-        return
-
-    name = context.user_data.get('name', 'N/A')
-    appointment = context.user_data.get('appointment', 'N/A')
-    appointment_location = context.user_data.get('appointment_location', 'N/A')
-    appointment_date = context.user_data.get('appointment_date', 'N/A')
-    appointment_time = context.user_data.get('appointment_time', 'N/A')
-
-    # Save new MA report to database
-    create_ma_record(
-        name=name,
-        appointment=appointment,
-        appointment_location=appointment_location,
-        appointment_date=appointment_date,
-        appointment_time=appointment_time
-    )
-
-    # Format and send to CBC
-    summary = f"MA\n"
-    summary += f"{name}\n"
-    summary += f"NAME: {appointment}\n"
-    summary += f"LOCATION: {appointment_location}\n"
-    summary += f"DATE: {appointment_date}\n"
-    summary += f"TIME OF APPOINTMENT: {appointment_time}H\n"
+    async with once_button(update) as first:
+        if not first:
+            await reply(update, "ℹ️ This MA report was already confirmed.")
+            return
 
-    await send_to_cadet_chat(update, context, summary)
+        name = context.user_data.get('name', 'N/A')
+        appointment = context.user_data.get('appointment', 'N/A')
+        appointment_location = context.user_data.get('appointment_location', 'N/A')
+        appointment_date = context.user_data.get('appointment_date', 'N/A')
+        appointment_time = context.user_data.get('appointment_time', 'N/A')
+
+        # Format and send to CBC
+        summary = f"MA\n"
+        summary += f"{name}\n"
+        summary += f"NAME: {appointment}\n"
+        summary += f"LOCATION: {appointment_location}\n"
+        summary += f"DATE: {appointment_date}\n"
+        summary += f"TIME OF APPOINTMENT: {appointment_time}H\n"
+
+        await send_to_cadet_chat(update, context, summary)
+
+        # Save new MA report to database
+        create_ma_record(
+            name=name,
+            appointment=appointment,
+            appointment_location=appointment_location,
+            appointment_date=appointment_date,
+            appointment_time=appointment_time,
+            tenant_id=tenant_for_update(update).id,
+        )
+        audit(update, "medical.ma_report", subject=name, appointment=appointment, date=appointment_date, time=appointment_time)
 
     await reply(
         update,
@@ -841,7 +832,10 @@ async def update_endorsed(update: Update, context: CallbackContext):
 async def instructor_selection_handler(update: Update, context: CallbackContext):
     query = update.callback_query
     await query.answer()
-    key, instructor = query.data.split("|")
+    key, instructor = unpack_callback(query.data)
+    if instructor is None:
+        await reply(update, "Session expired. Please start again.")
+        return
     if key == "instructor":
         context.user_data['instructor'] = instructor
         await show_ma_update_summary(update, context)
@@ -864,7 +858,7 @@ async def show_ma_update_summary(update: Update, context: CallbackContext):
 
     keyboard = [
         [
-            InlineKeyboardButton("Confirm", callback_data="confirm_ma_update"),
+            InlineKeyboardButton("Confirm", callback_data=once_callback("confirm_ma_update")),
             InlineKeyboardButton("Cancel", callback_data="cancel")
         ]
     ]
@@ -880,37 +874,40 @@ async def confirm_ma_update_handler(update: Update, context: CallbackContext):
     if not query:
         return
     await query.answer()
-    if not mark_action_once(context, "confirm_ma_update"):
-        await reply(update, "ℹ️ This MA update was already confirmed.")
-        return
-
-    name = context.user_data.get('name', 'N/A')
-    appointment = context.user_data.get('appointment', 'N/A')
-    appointment_location = context.user_data.get('appointment_location', 'N/A')
-    appointment_date = context.user_data.get('appointment_date', 'N/A')
-    appointment_time = context.user_data.get('appointment_time', 'N/A')
-    instructor = context.user_data.get('instructor', 'N/A')
-
-    # Update MA record in database
-    update_ma_record(
-        record_id=context.user_data.get('record_id'),
-        appointment=appointment,
-        appointment_location=appointment_location,
-        appointment_date=appointment_date,
-        appointment_time=appointment_time,
-        instructor=instructor
-    )
-
-    # Format and send to parade state IC group
-    summary = f"MA\n"
-    summary += f"{name}\n"
-    summary += f"NAME: {appointment}\n"
-    summary += f"LOCATION: {appointment_location}\n"
-    summary += f"DATE: {appointment_date}\n"
-    summary += f"TIME OF APPOINTMENT: {appointment_time}H\n"
-    summary += f"ENDORSED BY: {instructor}\n"
+    async with once_button(update) as first:
+        if not first:
+            await reply(update, "ℹ️ This MA update was already confirmed.")
+            return
 
-    await send_to_ic_group(update, context, summary)
+        name = context.user_data.get('name', 'N/A')
+        appointment = context.user_data.get('appointment', 'N/A')
+        appointment_location = context.user_data.get('appointment_location', 'N/A')
+        appointment_date = context.user_data.get('appointment_date', 'N/A')
+        appointment_time = context.user_data.get('appointment_time', 'N/A')
+        instructor = context.user_data.get('instructor', 'N/A')
+
+        # Format and send to parade state IC group
+        summary = f"MA\n"
+        summary += f"{name}\n"
+        summary += f"NAME: {appointment}\n"
+        summary += f"LOCATION: {appointment_location}\n"
+        summary += f"DATE: {appointment_date}\n"
+        summary += f"TIME OF APPOINTMENT: {appointment_time}H\n"
+        summary += f"ENDORSED BY: {instructor}\n"
+
+        # Send before saving, as for a batch: a failed save repeats the message, not the update
+        await send_to_ic_group(update, context, summary)
+
+        # Update MA record in database
+        update_ma_record(
+            record_id=context.user_data.get('record_id'),
+            appointment=appointment,
+            appointment_location=appointment_location,
+            appointment_date=appointment_date,
+            appointment_time=appointment_time,
+            instructor=instructor
+        )
+        audit(update, "medical.ma_update", subject=name, record_id=context.user_data.get('record_id'), endorsed_by=instructor)
 
     await reply(
         update,
@@ -1033,7 +1030,7 @@ async def show_rsi_preview_summary(update: Update, context: CallbackContext, inc
     summary += f"STATUS: {status_line}\n"
 
     confirm_cb = "confirm_rsi_report" if context.user_data.get("mode") == "rsi_report" else "confirm_rsi_update"
-    keyboard = [[InlineKeyboardButton("Confirm", callback_data=confirm_cb),
+    keyboard = [[InlineKeyboardButton("Confirm", callback_data=once_callback(confirm_cb)),
                  InlineKeyboardButton("Cancel", callback_data="cancel")]]
     await reply(
         update,
@@ -1046,27 +1043,28 @@ async def confirm_rsi_report_handler(update: Update, context: CallbackContext):
     if not query:
         return
     await query.answer()
-    if not mark_action_once(context, "confirm_rsi_report"):
-        await reply(update, "ℹ️ This RSI report was already confirmed.")
-        return
+    async with once_button(update) as first:
+        if not first:
+            await reply(update, "ℹ️ This RSI report was already confirmed.")
+            return
 
-    name = context.user_data.get("name", "N/A")
-    symptoms = context.user_data.get("symptoms", "")
+        name = context.user_data.get("name", "N/A")
+        symptoms = context.user_data.get("symptoms", "")
 
-    keyboard = [
-        [InlineKeyboardButton("➕ Report Another", callback_data="continue_reporting|rsi_report")],
-        [InlineKeyboardButton("✅ Done", callback_data="done_reporting")]
-    ]
-    add_pending_report(
-        context,
-        {
-            "mode": "rsi_report",
-            "name": name,
-            "symptoms": symptoms,
-            "diagnosis": context.user_data.get("diagnosis", ""),
-            "status": "",
-        },
-    )
+        keyboard = [
+            [InlineKeyboardButton("➕ Report Another", callback_data="continue_reporting|rsi_report")],
+            [InlineKeyboardButton("✅ Done", callback_data="done_reporting")]
+        ]
+        add_pending_report(
+            context,
+            {
+                "mode": "rsi_report",
+                "name": name,
+                "symptoms": symptoms,
+                "diagnosis": context.user_data.get("diagnosis", ""),
+                "status": "",
+            },
+        )
     await reply(
         update,
         "✅ Added to batch. Report another?",
@@ -1079,44 +1077,45 @@ async def confirm_rsi_update_handler(update: Update, context: CallbackContext):
     if not query:
         return
     await query.answer()
-    if not mark_action_once(context, "confirm_rsi_update"):
-        await reply(update, "ℹ️ This RSI update was already confirmed.")
-        return
+    async with once_button(update) as first:
+        if not first:
+            await reply(update, "ℹ️ This RSI update was already confirmed.")
+            return
 
-    record_id = context.user_data.get("record_id")
-    diagnosis = context.user_data.get("diagnosis", "")
-    status_type = context.user_data.get("status_type", "MC")
-    status = context.user_data.get("status", "")
-    start_date = context.user_data.get("start_date", "")
-    end_date = context.user_data.get("end_date", "")
+        record_id = context.user_data.get("record_id")
+        diagnosis = context.user_data.get("diagnosis", "")
+        status_type = context.user_data.get("status_type", "MC")
+        status = context.user_data.get("status", "")
+        start_date = context.user_data.get("start_date", "")
+        end_date = context.user_data.get("end_date", "")
 
-    # Append dates to status for consistent formatting (like RSO)
-    if status and start_date and end_date:
-        status += f" ({start_date}-{end_date})"
+        # Append dates to status for consistent formatting (like RSO)
+        if status and start_date and end_date:
+            status += f" ({start_date}-{end_date})"
 
-    if pending_update_exists(context, record_id, {"rsi_update"}):
-        await reply(update, "This update is already queued in the current batch.")
-        reset_entry_state(context)
-        return
+        if pending_update_exists(context, record_id, {"rsi_update"}):
+            await reply(update, "This update is already queued in the current batch.")
+            reset_entry_state(context)
+            return
 
-    keyboard = [
-        [InlineKeyboardButton("➕ Update Another", callback_data="continue_reporting|rsi_update")],
-        [InlineKeyboardButton("✅ Done", callback_data="done_reporting")]
-    ]
-    add_pending_report(
-        context,
-        {
-            "mode": "rsi_update",
-            "record_id": record_id,
-            "name": context.user_data.get("name", "N/A"),
-            "symptoms": context.user_data.get("symptoms", ""),
-            "diagnosis": diagnosis,
-            "status_type": status_type,
-            "status": status,
-            "start_date": start_date,
-            "end_date": end_date,
-        },
-    )
+        keyboard = [
+            [InlineKeyboardButton("➕ Update Another", callback_data="continue_reporting|rsi_update")],
+            [InlineKeyboardButton("✅ Done", callback_data="done_reporting")]
+        ]
+        add_pending_report(
+            context,
+            {
+                "mode": "rsi_update",
+                "record_id": record_id,
+                "name": context.user_data.get("name", "N/A"),
+                "symptoms": context.user_data.get("symptoms", ""),
+                "diagnosis": diagnosis,
+                "status_type": status_type,
+                "status": status,
+                "start_date": start_date,
+                "end_date": end_date,
+            },
+        )
     await reply(
         update,
         "✅ Added to batch. Update another?",
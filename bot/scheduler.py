@@ -0,0 +1,155 @@
+"""Cron jobs whose last firing is recorded in the ``scheduled_jobs`` table.
+
+Like the broadcasts before it, every job shares one min-heap of next firing times
+and a single job-queue timer armed for the earliest entry. What the in-memory job
+queue cannot do is handled through the table:
+
+- Catch-up: on start each job resumes from the firing it last ran, so a firing
+  missed while the bot was down still runs if it is less than the job's grace
+  period old. Several missed firings run once, for the latest of them.
+- One runner: a replica runs a firing only after a conditional UPDATE moves the
+  row's ``last_due_at`` to it and takes a lease, so with several replicas each
+  firing runs once and a slow run is not overlapped by the next one. Clearing
+  ``is_active`` on a row pauses that job in every replica.
+"""
+
+import asyncio
+import heapq
+import os
+import socket
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from config.constants import SCHEDULER_LEASE_SECONDS
+from db import crud
+from utils.cron import CronSchedule
+from utils.datetime_utils import SG_TZ, now_sg
+
+
+@dataclass(frozen=True, slots=True)
+class CronJob:
+    name: str
+    cron: CronSchedule
+    # Called as run(context, due) with the firing time being run
+    run: Callable[..., Awaitable[None]]
+    grace: timedelta
+
+
+def _to_db(when: datetime) -> datetime:
+    # Timestamp columns are stored naive in SG time
+    return when.astimezone(SG_TZ).replace(tzinfo=None)
+
+
+class JobScheduler:
+    def __init__(self):
+        self._job_queue = None
+        self._timer = None
+        self._jobs: dict[str, CronJob] = {}
+        self._heap: list[tuple[datetime, str]] = []
+        self._rebuild_lock = asyncio.Lock()
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+
+    def add(self, job: CronJob):
+        """Registers a job; call before ``install``."""
+        self._jobs[job.name] = job
+
+    def install(self, job_queue):
+        """Schedules every registered job once the job queue runs."""
+        self._job_queue = job_queue
+        job_queue.run_once(self._start, when=0, name="scheduler_start")
+
+    async def _start(self, context):
+        await self._rebuild()
+
+    async def replace(self, prefix: str, jobs: list[CronJob]):
+        """Swaps every job whose name starts with ``prefix`` for ``jobs``."""
+        self._jobs = {name: job for name, job in self._jobs.items() if not name.startswith(prefix)}
+        self._jobs.update({job.name: job for job in jobs})
+        if self._job_queue:
+            await self._rebuild()
+
+    async def _rebuild(self):
+        async with self._rebuild_lock:
+            jobs = list(self._jobs.values())
+            definitions = [
+                {"name": job.name, "cron": job.cron.expression, "grace_seconds": int(job.grace.total_seconds())}
+                for job in jobs
+            ]
+            states = await asyncio.to_thread(crud.sync_scheduled_jobs, definitions)
+            now = now_sg()
+            heap = []
+            for job in jobs:
+                last_due = states.get(job.name)
+                # A job never run before starts from now rather than catching up
+                after = SG_TZ.localize(last_due) if last_due else now
+                heap.append((job.cron.next_after(after), job.name))
+            heapq.heapify(heap)
+            self._heap = heap
+            self._arm()
+            print(f"[SCHEDULER] {len(heap)} job(s) scheduled", flush=True)
+
+    def _arm(self):
+        """Points the single timer at the earliest entry in the heap."""
+        if self._timer:
+            self._timer.schedule_removal()
+            self._timer = None
+        if self._heap:
+            when = max(self._heap[0][0], now_sg())
+            self._timer = self._job_queue.run_once(self._fire, when=when, name="scheduler_timer")
+
+    def _latest_due(self, job: CronJob, when: datetime, now: datetime) -> datetime | None:
+        """The firing to run for an entry due at ``when``, or None if all were missed."""
+        earliest = now - job.grace
+        if when < earliest:
+            print(f"[SCHEDULER] {job.name}: skipped firing(s) from {when:%d%m%y %H%M} beyond the grace period", flush=True)
+            when = job.cron.next_after(earliest - timedelta(minutes=1))
+            if when > now:
+                return None
+        following = job.cron.next_after(when)
+        while following <= now:
+            when, following = following, job.cron.next_after(following)
+        return when
+
+    async def _fire(self, context):
+        self._timer = None
+        now = now_sg()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, name = heapq.heappop(self._heap)
+            job = self._jobs.get(name)
+            if not job:
+                continue
+            run_at = self._latest_due(job, when, now)
+            if run_at:
+                due.append((job, run_at))
+            heapq.heappush(self._heap, (job.cron.next_after(now), name))
+        self._arm()
+
+        for job, run_at in due:
+            await self._run(context, job, run_at)
+
+    async def _run(self, context, job: CronJob, due: datetime):
+        now = now_sg()
+        claimed = await asyncio.to_thread(
+            crud.claim_scheduled_run,
+            job.name,
+            _to_db(due),
+            self._owner,
+            _to_db(now + timedelta(seconds=SCHEDULER_LEASE_SECONDS)),
+            _to_db(now),
+        )
+        if not claimed:
+            # Another replica ran this firing, or the job was deactivated
+            return
+
+        error = None
+        try:
+            await job.run(context, due)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"[SCHEDULER] {job.name} failed: {error}", flush=True)
+        await asyncio.to_thread(crud.finish_scheduled_run, job.name, self._owner, _to_db(now_sg()), error)
+
+
+job_scheduler = JobScheduler()
@@ -0,0 +1,63 @@
+"""Compact callback_data for buttons that carry a free-text value.
+
+Telegram caps callback_data at 64 bytes, which long names or locations can exceed.
+``pack_callback`` sends ``<action>|~<id>`` instead, where ``id`` is the base-36 id of
+the value's row in the ``callback_values`` table. Ids are assigned once and never
+reused, so a button rendered before a restart or by another replica decodes to the
+same value, and an id the table does not know decodes to None. Callbacks without the
+marker are passed through unchanged, so fixed payloads like ``mov:back|names`` keep working.
+"""
+
+from __future__ import annotations
+
+import string
+
+from db import crud
+
+VALUE_MARKER = "~"
+_DIGITS = string.digits + string.ascii_lowercase
+
+# The table is append-only, so entries cached here never go stale
+_values: dict[int, str] = {}
+_ids: dict[str, int] = {}
+
+
+def _to_base36(number: int) -> str:
+    encoded = ""
+    while True:
+        number, remainder = divmod(number, 36)
+        encoded = _DIGITS[remainder] + encoded
+        if not number:
+            return encoded
+
+
+def pack_callbacks(action: str, values: list[str]) -> list[str]:
+    """``pack_callback`` for a whole keyboard, with at most one round trip for new values."""
+    missing = [value for value in values if value not in _ids]
+    if missing:
+        for value, value_id in crud.get_callback_value_ids(missing).items():
+            _ids[value] = value_id
+            _values[value_id] = value
+    return [f"{action}|{VALUE_MARKER}{_to_base36(_ids[value])}" for value in values]
+
+
+def pack_callback(action: str, value: str) -> str:
+    return pack_callbacks(action, [value])[0]
+
+
+def unpack_callback(data: str) -> tuple[str, str | None]:
+    """Returns (action, value). The value is None if the id is not one that was packed."""
+    action, _, payload = data.partition("|")
+    if not payload.startswith(VALUE_MARKER):
+        return action, payload
+    try:
+        value_id = int(payload[1:], 36)
+    except ValueError:
+        return action, None
+    value = _values.get(value_id)
+    if value is None:
+        value = crud.get_callback_value(value_id)
+        if value is not None:
+            _values[value_id] = value
+            _ids[value] = value_id
+    return action, value
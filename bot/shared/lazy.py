@@ -0,0 +1,21 @@
+"""Handler and job callbacks whose module is imported on first use."""
+
+from __future__ import annotations
+
+import importlib
+
+
+def lazy_callback(module: str, name: str):
+    """Returns a callback that imports ``module`` and delegates to ``name`` when first called."""
+    target = None
+
+    async def callback(*args):
+        # (update, context) for handlers, (context,) for jobs
+        nonlocal target
+        if target is None:
+            target = getattr(importlib.import_module(module), name)
+        return await target(*args)
+
+    callback.__name__ = name
+    callback.__qualname__ = f"{module}.{name}"
+    return callback
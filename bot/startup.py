@@ -0,0 +1,79 @@
+"""Boot timing report and background warm-up.
+
+Import this first in ``main`` so the report's clock starts before the heavy imports.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from telegram import Update
+from telegram.ext import TypeHandler
+
+
+class StartupReport:
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._last = self._started
+        self._phases: list[tuple[str, float]] = []
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self._phases.append((phase, (now - self._last) * 1000))
+        self._last = now
+
+    def summary(self) -> str:
+        phases = ", ".join(f"{phase} {ms:.0f} ms" for phase, ms in self._phases)
+        return f"ready in {self.elapsed_ms():.0f} ms ({phases})"
+
+
+startup_report = StartupReport()
+
+
+def _timed(name, task):
+    started = time.perf_counter()
+    try:
+        task()
+        return name, (time.perf_counter() - started) * 1000, None
+    except Exception as e:
+        return name, (time.perf_counter() - started) * 1000, e
+
+
+def start_warmup(tasks: dict[str, callable]):
+    """Runs the warm-up tasks in parallel on background threads and reports when all finish.
+
+    Boot does not wait for them; an update arriving first simply pays the cost itself.
+    """
+
+    def run():
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="warmup") as executor:
+            results = list(executor.map(lambda item: _timed(*item), tasks.items()))
+        parts = []
+        for name, ms, error in results:
+            parts.append(f"{name} {ms:.0f} ms" + (f" FAILED: {error}" if error else ""))
+        total = (time.perf_counter() - started) * 1000
+        print(f"BOOT: warm-up done in {total:.0f} ms ({', '.join(parts)})", flush=True)
+
+    threading.Thread(target=run, name="warmup", daemon=True).start()
+
+
+def add_first_update_report(application):
+    """Logs how long after process start the first update arrived, then removes itself."""
+
+    reported = False
+
+    async def report_first_update(update, context):
+        nonlocal reported
+        # Updates processed concurrently can all reach this before it is removed
+        if reported:
+            return
+        reported = True
+        application.remove_handler(handler, group=-100)
+        print(f"BOOT: first update handled {startup_report.elapsed_ms():.0f} ms after start", flush=True)
+
+    handler = TypeHandler(Update, report_first_update)
+    application.add_handler(handler, group=-100)
@@ -0,0 +1,71 @@
+"""Concurrent update processing that keeps each user's updates in order."""
+
+import asyncio
+
+import telegram
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# process_update is marked @final in PTB; it is overridden below because the per-user
+# lock has to be taken before the base class's semaphore, which do_process_update
+# already runs inside. The override relies on the base process_update only taking a
+# slot and awaiting do_process_update, as in the releases below; re-check on upgrade.
+_CHECKED_PTB_MAJORS = (21, 22)
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates from different users in parallel.
+
+    ``user_data`` flows (awaiting_* flags, pending batches) are order-sensitive, so
+    updates sharing a user (or chat, when there is no user) are serialised through a
+    per-key FIFO lock. The lock is taken before a concurrency slot, so an update
+    waiting behind its own user's earlier ones holds no slot and a burst from one
+    user cannot starve everyone else. Keys are dropped once nothing is queued behind them.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        if telegram.__version_info__.major not in _CHECKED_PTB_MAJORS:
+            raise RuntimeError(
+                f"PerUserUpdateProcessor overrides BaseUpdateProcessor.process_update, which is only "
+                f"checked against python-telegram-bot {_CHECKED_PTB_MAJORS}; found {telegram.__version__}"
+            )
+        super().__init__(max_concurrent_updates)
+        self._locks: dict[tuple[str, int], asyncio.Lock] = {}
+        self._queued: dict[tuple[str, int], int] = {}
+
+    @staticmethod
+    def _ordering_key(update) -> tuple[str, int] | None:
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user:
+            return ("user", update.effective_user.id)
+        if update.effective_chat:
+            return ("chat", update.effective_chat.id)
+        return None
+
+    async def process_update(self, update, coroutine):  # overrides a @final method, see above
+        key = self._ordering_key(update)
+        if key is None:
+            await super().process_update(update, coroutine)
+            return
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._queued[key] = self._queued.get(key, 0) + 1
+        try:
+            async with lock:
+                # Only now take a slot from the shared semaphore
+                await super().process_update(update, coroutine)
+        finally:
+            self._queued[key] -= 1
+            if not self._queued[key]:
+                del self._queued[key]
+                self._locks.pop(key, None)
+
+    async def do_process_update(self, update, coroutine):
+        await coroutine
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,115 @@
+"""Webhook serving mode.
+
+Runs a small Tornado server next to the Application: Telegram pushes updates to
+``/<WEBHOOK_PATH>`` (checked against the secret token header) and load balancers
+probe ``/<WEBHOOK_HEALTH_PATH>``.
+"""
+
+import asyncio
+import hmac
+import json
+import signal
+
+from telegram import Update
+from tornado.httpserver import HTTPServer
+from tornado.web import Application as WebApplication, RequestHandler
+
+from config.settings import (
+    WEBHOOK_HEALTH_PATH,
+    WEBHOOK_LISTEN,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET_TOKEN,
+    WEBHOOK_URL,
+)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class TelegramUpdateHandler(RequestHandler):
+    def initialize(self, bot_app, secret_token: str):
+        self._bot_app = bot_app
+        self._secret_token = secret_token
+
+    async def post(self):
+        received = self.request.headers.get(SECRET_TOKEN_HEADER, "")
+        if not hmac.compare_digest(received, self._secret_token):
+            self.set_status(403)
+            return
+
+        try:
+            payload = json.loads(self.request.body)
+        except (TypeError, ValueError):
+            self.set_status(400)
+            return
+
+        update = Update.de_json(payload, self._bot_app.bot)
+        await self._bot_app.update_queue.put(update)
+        self.set_status(200)
+
+
+class HealthHandler(RequestHandler):
+    def initialize(self, bot_app):
+        self._bot_app = bot_app
+
+    def get(self):
+        running = self._bot_app.running
+        self.set_status(200 if running else 503)
+        self.write({"status": "ok" if running else "starting"})
+
+
+def _build_web_app(application) -> WebApplication:
+    return WebApplication(
+        [
+            (
+                rf"/{WEBHOOK_PATH}/?",
+                TelegramUpdateHandler,
+                {"bot_app": application, "secret_token": WEBHOOK_SECRET_TOKEN},
+            ),
+            (rf"/{WEBHOOK_HEALTH_PATH}/?", HealthHandler, {"bot_app": application}),
+        ]
+    )
+
+
+async def _serve(application, allowed_updates: list[str]):
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    # xheaders: trust X-Forwarded-For/X-Real-Ip from the load balancer in front of us.
+    server = HTTPServer(_build_web_app(application), xheaders=True)
+
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+
+        server.listen(WEBHOOK_PORT, address=WEBHOOK_LISTEN)
+        await application.start()
+
+        # Pending updates are kept: with several replicas behind a balancer, one
+        # instance restarting must not drop updates meant for the others.
+        await application.bot.set_webhook(
+            url=f"{WEBHOOK_URL}/{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET_TOKEN,
+            allowed_updates=allowed_updates,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+        )
+        print(f"BOOT: webhook serving on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH}", flush=True)
+
+        try:
+            await stop_event.wait()
+        finally:
+            server.stop()
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+
+
+def run_webhook(application, allowed_updates: list[str]):
+    """Serve updates pushed by Telegram until SIGINT/SIGTERM."""
+    asyncio.run(_serve(application, allowed_updates))
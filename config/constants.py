@@ -4,6 +4,9 @@ import os
 # CHAT & TOPIC IDS
 # =========================
 
+# The chats and topics below configure the first tenant (wing); further wings are
+# rows in the tenants table, managed with /tenant.
+
 # Instructors / IC Group (shared)
 IC_GROUP_CHAT_ID = -1003592356953
 
@@ -29,6 +32,22 @@ CADET_CHAT_ID = -1003675767444
 CADET_CET_TOPIC_ID = 5
 
 
+# =========================
+# TENANT CONFIG
+# =========================
+
+# The tenant seeded from the constants above. Chats and users that belong to no
+# tenant fall back to it.
+DEFAULT_TENANT_SLUG = os.getenv("DEFAULT_TENANT_SLUG", "dis-14-26").strip()
+DEFAULT_TENANT_NAME = "DIS WING 14/26"
+
+# Parade state title, followed by the date and time; each tenant may set its own
+DEFAULT_PARADE_HEADER = "DIS WING 14/26 PRE-MDST PARADE STATE"
+
+# How often each process checks whether another one changed tenants or imported users
+TENANT_REGISTRY_CHECK_SECONDS = float(os.getenv("TENANT_REGISTRY_CHECK_SECONDS", "30"))
+
+
 # =========================
 # MOVEMENT CONFIG
 # =========================
@@ -46,19 +65,31 @@ LOCATIONS = [
     "LIBRARY"
 ]
 
+# A burst of confirmed movements within this many seconds becomes one board edit
+HEADCOUNT_BOARD_DEBOUNCE_SECONDS = float(os.getenv("HEADCOUNT_BOARD_DEBOUNCE_SECONDS", "5"))
+
+# A movement time up to this many minutes ahead of now is today's (clock skew, a move
+# about to happen); any later time is taken as yesterday's, e.g. "2350" typed at 0010
+MOVEMENT_FUTURE_GRACE_MINUTES = int(os.getenv("MOVEMENT_FUTURE_GRACE_MINUTES", "15"))
+
 # =========================
 # SFT CONFIG
 # =========================
 
-ACTIVITIES = [
-    "Gym @ Wingline",
-    "Running @ Yellow Cluster Parade Square",
-    "Running @ DIS Wing Approved Route",
-    "Frisbee @ Basketball court",
-    "Basketball @ Basketball court",
-    "Other ball @ Yellow Cluster Parade Square",
-    "Badminton @ Basketball court"
-]
+# Activity -> group rules. "min" is the smallest group the PT IC will sign off;
+# "max" caps how many cadets may be at the activity in any 15-minute slot (None: no cap).
+ACTIVITIES = {
+    "Gym @ Wingline": {"min": 2, "max": 15},
+    "Running @ Yellow Cluster Parade Square": {"min": 2, "max": None},
+    "Running @ DIS Wing Approved Route": {"min": 2, "max": None},
+    "Frisbee @ Basketball court": {"min": 4, "max": 14},
+    "Basketball @ Basketball court": {"min": 4, "max": 10},
+    "Other ball @ Yellow Cluster Parade Square": {"min": 2, "max": 20},
+    "Badminton @ Basketball court": {"min": 2, "max": 8},
+}
+
+# Rule applied to submissions whose activity is not listed above
+SFT_DEFAULT_MIN_GROUP = 2
 
 
 # =========================
@@ -136,6 +167,16 @@ PARADE_STATE_FIELDS = {
 # Separator line used in parade state output
 PARADE_STATE_SEPARATOR = "-" * 56
 
+# Parade times (HHMM, SG time) at which a draft parade state is prepared for the admins
+PARADE_STATE_TIMES = [
+    t.strip()
+    for t in os.getenv("PARADE_STATE_TIMES", "0730,1730").split(",")
+    if t.strip()
+]
+
+# How many minutes before each parade time the draft is generated and sent
+PARADE_STATE_PREWARM_MINUTES = int(os.getenv("PARADE_STATE_PREWARM_MINUTES", "5"))
+
 # =========================
 # CET CONFIG
 # =========================
@@ -147,6 +188,24 @@ CET_KEYWORDS = [
     "WDI"
 ]
 
+# Album parts arrive as separate messages; wait this long after the latest part
+# before forwarding the whole album in one go
+CET_ALBUM_WINDOW_SECONDS = float(os.getenv("CET_ALBUM_WINDOW_SECONDS", "1.5"))
+
+# Every tenant's CET posts are mirrored to its own cadet chat CET topic. These routes
+# are extra destinations for the default tenant's posts. "keywords" narrows a route
+# to messages containing one of those keywords; None means any of CET_KEYWORDS.
+# CET_EXTRA_DESTINATIONS adds routes as comma-separated "chat_id[:topic_id]".
+CET_ROUTES = [
+    {
+        "chat_id": int(destination.split(":")[0]),
+        "topic_id": int(destination.split(":")[1]) if ":" in destination else None,
+        "keywords": None,
+    }
+    for destination in os.getenv("CET_EXTRA_DESTINATIONS", "").replace(" ", "").split(",")
+    if destination
+]
+
 # =========================
 # SECURITY LIMITS
 # =========================
@@ -154,12 +213,18 @@ CET_KEYWORDS = [
 # Maximum upload size for /import_user CSV uploads (1 MB)
 MAX_IMPORT_CSV_SIZE_BYTES = 1 * 1024 * 1024
 
+# Telegram rejects message text longer than this
+TELEGRAM_MESSAGE_LIMIT = 4096
+
 
 # =========================
-# DAILY MESSAG CONFIG
+# BROADCAST CONFIG
 # =========================
 
-# Daily messages to be sent on respective days
+# How often the broadcast_schedules table is checked for edits
+BROADCAST_RELOAD_SECONDS = int(os.getenv("BROADCAST_RELOAD_SECONDS", "60"))
+
+# Weekday messages seeded into broadcast_schedules when that table is empty
 DAILY_MSGS = {
     "Monday" : "<b>Monday - MINDEF/SAF Mission</b> \nThe mission of MINDEF/SAF is to enhance Singapore's peace and security through deterrence and diplomacy, and should these fail, to secure a swift and decisive victory over the aggressor.",
     "Tuesday" : "<b>Tuesday - DIS Mission</b> \nThe DIS will defend and dominate in the digital domain. As part of an integrated SAF, the DIS will enhance Singapore's security, from peace to war.",
@@ -167,3 +232,79 @@ DAILY_MSGS = {
     "Thursday" : "<b>Thursday - DIS Safety Messages</b>\n1. Safety is an Integral part of mission success.\n2. Zero accident is an achievable goal.\n3. Safety is an individual, team and command responsibility.",
     "Friday" :  "<b>Friday - MINDEF/SAF Mission</b> \nThe mission of MINDEF/SAF is to enhance Singapore's peace and security through deterrence and diplomacy, and should these fail, to secure a swift and decisive victory over the aggressor."
 }
+
+
+# =========================
+# EXPORT CONFIG
+# =========================
+
+# Rows fetched from the database per round trip while streaming an export
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+# Exports are built in memory up to this size, then spill to a temporary file
+EXPORT_SPOOL_MAX_BYTES = 4 * 1024 * 1024
+
+# Date range used by /export when none is given, counting back from today
+EXPORT_DEFAULT_DAYS = int(os.getenv("EXPORT_DEFAULT_DAYS", "30"))
+
+# Telegram bots cannot upload documents larger than this
+TELEGRAM_DOCUMENT_LIMIT_BYTES = 50 * 1024 * 1024
+
+
+# =========================
+# ANALYTICS CONFIG
+# =========================
+
+# Weeks shown by /medstats when no count is given, and the most it accepts
+MEDICAL_TRENDS_DEFAULT_WEEKS = 8
+MEDICAL_TRENDS_MAX_WEEKS = 52
+
+# How long the current week's rollup is reused before it is queried again
+MEDICAL_TRENDS_LIVE_TTL_SECONDS = int(os.getenv("MEDICAL_TRENDS_LIVE_TTL_SECONDS", "60"))
+
+# Entries listed under top diagnoses / repeat reporters
+MEDICAL_TRENDS_TOP_N = 5
+
+# RSO/RSI reports within the period that make someone a repeat reporter
+REPEAT_REPORTER_MIN_REPORTS = 3
+
+
+# =========================
+# AUDIT CONFIG
+# =========================
+
+# Audit events are buffered in memory and written in one insert this often
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "5"))
+
+# A buffer this full is written straight away instead of waiting for the timer
+AUDIT_FLUSH_BATCH_SIZE = int(os.getenv("AUDIT_FLUSH_BATCH_SIZE", "200"))
+
+# Events kept while the database is unreachable; the oldest are dropped beyond this
+AUDIT_BUFFER_MAX = int(os.getenv("AUDIT_BUFFER_MAX", "10000"))
+
+
+# =========================
+# IDEMPOTENCY CONFIG
+# =========================
+
+# How long a completed send/confirm is remembered, so a repeated tap on the same button is ignored
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "72"))
+
+# How long a send/confirm that is still running holds its key; if the process dies
+# mid-action, a retry can run once this has passed
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "120"))
+
+
+# =========================
+# SCHEDULER CONFIG
+# =========================
+
+# How long a replica may hold a job run before another replica can take the next firing
+SCHEDULER_LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "600"))
+
+# A scheduled broadcast missed while the bot was down is still sent this late
+BROADCAST_GRACE_MINUTES = int(os.getenv("BROADCAST_GRACE_MINUTES", "30"))
+
+# When expired idempotency keys are deleted (cron, SG time), and how late a missed run still happens
+RETENTION_CRON = os.getenv("RETENTION_CRON", "30 3 * * *")
+RETENTION_GRACE_HOURS = int(os.getenv("RETENTION_GRACE_HOURS", "24"))
@@ -1,6 +1,43 @@
+import hashlib
 import os
 
 BOT_TOKEN = os.getenv("BOT_TOKEN", "").strip()
 
 if not BOT_TOKEN:
     raise RuntimeError("BOT_TOKEN is not set in environment variables")
+
+# =========================
+# UPDATE DELIVERY
+# =========================
+
+# "polling" (default) or "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling").strip().lower()
+
+if BOT_MODE not in {"polling", "webhook"}:
+    raise RuntimeError("BOT_MODE must be either 'polling' or 'webhook'")
+
+# Public base URL Telegram pushes updates to, e.g. https://telebot.up.railway.app
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").strip().rstrip("/")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram").strip().strip("/")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0").strip()
+WEBHOOK_PORT = int(os.getenv("PORT", "8080"))
+WEBHOOK_HEALTH_PATH = os.getenv("WEBHOOK_HEALTH_PATH", "healthz").strip().strip("/")
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+# Every replica must verify against the same secret, so fall back to one derived
+# from the bot token rather than a random value per process.
+WEBHOOK_SECRET_TOKEN = (
+    os.getenv("WEBHOOK_SECRET_TOKEN", "").strip()
+    or hashlib.sha256(BOT_TOKEN.encode()).hexdigest()
+)
+
+if BOT_MODE == "webhook" and not WEBHOOK_URL:
+    raise RuntimeError("WEBHOOK_URL is required when BOT_MODE=webhook")
+
+# =========================
+# UPDATE PROCESSING
+# =========================
+
+# Updates from different users are handled in parallel up to this many at once;
+# updates from the same user/chat always run one after another.
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "16"))
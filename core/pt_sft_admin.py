@@ -1,24 +1,21 @@
 import re
-from datetime import datetime
+from datetime import time
 
-import pytz
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 from bot.helpers import reply
-from config.constants import IC_GROUP_CHAT_ID, SFT_TOPIC_ID
+from bot.shared.callback_data import pack_callbacks, unpack_callback
 from db.crud import get_all_instructor_names
-from services.db_service import SFTService, set_sft_window
-from services.auth_service import is_admin_user
+from services.db_service import SFTService
+from services.audit import audit
+from services.auth_service import is_tenant_admin
+from services.idempotency import callback_action, once_button, once_callback
+from services.tenants import tenant_for_update
+from utils.datetime_utils import now_sg
+from utils.input_normalizers import parse_date_flexible
 from utils.rate_limiter import user_rate_limiter
 
 
-SG_TZ = pytz.timezone("Asia/Singapore")
-
-
-def today_sg():
-    return datetime.now(SG_TZ).strftime("%d%m%Y")
-
-
 def _valid_time_range(text: str):
     """
     Expects HHMM-HHMM
@@ -37,16 +34,70 @@ def _valid_time_range(text: str):
     if hh1 > 23 or hh2 > 23 or mm1 > 59 or mm2 > 59:
         return None
 
-    return start, end
+    return time(hh1, mm1), time(hh2, mm2)
+
+
+def _parse_window(text: str):
+    """
+    Expects HHMM-HHMM for today, or DDMMYY HHMM-HHMM
+    """
+    parts = text.split()
+    if len(parts) == 1:
+        day = now_sg().date()
+    elif len(parts) == 2:
+        try:
+            day = parse_date_flexible(parts[0])
+        except ValueError:
+            return None
+    else:
+        return None
+
+    times = _valid_time_range(parts[-1])
+    if not times:
+        return None
+    return (day, *times)
 
 def _admin_menu_keyboard():
     return InlineKeyboardMarkup([
-        [InlineKeyboardButton("🕒 Set SFT timing", callback_data="ptadmin:set_timing")],
+        [InlineKeyboardButton("🕒 Open SFT window", callback_data="ptadmin:set_timing")],
+        [InlineKeyboardButton("🔒 Close SFT window", callback_data="ptadmin:close")],
         [InlineKeyboardButton("🗑️ Remove cadets from SFT", callback_data="ptadmin:remove")],
         [InlineKeyboardButton("📊 Generate SFT report", callback_data="ptadmin:generate")],
     ])
 
 
+async def _resolve_window(update, data: str, action: str):
+    """The window an action applies to: the one in the callback, or the only open one.
+
+    With several windows open and none chosen yet, asks which one and returns None.
+    """
+    _, _, window_id = data.partition("|")
+    if window_id:
+        window = SFTService.get_window(int(window_id), tenant_for_update(update).id)
+        if not window:
+            await reply(update, "❌ That SFT window is no longer open.", reply_markup=_admin_menu_keyboard())
+        return window
+
+    windows = SFTService.get_windows(tenant_for_update(update).id)
+    if not windows:
+        await reply(
+            update,
+            "❌ No open SFT window found. Open one first.",
+            reply_markup=_admin_menu_keyboard(),
+        )
+        return None
+    if len(windows) == 1:
+        return windows[0]
+
+    keyboard = [
+        [InlineKeyboardButton(f"🕒 {window.label}", callback_data=f"ptadmin:{action}|{window.id}")]
+        for window in windows
+    ]
+    keyboard.append([InlineKeyboardButton("⬅️ Back", callback_data="ptadmin:menu")])
+    await reply(update, "Select SFT window:", reply_markup=InlineKeyboardMarkup(keyboard))
+    return None
+
+
 async def _show_admin_menu(update, context):
     context.user_data["mode"] = "PT_ADMIN"
     context.user_data["pt_admin_state"] = "menu"
@@ -62,7 +113,7 @@ async def _show_admin_menu(update, context):
 # ENTRY POINT
 # =========================
 async def start_pt_admin(update, context):
-    if not is_admin_user(update.effective_user.id if update.effective_user else None):
+    if not is_tenant_admin(update):
         await reply(update, "❌ You are not authorised.")
         return
 
@@ -79,7 +130,7 @@ async def start_pt_admin(update, context):
 # CALLBACK HANDLER
 # =========================
 async def handle_pt_admin_callbacks(update, context):
-    if not is_admin_user(update.effective_user.id if update.effective_user else None):
+    if not is_tenant_admin(update):
         await reply(update, "❌ You are not authorised.")
         return
 
@@ -94,23 +145,33 @@ async def handle_pt_admin_callbacks(update, context):
         context.user_data["pt_admin_state"] = "awaiting_time_range"
         await reply(
             update,
-            "🕒 Enter SFT time range in 24H format.\nExample: `1500-1700`\n\n"
-            "⚠️ Setting a new timing will clear all existing SFT submissions.",
+            "🕒 Enter SFT time range in 24H format, optionally after a date.\n"
+            "Examples: `1500-1700` (today), `251026 1500-1700`\n\n"
+            "Windows already open stay open with their submissions.",
             parse_mode="Markdown",
         )
         return
 
-    if data == "ptadmin:remove":
-        window = SFTService.get_window()
+    if data == "ptadmin:close" or data.startswith("ptadmin:close|"):
+        window = await _resolve_window(update, data, "close")
         if not window:
-            await reply(
-                update,
-                "❌ No active SFT timing found. Set timing first.",
-                reply_markup=_admin_menu_keyboard(),
-            )
             return
 
-        submissions = SFTService.get_submissions_for_date(window.date)
+        SFTService.close_window(window.id)
+        audit(update, "sft.window_close", subject=window.label, window_id=window.id)
+        await reply(
+            update,
+            f"🔒 SFT window {window.label} closed. Its submissions are kept.",
+            reply_markup=_admin_menu_keyboard(),
+        )
+        return
+
+    if data == "ptadmin:remove" or data.startswith("ptadmin:remove|"):
+        window = await _resolve_window(update, data, "remove")
+        if not window:
+            return
+
+        submissions = SFTService.get_submissions(window.id)
         if not submissions:
             await reply(
                 update,
@@ -124,7 +185,7 @@ async def handle_pt_admin_callbacks(update, context):
             keyboard.append([
                 InlineKeyboardButton(
                     f"🗑️ {s.user_name} ({s.start}-{s.end})",
-                    callback_data=f"ptadmin:remove_user|{s.user_id}",
+                    callback_data=f"ptadmin:remove_user|{window.id}|{s.user_id}",
                 )
             ])
         keyboard.append([InlineKeyboardButton("⬅️ Back", callback_data="ptadmin:menu")])
@@ -137,23 +198,21 @@ async def handle_pt_admin_callbacks(update, context):
         return
 
     if data.startswith("ptadmin:remove_user|"):
-        user_id = int(data.split("|", 1)[1])
-        removed = SFTService.remove_submission(user_id)
+        _, window_id, user_id = data.split("|")
+        removed = SFTService.remove_submission(int(user_id), int(window_id))
+        if removed:
+            audit(update, "sft.submission_remove", subject=f"user {user_id}", window_id=int(window_id))
         message = "✅ Submission removed." if removed else "ℹ️ Submission already removed."
         await reply(update, message, reply_markup=_admin_menu_keyboard())
         return
 
-    if data == "ptadmin:generate":
-        window = SFTService.get_window()
+    if data == "ptadmin:generate" or data.startswith("ptadmin:generate|"):
+        window = await _resolve_window(update, data, "generate")
         if not window:
-            await reply(
-                update,
-                "❌ No active SFT timing found. Set timing first.",
-                reply_markup=_admin_menu_keyboard(),
-            )
             return
+        context.user_data["pending_sft_window"] = window.id
 
-        instructor_names = get_all_instructor_names()
+        instructor_names = get_all_instructor_names(tenant_for_update(update).id)
         if not instructor_names:
             await reply(
                 update,
@@ -163,8 +222,8 @@ async def handle_pt_admin_callbacks(update, context):
             return
 
         keyboard = [
-            [InlineKeyboardButton(name, callback_data=f"ptadmin:pick_instructor|{name}")]
-            for name in instructor_names
+            [InlineKeyboardButton(name, callback_data=data)]
+            for name, data in zip(instructor_names, pack_callbacks("ptadmin:pick_instructor", instructor_names))
         ]
         keyboard.append([InlineKeyboardButton("⬅️ Back", callback_data="ptadmin:menu")])
 
@@ -176,16 +235,20 @@ async def handle_pt_admin_callbacks(update, context):
         return
 
     if data.startswith("ptadmin:pick_instructor|"):
-        window = SFTService.get_window()
+        window_id = context.user_data.get("pending_sft_window")
+        window = SFTService.get_window(window_id, tenant_for_update(update).id) if window_id else None
         if not window:
             await reply(
                 update,
-                "❌ No active SFT timing found. Set timing first.",
+                "❌ The SFT window for this report is no longer open. Please generate report again.",
                 reply_markup=_admin_menu_keyboard(),
             )
             return
 
-        instructor_name = data.split("|", 1)[1]
+        _, instructor_name = unpack_callback(data)
+        if instructor_name is None:
+            await reply(update, "❌ Selection expired. Please generate report again.", reply_markup=_admin_menu_keyboard())
+            return
         context.user_data["pending_sft_instructor"] = instructor_name
 
         salutation_keyboard = InlineKeyboardMarkup([
@@ -204,11 +267,12 @@ async def handle_pt_admin_callbacks(update, context):
         return
 
     if data.startswith("ptadmin:pick_salutation|"):
-        window = SFTService.get_window()
+        window_id = context.user_data.get("pending_sft_window")
+        window = SFTService.get_window(window_id, tenant_for_update(update).id) if window_id else None
         if not window:
             await reply(
                 update,
-                "❌ No active SFT timing found. Set timing first.",
+                "❌ The SFT window for this report is no longer open. Please generate report again.",
                 reply_markup=_admin_menu_keyboard(),
             )
             return
@@ -223,12 +287,12 @@ async def handle_pt_admin_callbacks(update, context):
             return
 
         salutation = data.split("|", 1)[1]
-        summary = SFTService.generate_summary(window.date, instructor_name, salutation)
+        summary = SFTService.generate_summary(window, instructor_name, salutation)
         context.user_data["pending_sft_summary"] = summary
 
 
         keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("✅ Confirm & Send", callback_data="ptadmin:send_report")],
+            [InlineKeyboardButton("✅ Confirm & Send", callback_data=once_callback("ptadmin:send_report"))],
             [InlineKeyboardButton("⬅️ Back", callback_data="ptadmin:menu")],
         ])
 
@@ -240,21 +304,28 @@ async def handle_pt_admin_callbacks(update, context):
         )
         return
 
-    if data == "ptadmin:send_report":
+    if callback_action(data) == "ptadmin:send_report":
         summary = context.user_data.get("pending_sft_summary")
         if not summary:
             await reply(update, "❌ No report preview found.", reply_markup=_admin_menu_keyboard())
             return
-
-        await context.bot.send_message(
-            chat_id=IC_GROUP_CHAT_ID,
-            message_thread_id=SFT_TOPIC_ID,
-            text=summary,
-        )
+        async with once_button(update) as first:
+            if not first:
+                await reply(update, "ℹ️ This SFT report was already sent.", reply_markup=_admin_menu_keyboard())
+                return
+
+            tenant = tenant_for_update(update)
+            await context.bot.send_message(
+                chat_id=tenant.ic_group_chat_id,
+                message_thread_id=tenant.sft_topic_id,
+                text=summary,
+            )
+            audit(update, "sft.report_send", window_id=context.user_data.get("pending_sft_window"))
 
         await reply(update, "✅ SFT report sent to IC chat.", reply_markup=_admin_menu_keyboard())
         context.user_data.pop("pending_sft_summary", None)
         context.user_data.pop("pending_sft_instructor", None)
+        context.user_data.pop("pending_sft_window", None)
         return
 
     if data == "ptadmin:menu":
@@ -271,23 +342,19 @@ async def handle_pt_admin_text(update, context):
     if context.user_data.get("pt_admin_state") != "awaiting_time_range":
         return
 
-    result = _valid_time_range(update.message.text.strip())
+    result = _parse_window(update.message.text.strip())
     if not result:
-        await reply(update, "❌ Invalid format. Use HHMM-HHMM (24H).")
+        await reply(update, "❌ Invalid format. Use HHMM-HHMM or DDMMYY HHMM-HHMM (24H).")
         return
 
-    start, end = result
-    date = today_sg()
-
-    # Requirement: any new SFT timing clears all previous submissions.
-    SFTService.clear_submissions()
-    set_sft_window(date, start, end)
+    window = SFTService.open_window(*result, tenant_id=tenant_for_update(update).id)
+    audit(update, "sft.window_open", subject=window.label, window_id=window.id)
 
     await reply(
         update,
-        f"✅ *PT SFT window set*\n\n"
-        f"Date: {date}\n"
-        f"Time: {start}-{end}\n\n"
+        f"✅ *PT SFT window open*\n\n"
+        f"Date: {window.date_label}\n"
+        f"Time: {window.start_hhmm}-{window.end_hhmm}\n\n"
         f"Cadets may now submit SFT.",
         reply_markup=_admin_menu_keyboard(),
         parse_mode="Markdown",
@@ -1,7 +1,12 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 from bot.helpers import reply
+from bot.shared.callback_data import unpack_callback
+from services.audit import audit
 from services.db_service import SFTService
+from services.idempotency import callback_action, once_button, once_callback
+from services.sft_occupancy import activity_key
+from services.tenants import tenant_for_update
 from db.crud import get_user_by_telegram_id
 
 
@@ -39,18 +44,28 @@ async def handle_sft_callbacks(update, context):
     data = query.data
 
     # ------------------------------
-    # SAFETY: window must exist
+    # SAFETY: window must be open
     # ------------------------------
-    window = SFTService.get_window()
+    if data.startswith("sft_window|"):
+        window_id = int(data.split("|", 1)[1])
+    else:
+        window_id = context.user_data.get("sft_window_id")
+    window = SFTService.get_window(window_id, tenant_for_update(update).id)
     if not window:
         await reply(
             update,
-            "❌ PT SFT has not been opened by IC yet.\n"
-            "Please wait for instructions."
+            "❌ This SFT window is not open.\n"
+            "Please wait for instructions or use /start_sft again."
         )
         context.user_data.clear()
         return
 
+    if data.startswith("sft_window|"):
+        from bot.features.sft import show_activities
+
+        await show_activities(update, context, window)
+        return
+
     # ------------------------------
     # Resolve user via Telegram ID
     # ------------------------------
@@ -70,14 +85,18 @@ async def handle_sft_callbacks(update, context):
     context.user_data["user_name"] = user.full_name
 
     # Precompute allowed times
-    allowed_times = _generate_time_slots(window.start, window.end)
+    context.user_data["sft_window_id"] = window.id
+    allowed_times = _generate_time_slots(window.start_hhmm, window.end_hhmm)
     context.user_data["allowed_times"] = allowed_times
 
     # ------------------------------
     # ACTIVITY SELECTED
     # ------------------------------
     if data.startswith("sft_activity|"):
-        payload = data.split("|", 1)[1]
+        _, payload = unpack_callback(data)
+        if payload is None:
+            await reply(update, "Session expired. Please start again.")
+            return
 
         if "|" in payload:
             activity, location = payload.split("|", 1)
@@ -146,7 +165,7 @@ async def handle_sft_callbacks(update, context):
         )
 
         keyboard = [[
-            InlineKeyboardButton("✅ Confirm", callback_data="sft_confirm"),
+            InlineKeyboardButton("✅ Confirm", callback_data=once_callback("sft_confirm")),
             InlineKeyboardButton("❌ Cancel", callback_data="sft_cancel"),
         ]]
 
@@ -160,27 +179,45 @@ async def handle_sft_callbacks(update, context):
     # ------------------------------
     # CONFIRM SUBMISSION
     # ------------------------------
-    elif data == "sft_confirm":
+    elif callback_action(data) == "sft_confirm":
         try:
-            SFTService.add_submission(
-                user_id=context.user_data["user_id"],
-                user_name=context.user_data["user_name"],
-                activity=context.user_data["activity"],
-                location=context.user_data["location"],
-                start=context.user_data["start"],
-                end=context.user_data["end"],
-            )
-
+            async with once_button(update) as first:
+                if not first:
+                    await reply(update, "ℹ️ This SFT submission was already confirmed.")
+                    return
+                SFTService.add_submission(
+                    window.id,
+                    user_id=context.user_data["user_id"],
+                    user_name=context.user_data["user_name"],
+                    activity=context.user_data["activity"],
+                    location=context.user_data["location"],
+                    start=context.user_data["start"],
+                    end=context.user_data["end"],
+                )
+
+        # Raised out of the block, so the key is released and the button can be retried
         except ValueError as e:
             await reply(update, f"❌ {str(e)}")
             context.user_data.clear()
             return
 
+        key = activity_key(context.user_data["activity"], context.user_data["location"])
+        audit(
+            update,
+            "sft.submit",
+            subject=context.user_data["user_name"],
+            window_id=window.id,
+            activity=key,
+            start=context.user_data["start"],
+            end=context.user_data["end"],
+        )
+        shortfall = SFTService.shortfall(window.id, key)
         await reply(
             update,
             "✅ *SFT successfully submitted.*\n\n"
-            f"{context.user_data['activity']}{(' @ ' + context.user_data['location']) if context.user_data['location'] else ''}\n"
-            f"Time: {context.user_data['start']}-{context.user_data['end']}",
+            f"{key}\n"
+            f"Time: {context.user_data['start']}-{context.user_data['end']}"
+            + (f"\n\n⚠️ This group needs {shortfall} more cadet(s) before it can run." if shortfall else ""),
             parse_mode="Markdown",
         )
 
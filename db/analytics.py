@@ -0,0 +1,212 @@
+"""Weekly medical trend rollups.
+
+Counts are aggregated in SQL with one ``GROUP BY`` per rollup over Monday-based
+week buckets, per tenant. Finished weeks are cached for the life of the process;
+only the current week is re-queried, at most every ``MEDICAL_TRENDS_LIVE_TTL_SECONDS``.
+Medical writes in ``db.crud`` invalidate the week they touch, so back-dated
+reports and late diagnoses are still picked up. Writes made by another process only
+show up as a newer medical generation (see ``db.parade``), which drops every cached week.
+"""
+
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func
+
+from config.constants import MEDICAL_TRENDS_LIVE_TTL_SECONDS
+from db.models import MedicalEvent, MedicalStatus, User
+from db.parade import medical_generation
+
+# Event types whose diagnoses and reporters are tracked
+REPORTED_EVENT_TYPES = ("RSO", "RSI")
+TREND_SECTIONS = ("RSO", "RSI", "MA", "MC")
+
+
+@dataclass(slots=True)
+class WeekRollup:
+    week_start: date
+    counts: Counter = field(default_factory=Counter)  # RSO/RSI/MA reports and new MCs
+    diagnoses: Counter = field(default_factory=Counter)
+    reporters: Counter = field(default_factory=Counter)  # "RANK NAME" -> RSO/RSI reports
+
+
+@dataclass(frozen=True, slots=True)
+class TrendReport:
+    weeks: list[WeekRollup]
+    top_diagnoses: list[tuple[str, int]]
+    repeat_reporters: list[tuple[str, int]]
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _week_bucket(session, column):
+    """SQL expression for the Monday of the week ``column`` falls in."""
+    if session.get_bind().dialect.name == "sqlite":
+        return func.date(column, "weekday 0", "-6 days")
+    return func.date(func.date_trunc("week", column))
+
+
+def _as_date(value) -> date:
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _query_weeks(first: date, last: date, tenant_id: int | None = None) -> dict[date, WeekRollup]:
+    """Rollups for every week from ``first`` to ``last`` (both Mondays), four queries in all.
+
+    Limited to one tenant's users unless ``tenant_id`` is None.
+    """
+    from db.database import SessionLocal
+
+    since = datetime.combine(first, datetime.min.time())
+    until = datetime.combine(last + timedelta(days=7), datetime.min.time())
+    mondays = (first + timedelta(weeks=n) for n in range((last - first).days // 7 + 1))
+    weeks = {monday: WeekRollup(monday) for monday in mondays}
+    in_tenant = () if tenant_id is None else (User.tenant_id == tenant_id,)
+
+    with SessionLocal() as session:
+        event_week = _week_bucket(session, MedicalEvent.event_datetime)
+        in_range = (MedicalEvent.event_datetime >= since, MedicalEvent.event_datetime < until, *in_tenant)
+
+        for bucket, section, count in (
+            session.query(event_week, MedicalEvent.event_type, func.count())
+            .join(User, MedicalEvent.user_id == User.id)
+            .filter(*in_range)
+            .group_by(event_week, MedicalEvent.event_type)
+        ):
+            weeks[_as_date(bucket)].counts[section] += count
+
+        status_week = _week_bucket(session, MedicalStatus.start_date)
+        for bucket, count in (
+            session.query(status_week, func.count())
+            .join(User, MedicalStatus.user_id == User.id)
+            .filter(MedicalStatus.status_type == "MC", MedicalStatus.start_date >= first, MedicalStatus.start_date < until.date(), *in_tenant)
+            .group_by(status_week)
+        ):
+            weeks[_as_date(bucket)].counts["MC"] += count
+
+        diagnosis = func.upper(func.trim(MedicalEvent.diagnosis))
+        for bucket, name, count in (
+            session.query(event_week, diagnosis, func.count())
+            .join(User, MedicalEvent.user_id == User.id)
+            .filter(*in_range, MedicalEvent.event_type.in_(REPORTED_EVENT_TYPES), diagnosis != "")
+            .group_by(event_week, diagnosis)
+        ):
+            weeks[_as_date(bucket)].diagnoses[name] += count
+
+        for bucket, rank, full_name, count in (
+            session.query(event_week, User.rank, User.full_name, func.count())
+            .join(User, MedicalEvent.user_id == User.id)
+            .filter(*in_range, MedicalEvent.event_type.in_(REPORTED_EVENT_TYPES))
+            .group_by(event_week, User.id, User.rank, User.full_name)
+        ):
+            weeks[_as_date(bucket)].reporters[f"{rank} {full_name}"] += count
+
+    return weeks
+
+
+class MedicalTrends:
+    """Weekly rollups per tenant; ``None`` as the tenant covers every tenant."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._closed: dict[tuple[int | None, date], WeekRollup] = {}
+        self._current: dict[int | None, tuple[WeekRollup, float]] = {}
+        # Medical generation every cached week is at least as new as
+        self._generation = 0
+
+    def invalidate(self, day: date | datetime | None = None):
+        """Forgets the week containing ``day`` for every tenant, or everything when no day is given."""
+        with self._lock:
+            self._forget(day)
+
+    def _forget(self, day: date | datetime | None):
+        if day is None:
+            self._closed.clear()
+            self._current.clear()
+            return
+        monday = week_start(_as_date(day))
+        for key in [key for key in self._closed if key[1] == monday]:
+            del self._closed[key]
+        for tenant_id in [tenant_id for tenant_id, (week, _) in self._current.items() if week.week_start == monday]:
+            del self._current[tenant_id]
+
+    def apply(self, generation: int, *days: date | datetime):
+        """Forgets the weeks a committed local write at ``generation`` touched.
+
+        If another process wrote in between, which weeks it touched is unknown, so
+        everything is forgotten.
+        """
+        with self._lock:
+            if generation <= self._generation:
+                return
+            if generation == self._generation + 1:
+                for day in days:
+                    self._forget(day)
+            else:
+                self._forget(None)
+            self._generation = generation
+
+    def _catch_up(self) -> int:
+        from db.database import SessionLocal
+
+        with SessionLocal() as session:
+            generation = medical_generation(session)
+        with self._lock:
+            if generation > self._generation:
+                self._forget(None)
+                self._generation = generation
+        return generation
+
+    def weeks(self, count: int, today: date, tenant_id: int | None = None) -> list[WeekRollup]:
+        """The last ``count`` weeks up to and including the current one, oldest first."""
+        this_week = week_start(today)
+        mondays = [this_week - timedelta(weeks=n) for n in range(count - 1, -1, -1)]
+
+        # Read before querying, so the rows loaded are at least this new
+        generation = self._catch_up()
+        with self._lock:
+            current, loaded_at = self._current.get(tenant_id, (None, 0.0))
+            if current and current.week_start != this_week:
+                # The week rolled over; it is queried once more, in full, as a closed week
+                del self._current[tenant_id]
+                current = None
+            current_fresh = current and time.monotonic() - loaded_at < MEDICAL_TRENDS_LIVE_TTL_SECONDS
+            missing = [monday for monday in mondays[:-1] if (tenant_id, monday) not in self._closed]
+            if not current_fresh:
+                missing.append(this_week)
+
+        loaded = _query_weeks(min(missing), max(missing), tenant_id) if missing else {}
+        with self._lock:
+            # Not cached if a write landed meanwhile: the rows may predate it
+            if loaded and generation == self._generation:
+                for monday in missing:
+                    if monday == this_week:
+                        self._current[tenant_id] = (loaded[monday], time.monotonic())
+                    else:
+                        self._closed[(tenant_id, monday)] = loaded[monday]
+            cached = {monday: self._closed.get((tenant_id, monday)) for monday in mondays[:-1]}
+            cached[this_week] = self._current.get(tenant_id, (None, 0.0))[0]
+        result = [cached.get(monday) or loaded.get(monday) for monday in mondays]
+        if None in result:
+            # A week was invalidated while this call was querying
+            return self.weeks(count, today, tenant_id)
+        return result
+
+    def report(self, count: int, today: date, top: int, repeat_min: int, tenant_id: int | None = None) -> TrendReport:
+        weeks = self.weeks(count, today, tenant_id)
+        diagnoses = sum((week.diagnoses for week in weeks), Counter())
+        reporters = sum((week.reporters for week in weeks), Counter())
+        repeat = [(name, reports) for name, reports in reporters.most_common() if reports >= repeat_min]
+        return TrendReport(weeks, diagnoses.most_common(top), repeat[:top])
+
+
+medical_trends = MedicalTrends()
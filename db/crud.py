@@ -1,10 +1,15 @@
+from dataclasses import dataclass
 from datetime import date, datetime, time, timedelta
 
-from sqlalchemy import func
-from sqlalchemy import text
+from sqlalchemy import func, or_, update
+from sqlalchemy import insert, text
+from sqlalchemy.dialects import postgresql, sqlite
 
+from config.constants import MOVEMENT_FUTURE_GRACE_MINUTES
+from db.analytics import medical_trends
 from db.database import SessionLocal, session_scope
-from db.models import AdminApproval, MedicalEvent, MedicalStatus, MovementLog, SFTSession, SFTSubmission, User
+from db.models import AdminApproval, AppState, AuditEvent, BroadcastSchedule, CacheGeneration, CallbackValue, CurrentLocation, IdempotencyKey, MedicalEvent, MedicalStatus, MovementLog, ScheduledJob, SFTSession, SFTSubmission, Tenant, User
+from db.parade import ParadeRow, bump_medical_generation, event_row, parade_read_model, status_row
 from utils.input_normalizers import parse_date_flexible, parse_time_flexible
 from utils.datetime_utils import SG_TZ, now_sg
 
@@ -12,6 +17,11 @@ from utils.datetime_utils import SG_TZ, now_sg
 CLEAR_DATABASE_ACTION = "CLEAR_DATABASE"
 
 
+def _in_tenant(column, tenant_id: int | None) -> tuple:
+    """Filter clauses limiting ``column`` to one tenant; none when ``tenant_id`` is None."""
+    return () if tenant_id is None else (column == tenant_id,)
+
+
 def register_clear_database_approval(admin_telegram_id: int, window_minutes: int = 10) -> int:
     cutoff = now_sg() - timedelta(minutes=window_minutes)
     with session_scope() as session:
@@ -42,12 +52,13 @@ def get_user_by_telegram_id(telegram_id: int):
         return session.query(User).filter(User.telegram_id == telegram_id).first()
 
 
-def get_admin_telegram_ids() -> list[int]:
+def get_admin_telegram_ids(tenant_id: int | None = None) -> list[int]:
     with SessionLocal() as session:
         rows = session.query(User.telegram_id).filter(
             User.is_admin.is_(True),
             User.is_active.is_(True),
             User.telegram_id.isnot(None),
+            *_in_tenant(User.tenant_id, tenant_id),
         ).all()
     return [row[0] for row in rows]
 
@@ -71,6 +82,7 @@ def create_user(
     telegram_username: str | None = None,
     is_admin: bool = False,
     is_active: bool = True,
+    tenant_id: int | None = None,
 ):
     telegram_username = _normalize_username(telegram_username)
     if telegram_id is None and not telegram_username:
@@ -90,19 +102,29 @@ def create_user(
             role=role,
             is_admin=is_admin,
             is_active=is_active,
+            tenant_id=tenant_id,
         )
         session.add(user)
         session.flush()
         return user
 
 
-def clear_user_data() -> dict[str, int]:
+def clear_user_data(tenant_id: int | None = None) -> dict[str, int]:
+    """Deletes the users of one tenant (or all users) and every record that references them."""
     with session_scope() as session:
-        # Remove SFT submissions first because they reference users.
-        sft_submissions_deleted = session.query(SFTSubmission).delete(synchronize_session=False)
-        statuses_deleted = session.query(MedicalStatus).delete(synchronize_session=False)
-        events_deleted = session.query(MedicalEvent).delete(synchronize_session=False)
-        users_deleted = session.query(User).delete(synchronize_session=False)
+        user_ids = session.query(User.id).filter(*_in_tenant(User.tenant_id, tenant_id)).scalar_subquery()
+        # Remove SFT submissions and locations first because they reference users.
+        sft_submissions_deleted = session.query(SFTSubmission).filter(SFTSubmission.user_id.in_(user_ids)).delete(synchronize_session=False)
+        session.query(CurrentLocation).filter(CurrentLocation.user_id.in_(user_ids)).delete(synchronize_session=False)
+        session.query(MovementLog).filter(MovementLog.user_id.in_(user_ids)).update(
+            {MovementLog.user_id: None}, synchronize_session=False
+        )
+        statuses_deleted = session.query(MedicalStatus).filter(MedicalStatus.user_id.in_(user_ids)).delete(synchronize_session=False)
+        events_deleted = session.query(MedicalEvent).filter(MedicalEvent.user_id.in_(user_ids)).delete(synchronize_session=False)
+        users_deleted = session.query(User).filter(*_in_tenant(User.tenant_id, tenant_id)).delete(synchronize_session=False)
+        bump_medical_generation(session)
+    parade_read_model.invalidate()
+    medical_trends.invalidate()
     return {
         "sft_submissions": sft_submissions_deleted,
         "medical_statuses": statuses_deleted,
@@ -114,8 +136,10 @@ def clear_user_data() -> dict[str, int]:
 def clear_all_data() -> dict[str, int]:
     clear_targets = [
         (AdminApproval.__tablename__, "admin_approvals", AdminApproval),
+        (AppState.__tablename__, "app_state", AppState),
         (SFTSubmission.__tablename__, "sft_submissions", SFTSubmission),
         (SFTSession.__tablename__, "sft_sessions", SFTSession),
+        (CurrentLocation.__tablename__, "current_locations", CurrentLocation),
         (MovementLog.__tablename__, "movement_logs", MovementLog),
         (MedicalStatus.__tablename__, "medical_statuses", MedicalStatus),
         (MedicalEvent.__tablename__, "medical_events", MedicalEvent),
@@ -130,25 +154,78 @@ def clear_all_data() -> dict[str, int]:
 
         table_sql = ", ".join(table_name for table_name, _, _ in clear_targets)
         session.execute(text(f"TRUNCATE TABLE {table_sql} RESTART IDENTITY CASCADE"))
+        bump_medical_generation(session)
 
+    parade_read_model.invalidate()
+    medical_trends.invalidate()
     return counts
 
 
-def list_users(limit: int = 200) -> list[User]:
+def get_all_cadet_names(tenant_id: int | None = None):
     with SessionLocal() as session:
-        return session.query(User).order_by(User.rank, User.full_name).limit(limit).all()
+        rows = session.query(User.rank, User.full_name).filter(
+            func.lower(User.role) == "cadet",
+            User.is_active.is_(True),
+            *_in_tenant(User.tenant_id, tenant_id),
+        ).all()
+    return [rank + " " + full_name for rank, full_name in rows]
 
 
-def get_all_cadet_names():
+def get_all_instructor_names(tenant_id: int | None = None):
     with SessionLocal() as session:
-        records = session.query(User).filter(func.lower(User.role) == "cadet", User.is_active.is_(True)).all()
-    return [record.rank + " " + record.full_name for record in records]
+        rows = session.query(User.rank, User.full_name).filter(
+            func.lower(User.role) == "instructor",
+            *_in_tenant(User.tenant_id, tenant_id),
+        ).all()
+    return [rank + " " + full_name for rank, full_name in rows]
 
 
-def get_all_instructor_names():
-    with SessionLocal() as session:
-        records = session.query(User).filter(func.lower(User.role) == "instructor").all()
-    return [record.rank + " " + record.full_name for record in records]
+@dataclass(frozen=True, slots=True)
+class _MedicalChange:
+    """The read-model rows and calendar days one medical write touched."""
+
+    events: tuple[ParadeRow, ...] = ()
+    statuses: tuple[ParadeRow, ...] = ()
+    days: tuple[date | datetime, ...] = ()
+
+    @classmethod
+    def of_event(cls, row: ParadeRow) -> "_MedicalChange":
+        return cls(events=(row,), days=(row.event_datetime,))
+
+    @classmethod
+    def merge(cls, changes) -> "_MedicalChange":
+        changes = [change for change in changes if change]
+        return cls(
+            events=tuple(row for change in changes for row in change.events),
+            statuses=tuple(row for change in changes for row in change.statuses),
+            days=tuple(day for change in changes for day in change.days),
+        )
+
+    def publish(self, generation: int) -> None:
+        parade_read_model.apply(generation, events=self.events, statuses=self.statuses)
+        medical_trends.apply(generation, *self.days)
+
+
+def _write_medical(write, *args):
+    """Runs ``write(session, *args)`` in its own transaction and publishes what it changed."""
+    with session_scope() as session:
+        result, change = write(session, *args)
+        if change is None:
+            return result
+        generation = bump_medical_generation(session)
+    change.publish(generation)
+    return result
+
+
+def _find_user(session, name: str, tenant_id: int | None) -> User:
+    parts = name.split(maxsplit=1)
+    if len(parts) != 2:
+        raise ValueError("Invalid name format")
+    rank, full_name = parts
+    user = session.query(User).filter(User.rank == rank, User.full_name == full_name, *_in_tenant(User.tenant_id, tenant_id)).first()
+    if not user:
+        raise ValueError("User not found")
+    return user
 
 
 def create_medical_event(
@@ -171,7 +248,11 @@ def create_medical_event(
         )
         session.add(event)
         session.flush()
-        return event
+        row = event_row(event, session.get(User, user_id))
+        generation = bump_medical_generation(session)
+    parade_read_model.apply(generation, events=(row,))
+    medical_trends.apply(generation, row.event_datetime)
+    return event
 
 
 def create_medical_status(
@@ -193,21 +274,12 @@ def create_medical_status(
         )
         session.add(status)
         session.flush()
-        return status
-
-
-def get_active_statuses(today):
-    if isinstance(today, str):
-        today = datetime.strptime(today, "%Y-%m-%d").date()
-
-    with SessionLocal() as session:
-        return (
-            session.query(MedicalStatus, User, MedicalEvent)
-            .join(User, MedicalStatus.user_id == User.id)
-            .join(MedicalEvent, MedicalStatus.source_event_id == MedicalEvent.id)
-            .filter(MedicalStatus.start_date <= today, MedicalStatus.end_date >= today)
-            .all()
-        )
+        event = session.get(MedicalEvent, source_event_id) if source_event_id is not None else None
+        row = status_row(status, session.get(User, user_id), event) if event else None
+        generation = bump_medical_generation(session)
+    parade_read_model.apply(generation, statuses=(row,) if row else ())
+    medical_trends.apply(generation, start_date)
+    return status
 
 
 def delete_expired_statuses_and_events(target_date: date) -> tuple[int, int]:
@@ -215,10 +287,13 @@ def delete_expired_statuses_and_events(target_date: date) -> tuple[int, int]:
         target_start = datetime.combine(target_date, time.min, tzinfo=SG_TZ)
         statuses_deleted = session.query(MedicalStatus).filter(MedicalStatus.end_date < target_date).delete(synchronize_session=False)
         events_deleted = session.query(MedicalEvent).filter(MedicalEvent.event_datetime < target_start).delete(synchronize_session=False)
+        generation = bump_medical_generation(session)
+    parade_read_model.prune(generation, target_date)
+    medical_trends.invalidate()
     return statuses_deleted, events_deleted
 
 
-def get_user_records(name: str):
+def get_user_records(name: str, tenant_id: int | None = None):
     parts = name.split(maxsplit=1)
     if len(parts) != 2:
         return []
@@ -227,7 +302,7 @@ def get_user_records(name: str):
         return (
             session.query(MedicalEvent)
             .join(User)
-            .filter(User.rank == rank, User.full_name == full_name, MedicalEvent.event_type == "RSO")
+            .filter(User.rank == rank, User.full_name == full_name, MedicalEvent.event_type == "RSO", *_in_tenant(User.tenant_id, tenant_id))
             .all()
         )
 
@@ -236,54 +311,52 @@ def _has_diagnosis(value: str | None) -> bool:
     return bool(value and value.strip())
 
 
+def _update_user_record(session, record_id: int, symptoms: str, diagnosis: str, status: str, start_date: str, end_date: str):
+    record = session.query(MedicalEvent).filter(MedicalEvent.id == record_id).first()
+    if not record:
+        return None, None
+    if _has_diagnosis(record.diagnosis):
+        return record, None
+
+    record.symptoms = symptoms
+    record.diagnosis = diagnosis
+    mc_status = MedicalStatus(
+        user_id=record.user_id,
+        status_type="MC",
+        description=status,
+        start_date=parse_date_flexible(start_date),
+        end_date=parse_date_flexible(end_date),
+        source_event_id=record.id,
+    )
+    session.add(mc_status)
+    session.flush()
+    event, mc_row = event_row(record, record.user), status_row(mc_status, record.user, record)
+    return record, _MedicalChange(events=(event,), statuses=(mc_row,), days=(event.event_datetime, mc_row.start_date))
+
+
 def update_user_record(record_id: int, symptoms: str, diagnosis: str, status: str, start_date: str, end_date: str):
-    with session_scope() as session:
-        record = session.query(MedicalEvent).filter(MedicalEvent.id == record_id).first()
-        if not record:
-            return None
-        if _has_diagnosis(record.diagnosis):
-            return record
-
-        record.symptoms = symptoms
-        record.diagnosis = diagnosis
-        session.add(
-            MedicalStatus(
-                user_id=record.user_id,
-                status_type="MC",
-                description=status,
-                start_date=parse_date_flexible(start_date),
-                end_date=parse_date_flexible(end_date),
-                source_event_id=record.id,
-            )
-        )
-        session.flush()
-        return record
+    return _write_medical(_update_user_record, record_id, symptoms, diagnosis, status, start_date, end_date)
 
 
-def create_user_record(name: str, symptoms: str, diagnosis: str | None = None):
-    parts = name.split(maxsplit=1)
-    if len(parts) != 2:
-        raise ValueError("Invalid name format")
-    rank, full_name = parts
+def _create_user_record(session, name: str, symptoms: str, diagnosis: str | None = None, tenant_id: int | None = None):
+    user = _find_user(session, name, tenant_id)
+    event = MedicalEvent(
+        user_id=user.id,
+        event_type="RSO",
+        symptoms=symptoms,
+        diagnosis=diagnosis,
+        event_datetime=now_sg().replace(microsecond=0),
+    )
+    session.add(event)
+    session.flush()
+    return event, _MedicalChange.of_event(event_row(event, user))
 
-    with session_scope() as session:
-        user = session.query(User).filter(User.rank == rank, User.full_name == full_name).first()
-        if not user:
-            raise ValueError("User not found")
 
-        event = MedicalEvent(
-            user_id=user.id,
-            event_type="RSO",
-            symptoms=symptoms,
-            diagnosis=diagnosis,
-            event_datetime=now_sg().replace(microsecond=0),
-        )
-        session.add(event)
-        session.flush()
-        return event
+def create_user_record(name: str, symptoms: str, diagnosis: str | None = None, tenant_id: int | None = None):
+    return _write_medical(_create_user_record, name, symptoms, diagnosis, tenant_id)
 
 
-def get_ma_records(name: str):
+def get_ma_records(name: str, tenant_id: int | None = None):
     parts = name.split(maxsplit=1)
     if len(parts) != 2:
         return []
@@ -292,19 +365,19 @@ def get_ma_records(name: str):
         return (
             session.query(MedicalEvent)
             .join(User)
-            .filter(User.rank == rank, User.full_name == full_name, MedicalEvent.event_type == "MA")
+            .filter(User.rank == rank, User.full_name == full_name, MedicalEvent.event_type == "MA", *_in_tenant(User.tenant_id, tenant_id))
             .all()
         )
 
 
-def create_ma_record(name: str, appointment: str, appointment_location: str, appointment_date: str, appointment_time: str):
+def create_ma_record(name: str, appointment: str, appointment_location: str, appointment_date: str, appointment_time: str, tenant_id: int | None = None):
     parts = name.split(maxsplit=1)
     if len(parts) != 2:
         raise ValueError("Invalid name format")
     rank, full_name = parts
 
     with session_scope() as session:
-        user = session.query(User).filter(User.rank == rank, User.full_name == full_name).first()
+        user = session.query(User).filter(User.rank == rank, User.full_name == full_name, *_in_tenant(User.tenant_id, tenant_id)).first()
         if not user:
             raise ValueError("User not found")
 
@@ -322,7 +395,11 @@ def create_ma_record(name: str, appointment: str, appointment_location: str, app
         )
         session.add(event)
         session.flush()
-        return event
+        row = event_row(event, user)
+        generation = bump_medical_generation(session)
+    parade_read_model.apply(generation, events=(row,))
+    medical_trends.apply(generation, row.event_datetime)
+    return event
 
 
 def update_ma_record(record_id: int, appointment: str, appointment_location: str, appointment_date: str, appointment_time: str, instructor: str | None = None):
@@ -331,6 +408,7 @@ def update_ma_record(record_id: int, appointment: str, appointment_location: str
         if not record:
             return None
 
+        previous_datetime = record.event_datetime
         record.appointment_type = appointment
         record.location = appointment_location
         record.event_datetime = datetime.combine(
@@ -341,10 +419,14 @@ def update_ma_record(record_id: int, appointment: str, appointment_location: str
         if instructor:
             record.endorsed_by = instructor
         session.flush()
-        return record
+        row = event_row(record, record.user)
+        generation = bump_medical_generation(session)
+    parade_read_model.apply(generation, events=(row,))
+    medical_trends.apply(generation, previous_datetime, row.event_datetime)
+    return record
 
 
-def get_user_rsi_records(name: str):
+def get_user_rsi_records(name: str, tenant_id: int | None = None):
     parts = name.split(maxsplit=1)
     if len(parts) != 2:
         return []
@@ -353,109 +435,407 @@ def get_user_rsi_records(name: str):
         return (
             session.query(MedicalEvent)
             .join(User)
-            .filter(User.rank == rank, User.full_name == full_name, MedicalEvent.event_type == "RSI")
+            .filter(User.rank == rank, User.full_name == full_name, MedicalEvent.event_type == "RSI", *_in_tenant(User.tenant_id, tenant_id))
             .all()
         )
 
 
-def create_rsi_record(name: str, symptoms: str, diagnosis: str | None = None):
+def _create_rsi_record(session, name: str, symptoms: str, diagnosis: str | None = None, tenant_id: int | None = None):
+    user = _find_user(session, name, tenant_id)
+    event = MedicalEvent(
+        user_id=user.id,
+        event_type="RSI",
+        symptoms=symptoms,
+        diagnosis=diagnosis or "",
+        event_datetime=now_sg().replace(microsecond=0),
+    )
+    session.add(event)
+    session.flush()
+    return event, _MedicalChange.of_event(event_row(event, user))
+
+
+def create_rsi_record(name: str, symptoms: str, diagnosis: str | None = None, tenant_id: int | None = None):
+    return _write_medical(_create_rsi_record, name, symptoms, diagnosis, tenant_id)
+
+
+def _update_rsi_record(session, record_id: int, diagnosis: str, status_type: str, status: str, start_date: str, end_date: str):
+    record = session.query(MedicalEvent).filter(MedicalEvent.id == record_id).first()
+    if not record:
+        return None, None
+    if _has_diagnosis(record.diagnosis):
+        return record, None
+
+    record.diagnosis = diagnosis
+    rsi_status = None
+    if status != "N/A":
+        rsi_status = MedicalStatus(
+            user_id=record.user_id,
+            status_type=status_type,
+            description=status,
+            start_date=parse_date_flexible(start_date),
+            end_date=parse_date_flexible(end_date),
+            source_event_id=record.id,
+        )
+        session.add(rsi_status)
+    session.flush()
+    event = event_row(record, record.user)
+    if not rsi_status:
+        return record, _MedicalChange.of_event(event)
+    new_status_row = status_row(rsi_status, record.user, record)
+    return record, _MedicalChange(events=(event,), statuses=(new_status_row,), days=(event.event_datetime, new_status_row.start_date))
+
+
+def update_rsi_record(record_id: int, diagnosis: str, status_type: str, status: str, start_date: str, end_date: str):
+    return _write_medical(_update_rsi_record, record_id, diagnosis, status_type, status, start_date, end_date)
+
+
+def save_pending_reports(reports: list[dict], tenant_id: int | None = None) -> None:
+    """Saves a batch of RSO/RSI reports and updates in one transaction.
+
+    A report that fails (e.g. a name no longer on the roster) rolls back the whole
+    batch, so sending it again cannot store the others twice.
+    """
+    changes = []
+    with session_scope() as session:
+        for report in reports:
+            mode = report.get("mode")
+            if mode == "report":
+                _, change = _create_user_record(session, report.get("name", ""), report.get("symptoms", ""), report.get("diagnosis", ""), tenant_id)
+            elif mode == "update":
+                _, change = _update_user_record(
+                    session,
+                    report.get("record_id"),
+                    report.get("symptoms", ""),
+                    report.get("diagnosis", ""),
+                    report.get("status", ""),
+                    report.get("start_date", ""),
+                    report.get("end_date", ""),
+                )
+            elif mode == "rsi_report":
+                _, change = _create_rsi_record(session, report.get("name", ""), report.get("symptoms", ""), report.get("diagnosis", ""), tenant_id)
+            elif mode == "rsi_update":
+                _, change = _update_rsi_record(
+                    session,
+                    report.get("record_id"),
+                    report.get("diagnosis", ""),
+                    report.get("status_type", "MC"),
+                    report.get("status", ""),
+                    report.get("start_date", ""),
+                    report.get("end_date", ""),
+                )
+            else:
+                continue
+            changes.append(change)
+        generation = bump_medical_generation(session)
+    _MedicalChange.merge(changes).publish(generation)
+
+
+def count_cadets(tenant_id: int | None = None) -> int:
+    """Total strength, counted in the database rather than by loading every cadet."""
+    with SessionLocal() as session:
+        return session.query(func.count(User.id)).filter(
+            func.lower(User.role) == "cadet",
+            *_in_tenant(User.tenant_id, tenant_id),
+        ).scalar() or 0
+
+
+def get_all_instructors():
+    with SessionLocal() as session:
+        return session.query(User).filter(func.lower(User.role) == "instructor").all()
+
+
+def _dialect_insert(session, model):
+    """INSERT supporting ON CONFLICT for the dialect the session is bound to."""
+    if session.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+# ---------- Movements ----------
+
+def movement_datetime(time_hhmm: str, now: datetime) -> datetime:
+    """When a movement reported at ``now`` (naive SG time) with the typed ``time_hhmm`` happened.
+
+    A time later than now is yesterday's: stored as today's, it would be ahead of
+    every real move that day and the current-location guard would refuse them all.
+    """
+    moved_at = datetime.combine(now.date(), parse_time_flexible(time_hhmm))
+    if moved_at > now + timedelta(minutes=MOVEMENT_FUTURE_GRACE_MINUTES):
+        moved_at -= timedelta(days=1)
+    return moved_at
+
+
+def record_movement(
+    names: list[str],
+    from_location: str,
+    to_location: str,
+    time_hhmm: str,
+    created_by: int,
+    tenant_id: int | None = None,
+) -> list[tuple[str | None, str]]:
+    """Logs one movement row per cadet and moves their current location.
+
+    Returns a (previous location or None, new location) pair for every cadet whose
+    current location actually changed: a back-dated report or a move to where the cadet
+    already is leaves nothing to refresh.
+    """
+    moved_at = movement_datetime(time_hhmm, now_sg().replace(tzinfo=None))
+    wanted = {tuple(name.split(maxsplit=1)) for name in names}
+
+    with session_scope() as session:
+        users = session.query(User.id, User.rank, User.full_name).filter(
+            User.full_name.in_([full_name for _, full_name in wanted]),
+            *_in_tenant(User.tenant_id, tenant_id),
+        ).all()
+        user_ids = [user_id for user_id, rank, full_name in users if (rank, full_name) in wanted]
+        if not user_ids:
+            return []
+
+        previous = {
+            user_id: (location, last_moved_at)
+            for user_id, location, last_moved_at in session.query(
+                CurrentLocation.user_id, CurrentLocation.location, CurrentLocation.moved_at
+            ).filter(CurrentLocation.user_id.in_(user_ids))
+        }
+
+        session.execute(
+            insert(MovementLog),
+            [
+                {
+                    "user_id": user_id,
+                    "from_location": from_location,
+                    "to_location": to_location,
+                    "time": time_hhmm,
+                    "moved_at": moved_at,
+                    "created_by": created_by,
+                    "created_at": now_sg(),
+                }
+                for user_id in user_ids
+            ],
+        )
+
+        upsert = _dialect_insert(session, CurrentLocation)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[CurrentLocation.user_id],
+            set_={
+                "location": upsert.excluded.location,
+                "from_location": upsert.excluded.from_location,
+                "moved_at": upsert.excluded.moved_at,
+                "updated_at": upsert.excluded.updated_at,
+            },
+            # A back-dated report must not overwrite a later known position.
+            where=CurrentLocation.moved_at <= upsert.excluded.moved_at,
+        )
+        session.execute(
+            upsert,
+            [
+                {
+                    "user_id": user_id,
+                    "location": to_location,
+                    "from_location": from_location,
+                    "moved_at": moved_at,
+                    "updated_at": now_sg(),
+                }
+                for user_id in user_ids
+            ],
+        )
+    return [
+        (previous[user_id][0] if user_id in previous else None, to_location)
+        for user_id in user_ids
+        if user_id not in previous or (previous[user_id][1] <= moved_at and previous[user_id][0] != to_location)
+    ]
+
+
+def get_current_locations(tenant_id: int | None = None) -> list[tuple[str, str, str | None, datetime | None]]:
+    """(rank, full_name, location, moved_at) for every active cadet; location is None if never moved."""
+    with SessionLocal() as session:
+        return [
+            tuple(row)
+            for row in session.query(User.rank, User.full_name, CurrentLocation.location, CurrentLocation.moved_at)
+            .outerjoin(CurrentLocation, CurrentLocation.user_id == User.id)
+            .filter(func.lower(User.role) == "cadet", User.is_active.is_(True), *_in_tenant(User.tenant_id, tenant_id))
+            .order_by(User.full_name)
+            .all()
+        ]
+
+
+def get_location_headcounts(tenant_id: int | None = None) -> tuple[dict[str, int], int]:
+    """Active cadets per current location, plus the total number of active cadets."""
+    with SessionLocal() as session:
+        cadet = (func.lower(User.role) == "cadet", User.is_active.is_(True), *_in_tenant(User.tenant_id, tenant_id))
+        counts = dict(
+            session.query(CurrentLocation.location, func.count())
+            .join(User, CurrentLocation.user_id == User.id)
+            .filter(*cadet)
+            .group_by(CurrentLocation.location)
+            .all()
+        )
+        total = session.query(func.count(User.id)).filter(*cadet).scalar() or 0
+    return counts, total
+
+
+def get_movement_history(name: str, limit: int = 10, tenant_id: int | None = None) -> list[MovementLog]:
     parts = name.split(maxsplit=1)
     if len(parts) != 2:
         raise ValueError("Invalid name format")
     rank, full_name = parts
+    with SessionLocal() as session:
+        return (
+            session.query(MovementLog)
+            .join(User, MovementLog.user_id == User.id)
+            .filter(User.rank == rank, User.full_name == full_name, *_in_tenant(User.tenant_id, tenant_id))
+            .order_by(MovementLog.moved_at.desc(), MovementLog.id.desc())
+            .limit(limit)
+            .all()
+        )
 
-    with session_scope() as session:
-        user = session.query(User).filter(User.rank == rank, User.full_name == full_name).first()
-        if not user:
-            raise ValueError("User not found")
 
-        event = MedicalEvent(
-            user_id=user.id,
-            event_type="RSI",
-            symptoms=symptoms,
-            diagnosis=diagnosis or "",
-            event_datetime=now_sg().replace(microsecond=0),
-        )
-        session.add(event)
-        session.flush()
-        return event
+# ---------- App state ----------
 
+def get_app_state(key: str) -> str | None:
+    with SessionLocal() as session:
+        row = session.get(AppState, key)
+        return row.value if row else None
 
-def update_rsi_record(record_id: int, diagnosis: str, status_type: str, status: str, start_date: str, end_date: str):
+
+def set_app_state(key: str, value: str) -> None:
     with session_scope() as session:
-        record = session.query(MedicalEvent).filter(MedicalEvent.id == record_id).first()
-        if not record:
-            return None
-        if _has_diagnosis(record.diagnosis):
-            return record
-
-        record.diagnosis = diagnosis
-        if status != "N/A":
-            session.add(
-                MedicalStatus(
-                    user_id=record.user_id,
-                    status_type=status_type,
-                    description=status,
-                    start_date=parse_date_flexible(start_date),
-                    end_date=parse_date_flexible(end_date),
-                    source_event_id=record.id,
-                )
-            )
-        session.flush()
-        return record
+        row = session.get(AppState, key)
+        if row:
+            row.value = value
+        else:
+            session.add(AppState(key=key, value=value))
 
 
-def get_medical_events():
+# ---------- Broadcast schedules ----------
+
+def get_active_broadcast_schedules() -> list[BroadcastSchedule]:
     with SessionLocal() as session:
-        return session.query(MedicalEvent, User).join(User, MedicalEvent.user_id == User.id).all()
+        return (
+            session.query(BroadcastSchedule)
+            .filter(BroadcastSchedule.is_active.is_(True))
+            .order_by(BroadcastSchedule.id)
+            .all()
+        )
 
 
-def get_all_cadets():
+def get_broadcast_schedules_version() -> tuple:
+    """Cheap fingerprint of the table; changes on any insert, delete or ORM update."""
     with SessionLocal() as session:
-        return session.query(User).filter(func.lower(User.role) == "cadet").all()
+        count, last_id, last_update = session.query(
+            func.count(BroadcastSchedule.id),
+            func.max(BroadcastSchedule.id),
+            func.max(BroadcastSchedule.updated_at),
+        ).one()
+        return count, last_id, last_update
 
 
-def get_all_instructors():
-    with SessionLocal() as session:
-        return session.query(User).filter(func.lower(User.role) == "instructor").all()
+BROADCAST_SEEDED_KEY = "broadcast_schedules.seeded"
+
+
+def seed_broadcast_schedules(schedules: list[dict]) -> int:
+    """Inserts the given schedules once per database, into an empty table; returns how many were added.
+
+    An app_state marker records the seeding, so defaults an admin deleted stay deleted,
+    and claiming it with ON CONFLICT DO NOTHING means only one replica seeds.
+    """
+    with session_scope() as session:
+        claimed = session.execute(
+            _dialect_insert(session, AppState)
+            .values(key=BROADCAST_SEEDED_KEY, value=now_sg().isoformat(), updated_at=now_sg())
+            .on_conflict_do_nothing(index_elements=[AppState.key])
+        ).rowcount
+        if claimed != 1 or session.query(BroadcastSchedule.id).first():
+            return 0
+        session.add_all(BroadcastSchedule(**schedule) for schedule in schedules)
+        return len(schedules)
 
 
 # ---------- SFT (Persistent) ----------
 
-def get_active_sft_session() -> SFTSession | None:
+def get_open_sft_sessions(tenant_id: int | None = None) -> list[SFTSession]:
+    with SessionLocal() as session:
+        return (
+            session.query(SFTSession)
+            .filter(SFTSession.is_active.is_(True), *_in_tenant(SFTSession.tenant_id, tenant_id))
+            .order_by(SFTSession.date, SFTSession.start)
+            .all()
+        )
+
+
+def get_sft_session(session_id: int) -> SFTSession | None:
     with SessionLocal() as session:
-        return session.query(SFTSession).filter(SFTSession.is_active.is_(True)).order_by(SFTSession.id.desc()).first()
+        return session.get(SFTSession, session_id)
 
 
-def set_active_sft_session(date_str: str, start: str, end: str) -> SFTSession:
+def open_sft_session(day: date, start: time, end: time, tenant_id: int | None = None) -> SFTSession:
+    """Opens a window alongside any already open; re-opening the same window reuses it."""
     with session_scope() as session:
-        session.query(SFTSession).filter(SFTSession.is_active.is_(True)).update({SFTSession.is_active: False})
-        active = SFTSession(date=date_str, start=start, end=end, is_active=True)
-        session.add(active)
+        existing = (
+            session.query(SFTSession)
+            .filter(SFTSession.date == day, SFTSession.start == start, SFTSession.end == end, SFTSession.tenant_id == tenant_id)
+            .order_by(SFTSession.id.desc())
+            .first()
+        )
+        if existing:
+            existing.is_active = True
+            return existing
+        window = SFTSession(tenant_id=tenant_id, date=day, start=start, end=end, is_active=True)
+        session.add(window)
         session.flush()
-        return active
+        return window
 
 
-def clear_active_sft_session() -> None:
+def close_sft_session(session_id: int | None = None) -> None:
+    """Closes one window, or every open one. Submissions are kept as history."""
     with session_scope() as session:
-        session.query(SFTSession).filter(SFTSession.is_active.is_(True)).update({SFTSession.is_active: False})
+        query = session.query(SFTSession).filter(SFTSession.is_active.is_(True))
+        if session_id is not None:
+            query = query.filter(SFTSession.id == session_id)
+        query.update({SFTSession.is_active: False}, synchronize_session=False)
 
 
-def add_sft_submission(user_id: int, user_name: str, activity: str, location: str, start: str, end: str) -> SFTSubmission:
+def add_sft_submission(
+    session_id: int,
+    user_id: int,
+    user_name: str,
+    activity: str,
+    location: str,
+    start: str,
+    end: str,
+    check=None,
+) -> SFTSubmission:
+    """Stores the user's submission to an open window, replacing any earlier one.
+
+    ``check`` is called with the (start, end) of the other submissions to the same
+    activity in the window and may raise to abort. Submissions to one window are
+    serialised by a row lock on it (PostgreSQL) or by the write lock the DELETE takes
+    (SQLite), so no other submission lands between the check and the insert.
+    """
     with session_scope() as session:
-        active = session.query(SFTSession).filter(SFTSession.is_active.is_(True)).order_by(SFTSession.id.desc()).first()
-        if not active:
-            raise ValueError("SFT window not set")
+        window = session.query(SFTSession).filter(SFTSession.id == session_id).with_for_update().first()
+        if not window or not window.is_active:
+            raise ValueError("This SFT window is closed")
 
-        existing = session.query(SFTSubmission).filter(
-            SFTSubmission.session_id == active.id,
+        # One submission per cadet per window; a new one replaces the old
+        session.query(SFTSubmission).filter(
+            SFTSubmission.session_id == session_id,
             SFTSubmission.user_id == user_id,
-        ).all()
-        for item in existing:
-            session.delete(item)
+        ).delete(synchronize_session=False)
+
+        if check:
+            check(
+                session.query(SFTSubmission.start, SFTSubmission.end)
+                .filter(
+                    SFTSubmission.session_id == session_id,
+                    SFTSubmission.activity == activity,
+                    SFTSubmission.location == location,
+                )
+                .all()
+            )
 
         submission = SFTSubmission(
-            session_id=active.id,
+            session_id=session_id,
             user_id=user_id,
             user_name=user_name,
             activity=activity,
@@ -468,31 +848,206 @@ def add_sft_submission(user_id: int, user_name: str, activity: str, location: st
         return submission
 
 
-def remove_sft_submission(user_id: int) -> bool:
-    with session_scope() as session:
-        active = session.query(SFTSession).filter(SFTSession.is_active.is_(True)).order_by(SFTSession.id.desc()).first()
-        if not active:
-            return False
-        deleted = session.query(SFTSubmission).filter(
-            SFTSubmission.session_id == active.id,
-            SFTSubmission.user_id == user_id,
-        ).delete(synchronize_session=False)
-        return deleted > 0
+def _open_session_ids(session):
+    return session.query(SFTSession.id).filter(SFTSession.is_active.is_(True)).scalar_subquery()
 
 
-def clear_sft_submissions() -> None:
+def remove_sft_submission(user_id: int, session_id: int | None = None) -> bool:
+    """Removes the user's submission from one window, or from every open window."""
     with session_scope() as session:
-        active = session.query(SFTSession).filter(SFTSession.is_active.is_(True)).order_by(SFTSession.id.desc()).first()
-        if active:
-            session.query(SFTSubmission).filter(SFTSubmission.session_id == active.id).delete(synchronize_session=False)
+        query = session.query(SFTSubmission).filter(SFTSubmission.user_id == user_id)
+        if session_id is not None:
+            query = query.filter(SFTSubmission.session_id == session_id)
+        else:
+            query = query.filter(SFTSubmission.session_id.in_(_open_session_ids(session)))
+        return query.delete(synchronize_session=False) > 0
 
 
-def get_sft_submissions_for_date(date_str: str):
+def get_sft_submissions_for_session(session_id: int) -> list[SFTSubmission]:
     with SessionLocal() as session:
         return (
             session.query(SFTSubmission)
-            .join(SFTSession, SFTSubmission.session_id == SFTSession.id)
-            .filter(SFTSession.date == date_str)
+            .filter(SFTSubmission.session_id == session_id)
             .order_by(SFTSubmission.id.asc())
             .all()
         )
+
+
+# ---------- Audit ----------
+
+def insert_audit_events(events: list[dict]) -> None:
+    """Appends a batch of audit events in a single multi-row insert."""
+    if not events:
+        return
+    with session_scope() as session:
+        session.execute(insert(AuditEvent), events)
+
+
+# ---------- Idempotency keys ----------
+
+def claim_idempotency_key(key: str, lease_until: datetime, now: datetime) -> bool:
+    """Takes ``key`` until ``lease_until`` and returns True, or returns False while it
+    is completed or held by another unexpired claim."""
+    with session_scope() as session:
+        claim = _dialect_insert(session, IdempotencyKey).values(key=key, created_at=now, expires_at=lease_until)
+        claim = claim.on_conflict_do_update(
+            index_elements=[IdempotencyKey.key],
+            set_={"created_at": claim.excluded.created_at, "expires_at": claim.excluded.expires_at},
+            # A claim left behind by a process that died mid-action lapses with its lease
+            where=IdempotencyKey.completed_at.is_(None) & (IdempotencyKey.expires_at < now),
+        )
+        return session.execute(claim).rowcount == 1
+
+
+def complete_idempotency_key(key: str, expires_at: datetime, now: datetime) -> None:
+    with session_scope() as session:
+        session.query(IdempotencyKey).filter(IdempotencyKey.key == key).update(
+            {"completed_at": now, "expires_at": expires_at}, synchronize_session=False
+        )
+
+
+def release_idempotency_key(key: str) -> None:
+    """Drops a claim whose action failed, so the action can be retried."""
+    with session_scope() as session:
+        session.query(IdempotencyKey).filter(
+            IdempotencyKey.key == key, IdempotencyKey.completed_at.is_(None)
+        ).delete(synchronize_session=False)
+
+
+def delete_expired_idempotency_keys(now: datetime) -> int:
+    with session_scope() as session:
+        return session.query(IdempotencyKey).filter(IdempotencyKey.expires_at < now).delete(synchronize_session=False)
+
+
+# ---------- Callback values ----------
+
+def get_callback_value_ids(values: list[str]) -> dict[str, int]:
+    """Id of each value, assigning ids to values seen for the first time."""
+    values = set(values)
+    with session_scope() as session:
+        ids = dict(session.query(CallbackValue.value, CallbackValue.id).filter(CallbackValue.value.in_(values)).all())
+        missing = values - ids.keys()
+        if missing:
+            # Another replica may assign the same value concurrently; its id wins
+            session.execute(
+                _dialect_insert(session, CallbackValue).on_conflict_do_nothing(index_elements=[CallbackValue.value]),
+                [{"value": value} for value in missing],
+            )
+            ids.update(session.query(CallbackValue.value, CallbackValue.id).filter(CallbackValue.value.in_(missing)).all())
+        return ids
+
+
+def get_callback_value(value_id: int) -> str | None:
+    with SessionLocal() as session:
+        row = session.get(CallbackValue, value_id)
+        return row.value if row else None
+
+
+# ---------- Scheduled jobs ----------
+
+def sync_scheduled_jobs(definitions: list[dict]) -> dict[str, datetime | None]:
+    """Upserts job definitions (name, cron, grace_seconds); returns {name: last_due_at}."""
+    if not definitions:
+        return {}
+    with session_scope() as session:
+        upsert = _dialect_insert(session, ScheduledJob)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[ScheduledJob.name],
+            set_={"cron": upsert.excluded.cron, "grace_seconds": upsert.excluded.grace_seconds},
+        )
+        session.execute(upsert, definitions)
+        rows = session.query(ScheduledJob.name, ScheduledJob.last_due_at).filter(
+            ScheduledJob.name.in_([definition["name"] for definition in definitions])
+        )
+        return dict(rows.all())
+
+
+def claim_scheduled_run(name: str, due: datetime, owner: str, lease_until: datetime, now: datetime) -> bool:
+    """Takes the run of ``name`` due at ``due`` for ``owner``.
+
+    False when the job is inactive, that firing was already claimed, or another run
+    still holds an unexpired lease.
+    """
+    with session_scope() as session:
+        result = session.execute(
+            update(ScheduledJob)
+            .where(
+                ScheduledJob.name == name,
+                ScheduledJob.is_active.is_(True),
+                or_(ScheduledJob.last_due_at.is_(None), ScheduledJob.last_due_at < due),
+                or_(ScheduledJob.lease_expires_at.is_(None), ScheduledJob.lease_expires_at < now),
+            )
+            .values(last_due_at=due, lease_owner=owner, lease_expires_at=lease_until)
+        )
+        return result.rowcount == 1
+
+
+def finish_scheduled_run(name: str, owner: str, finished_at: datetime, error: str | None = None) -> None:
+    with session_scope() as session:
+        session.execute(
+            update(ScheduledJob)
+            .where(ScheduledJob.name == name, ScheduledJob.lease_owner == owner)
+            .values(last_run_at=finished_at, last_error=error, lease_owner=None, lease_expires_at=None)
+        )
+
+
+# ---------- Tenants ----------
+
+def get_tenants() -> list[Tenant]:
+    with SessionLocal() as session:
+        return session.query(Tenant).filter(Tenant.is_active.is_(True)).order_by(Tenant.id).all()
+
+
+def get_user_tenant_id(telegram_id: int | None, telegram_username: str | None = None) -> int | None:
+    """The tenant of the user with this Telegram id, or else this username."""
+    with SessionLocal() as session:
+        if telegram_id is not None:
+            row = session.query(User.tenant_id).filter(User.telegram_id == telegram_id).first()
+            if row:
+                return row[0]
+        username = _normalize_username(telegram_username)
+        if username:
+            row = session.query(User.tenant_id).filter(User.telegram_username == username).first()
+            if row:
+                return row[0]
+    return None
+
+
+def get_cache_generation(name: str) -> int:
+    with SessionLocal() as session:
+        return session.query(CacheGeneration.generation).filter(CacheGeneration.name == name).scalar() or 0
+
+
+def bump_cache_generation(name: str) -> None:
+    """Tells every process that the data behind its ``name`` cache changed."""
+    with session_scope() as session:
+        upsert = _dialect_insert(session, CacheGeneration).values(name=name, generation=1)
+        session.execute(
+            upsert.on_conflict_do_update(
+                index_elements=[CacheGeneration.name],
+                set_={"generation": CacheGeneration.generation + 1},
+            )
+        )
+
+
+def create_tenant(slug: str, name: str, parade_header: str, ic_group_chat_id: int) -> Tenant:
+    with session_scope() as session:
+        if session.query(Tenant).filter(Tenant.slug == slug).first():
+            raise ValueError(f"Tenant {slug} already exists")
+        if session.query(Tenant).filter(Tenant.ic_group_chat_id == ic_group_chat_id).first():
+            raise ValueError("This chat already belongs to a tenant")
+        tenant = Tenant(slug=slug, name=name, parade_header=parade_header, ic_group_chat_id=ic_group_chat_id)
+        session.add(tenant)
+        session.flush()
+        return tenant
+
+
+def update_tenant(tenant_id: int, **fields) -> Tenant:
+    with session_scope() as session:
+        tenant = session.get(Tenant, tenant_id)
+        if tenant is None:
+            raise ValueError("Tenant not found")
+        for field, value in fields.items():
+            setattr(tenant, field, value)
+        session.flush()
+        return tenant
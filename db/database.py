@@ -1,9 +1,13 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from db.pool import InstrumentedQueuePool
+
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
@@ -14,16 +18,72 @@ if DATABASE_URL.startswith("postgres://"):
 elif DATABASE_URL.startswith("postgresql://") and "+psycopg2" not in DATABASE_URL:
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg2://", 1)
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=int(os.getenv("DB_POOL_SIZE", "2")),
-    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "2")),
-    pool_recycle=int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800")),
-    pool_use_lifo=True,
-)
+# 0 disables the server-side limit (PostgreSQL only)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Creates the engine on first use, so importing this module stays cheap."""
+    global _engine
+    if _engine is not None:
+        return _engine
+    with _engine_lock:
+        if _engine is not None:
+            return _engine
+        connect_args = {}
+        if DATABASE_URL.startswith("postgresql") and DB_STATEMENT_TIMEOUT_MS:
+            # A runaway query fails instead of holding a pooled connection indefinitely
+            connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+
+        engine = create_engine(
+            DATABASE_URL,
+            poolclass=InstrumentedQueuePool,
+            pool_pre_ping=True,
+            pool_size=int(os.getenv("DB_POOL_SIZE", "2")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "2")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30")),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800")),
+            pool_use_lifo=True,
+            connect_args=connect_args,
+        )
+        engine.pool.configure(
+            adaptive=os.getenv("DB_POOL_ADAPTIVE", "0") == "1",
+            max_size=int(os.getenv("DB_POOL_MAX_SIZE", "8")),
+            report_seconds=float(os.getenv("DB_POOL_REPORT_SECONDS", "300")),
+        )
+        SessionLocal.configure(bind=engine)
+        _engine = engine
+    return _engine
+
+
+def __getattr__(name):
+    # ``from db.database import engine`` keeps working
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class _LazySessionMaker(sessionmaker):
+    def __call__(self, **local_kw):
+        if _engine is None:
+            get_engine()
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionMaker(autocommit=False, autoflush=False, expire_on_commit=False)
+
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+def warm_pool(connections: int | None = None):
+    """Opens pool connections concurrently so the first requests skip the TCP/TLS/auth handshake."""
+    engine = get_engine()
+    count = connections or getattr(engine.pool, "size", lambda: 1)()
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        opened = list(executor.map(lambda _: engine.connect(), range(count)))
+    for connection in opened:
+        connection.close()
 
 
 @contextmanager
@@ -0,0 +1,208 @@
+"""CSV exports streamed straight from the database.
+
+Rows are fetched ``EXPORT_BATCH_SIZE`` at a time (a server-side cursor on
+PostgreSQL) and written one by one into a spooled file, optionally gzipped, so
+memory use does not grow with the size of the table.
+"""
+
+import csv
+import gzip
+import io
+import tempfile
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Callable
+
+from sqlalchemy import Select, func, select
+
+from config.constants import EXPORT_BATCH_SIZE, EXPORT_SPOOL_MAX_BYTES
+from db.database import SessionLocal
+from db.models import MedicalEvent, MedicalStatus, MovementLog, SFTSession, SFTSubmission, User
+
+
+@dataclass(frozen=True, slots=True)
+class ExportKind:
+    label: str
+    dated: bool
+    build: Callable[[date | None, date | None, int | None], Select]
+    # Counts rows a tenant's export leaves out because they cannot be tied to a tenant
+    excluded: Callable[[date | None, date | None, int], Select] | None = None
+
+
+@dataclass(slots=True)
+class ExportFile:
+    file: tempfile.SpooledTemporaryFile
+    filename: str
+    rows: int
+    size: int
+    excluded: int = 0
+
+
+def _in_tenant(column, tenant_id: int | None) -> tuple:
+    return () if tenant_id is None else (column == tenant_id,)
+
+
+def _day_bounds(start: date, end: date) -> tuple[datetime, datetime]:
+    # Timestamp columns are stored naive in SG time
+    return datetime.combine(start, time.min), datetime.combine(end + timedelta(days=1), time.min)
+
+
+def _roster(start, end, tenant_id) -> Select:
+    # Same columns as the /import_user CSV, so an export can be edited and re-imported
+    return (
+        select(User.telegram_username, User.full_name, User.rank, User.role, User.is_admin, User.is_active, User.telegram_id)
+        .where(*_in_tenant(User.tenant_id, tenant_id))
+        .order_by(User.rank, User.full_name)
+    )
+
+
+def _medical_events(start, end, tenant_id) -> Select:
+    since, until = _day_bounds(start, end)
+    return (
+        select(
+            MedicalEvent.id,
+            User.rank,
+            User.full_name,
+            MedicalEvent.event_type,
+            MedicalEvent.event_datetime,
+            MedicalEvent.symptoms,
+            MedicalEvent.diagnosis,
+            MedicalEvent.appointment_type,
+            MedicalEvent.location,
+            MedicalEvent.endorsed_by,
+            MedicalEvent.created_at,
+        )
+        .join(User, MedicalEvent.user_id == User.id)
+        .where(MedicalEvent.event_datetime >= since, MedicalEvent.event_datetime < until, *_in_tenant(User.tenant_id, tenant_id))
+        .order_by(MedicalEvent.event_datetime, MedicalEvent.id)
+    )
+
+
+def _medical_statuses(start, end, tenant_id) -> Select:
+    # Every status in force at some point in the range
+    return (
+        select(
+            MedicalStatus.id,
+            User.rank,
+            User.full_name,
+            MedicalStatus.status_type,
+            MedicalStatus.description,
+            MedicalStatus.start_date,
+            MedicalStatus.end_date,
+            MedicalStatus.source_event_id,
+            MedicalStatus.created_at,
+        )
+        .join(User, MedicalStatus.user_id == User.id)
+        .where(MedicalStatus.start_date <= end, MedicalStatus.end_date >= start, *_in_tenant(User.tenant_id, tenant_id))
+        .order_by(MedicalStatus.start_date, MedicalStatus.id)
+    )
+
+
+def _sft_submissions(start, end, tenant_id) -> Select:
+    return (
+        select(
+            SFTSubmission.id,
+            SFTSession.date.label("window_date"),
+            SFTSession.start.label("window_start"),
+            SFTSession.end.label("window_end"),
+            SFTSubmission.user_name,
+            SFTSubmission.activity,
+            SFTSubmission.location,
+            SFTSubmission.start,
+            SFTSubmission.end,
+            SFTSubmission.created_at,
+        )
+        .join(SFTSession, SFTSubmission.session_id == SFTSession.id)
+        .where(SFTSession.date >= start, SFTSession.date <= end, *_in_tenant(SFTSession.tenant_id, tenant_id))
+        .order_by(SFTSession.date, SFTSession.start, SFTSubmission.id)
+    )
+
+
+def _movement_logs(start, end, tenant_id) -> Select:
+    since, until = _day_bounds(start, end)
+    # Rows logged before moved_at existed only have created_at
+    moved_at = func.coalesce(MovementLog.moved_at, MovementLog.created_at)
+    return (
+        select(
+            MovementLog.id,
+            User.rank,
+            User.full_name,
+            MovementLog.from_location,
+            MovementLog.to_location,
+            MovementLog.time,
+            moved_at.label("moved_at"),
+            MovementLog.created_by,
+        )
+        .outerjoin(User, MovementLog.user_id == User.id)
+        .where(moved_at >= since, moved_at < until, *_in_tenant(User.tenant_id, tenant_id))
+        .order_by(moved_at, MovementLog.id)
+    )
+
+
+def _unattributed_movement_logs(start, end, tenant_id) -> Select:
+    # Rows whose cadet was deleted (user_id cleared) belong to no tenant; only the
+    # all-tenant export includes them
+    since, until = _day_bounds(start, end)
+    moved_at = func.coalesce(MovementLog.moved_at, MovementLog.created_at)
+    return select(func.count()).where(MovementLog.user_id.is_(None), moved_at >= since, moved_at < until)
+
+
+EXPORTS = {
+    "roster": ExportKind("Roster", False, _roster),
+    "medical": ExportKind("Medical events", True, _medical_events),
+    "statuses": ExportKind("Medical statuses", True, _medical_statuses),
+    "sft": ExportKind("SFT submissions", True, _sft_submissions),
+    "movements": ExportKind("Movement logs", True, _movement_logs, _unattributed_movement_logs),
+}
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+def write_export(
+    name: str,
+    start: date | None = None,
+    end: date | None = None,
+    compress: bool = False,
+    tenant_id: int | None = None,
+) -> ExportFile:
+    """Streams one export, for one tenant or all of them, into a rewound spooled file; the caller closes ``file``."""
+    kind = EXPORTS[name]
+    statement = kind.build(start, end, tenant_id)
+    filename = f"{name}.csv"
+    if kind.dated:
+        filename = f"{name}_{start.strftime('%d%m%y')}-{end.strftime('%d%m%y')}.csv"
+
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_BYTES)
+    raw = gzip.GzipFile(filename=filename, mode="wb", fileobj=spool) if compress else spool
+    # utf-8-sig so Excel picks up the encoding of non-ASCII names
+    text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text)
+    rows = excluded = 0
+    try:
+        with SessionLocal() as session:
+            if kind.excluded and tenant_id is not None:
+                excluded = session.execute(kind.excluded(start, end, tenant_id)).scalar() or 0
+            result = session.execute(statement, execution_options={"yield_per": EXPORT_BATCH_SIZE})
+            writer.writerow(result.keys())
+            for row in result:
+                writer.writerow([_csv_value(value) for value in row])
+                rows += 1
+        text.flush()
+        text.detach()
+        if compress:
+            raw.close()
+    except BaseException:
+        spool.close()
+        raise
+
+    size = spool.tell()
+    spool.seek(0)
+    return ExportFile(spool, filename + (".gz" if compress else ""), rows, size, excluded)
@@ -1,6 +1,8 @@
 import csv
+from db.analytics import medical_trends
 from db.database import SessionLocal
-from db.models import User
+from db.models import Tenant, User
+from db.parade import bump_medical_generation, parade_read_model
 
 REQUIRED = {"full_name", "role", "rank"}
 
@@ -57,12 +59,18 @@ def _normalize_header(value):
     return "_".join(text.split())
 
 
-def import_users(path, require_username=False):
+def import_users(path, require_username=False, tenant_id=None):
+    """Creates or updates users from a CSV.
+
+    Users join ``tenant_id`` unless their row names another tenant's slug in a
+    ``wing`` column.
+    """
     session = SessionLocal()
     created = 0
     updated = 0
     processed = 0
     try:
+        tenant_ids = dict(session.query(Tenant.slug, Tenant.id).all())
         with open(path, newline="", encoding="utf-8") as f:
             reader = csv.DictReader(f)
             normalized_fieldnames = [
@@ -129,6 +137,10 @@ def import_users(path, require_username=False):
                 if is_admin and role not in BASE_ROLES:
                     raise ValueError("is_admin can only be true when role is Instructor or Cadet")
 
+                wing = (normalized_row.get("wing") or "").strip().lower()
+                if wing and wing not in tenant_ids:
+                    raise ValueError(f"wing must be one of {sorted(tenant_ids)}: {normalized_row.get('wing')!r}")
+
                 user = None
                 if telegram_id is not None:
                     user = session.query(User).filter_by(telegram_id=telegram_id).first()
@@ -149,10 +161,15 @@ def import_users(path, require_username=False):
                 user.rank = rank
                 user.role = role
                 user.is_admin = is_admin
+                user.tenant_id = tenant_ids[wing] if wing else tenant_id
                 is_active = normalized_row.get("is_active", "true")
                 user.is_active = str(is_active).lower() != "false"
 
+        bump_medical_generation(session)
         session.commit()
+        # Parade rows and trend rollups carry rank/name copies, so re-read them after names change.
+        parade_read_model.invalidate()
+        medical_trends.invalidate()
         return {"processed": processed, "created": created, "updated": updated}
     except:
         session.rollback()
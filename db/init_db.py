@@ -1,8 +1,145 @@
-from db.database import engine
-from db.models import Base
+from sqlalchemy import String, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+
+from db.database import get_engine
+from db.models import Base, SchemaVersion, Tenant
+
+# Bump whenever a model or one of the migration lists below changes; boots that find
+# this version already recorded skip create_all and the migrations.
+SCHEMA_VERSION = 9
+
+# Columns added to tables that already exist in deployed databases; create_all only
+# creates missing tables. (table, column, DDL type) — applied when the column is absent.
+ADDED_COLUMNS = [
+    ("movement_logs", "user_id", "INTEGER REFERENCES users(id)"),
+    ("movement_logs", "moved_at", "TIMESTAMP"),
+    ("users", "tenant_id", "INTEGER REFERENCES tenants(id)"),
+    ("sft_sessions", "tenant_id", "INTEGER REFERENCES tenants(id)"),
+    ("idempotency_keys", "completed_at", "TIMESTAMP"),
+]
+
+# Columns widened after deployment (PostgreSQL only; SQLite does not enforce int width).
+WIDENED_COLUMNS = [
+    ("movement_logs", "created_by", "BIGINT"),
+]
+
+# Text columns retyped after deployment (PostgreSQL only), applied while the column is
+# still text: (table, column, DDL type, USING expression converting the old values).
+CONVERTED_COLUMNS = [
+    ("sft_sessions", "date", "DATE", "to_date(\"date\", 'DDMMYYYY')"),
+    ("sft_sessions", "start", "TIME", "to_timestamp(\"start\", 'HH24MI')::time"),
+    ("sft_sessions", "end", "TIME", "to_timestamp(\"end\", 'HH24MI')::time"),
+]
+
+# Idempotent statements run on every schema upgrade, per dialect ("*" for all).
+MIGRATIONS = [
+    ("*", "CREATE INDEX IF NOT EXISTS ix_movement_logs_user_moved_at ON movement_logs (user_id, moved_at)"),
+    ("*", "CREATE INDEX IF NOT EXISTS ix_movement_logs_moved_at ON movement_logs (moved_at)"),
+    # SQLite keeps the declared text type, so rewrite DDMMYYYY / HHMM values in the
+    # formats SQLAlchemy's Date and Time read back.
+    ("sqlite", "UPDATE sft_sessions SET date = substr(date, 5, 4) || '-' || substr(date, 3, 2) || '-' || substr(date, 1, 2) WHERE length(date) = 8 AND instr(date, '-') = 0"),
+    ("sqlite", "UPDATE sft_sessions SET start = substr(start, 1, 2) || ':' || substr(start, 3, 2) || ':' || '00.000000' WHERE length(start) = 4"),
+    ("sqlite", "UPDATE sft_sessions SET \"end\" = substr(\"end\", 1, 2) || ':' || substr(\"end\", 3, 2) || ':' || '00.000000' WHERE length(\"end\") = 4"),
+    ("*", "CREATE INDEX IF NOT EXISTS ix_sft_sessions_date_start ON sft_sessions (date, start)"),
+    ("*", "CREATE INDEX IF NOT EXISTS ix_sft_sessions_is_active ON sft_sessions (is_active)"),
+    ("*", "CREATE INDEX IF NOT EXISTS ix_sft_submissions_session_id ON sft_submissions (session_id)"),
+    ("*", "CREATE INDEX IF NOT EXISTS ix_users_tenant_id ON users (tenant_id)"),
+    ("*", "CREATE INDEX IF NOT EXISTS ix_sft_sessions_tenant_id ON sft_sessions (tenant_id)"),
+    ("*", "INSERT INTO cache_generations (name, generation) SELECT 'medical', 0 WHERE NOT EXISTS (SELECT 1 FROM cache_generations WHERE name = 'medical')"),
+]
+
+# Tables whose rows predate tenants; rows without one are assigned to the default tenant.
+TENANT_SCOPED_TABLES = ("users", "sft_sessions")
+
+
+def _migrate(connection):
+    inspector = inspect(connection)
+    for table, column, ddl in ADDED_COLUMNS:
+        existing = {c["name"] for c in inspector.get_columns(table)}
+        if column not in existing:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            print(f"BOOT: added column {table}.{column}", flush=True)
+
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        for table, column, ddl in WIDENED_COLUMNS:
+            current = {c["name"]: str(c["type"]) for c in inspector.get_columns(table)}
+            if current.get(column) != ddl:
+                connection.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE {ddl}"))
+                print(f"BOOT: widened column {table}.{column} to {ddl}", flush=True)
+        for table, column, ddl, using in CONVERTED_COLUMNS:
+            current = {c["name"]: c["type"] for c in inspector.get_columns(table)}
+            if isinstance(current.get(column), String):
+                connection.execute(text(f'ALTER TABLE {table} ALTER COLUMN "{column}" TYPE {ddl} USING {using}'))
+                print(f"BOOT: converted column {table}.{column} to {ddl}", flush=True)
+
+    for target, statement in MIGRATIONS:
+        if target in ("*", dialect):
+            connection.execute(text(statement))
+
+
+def _seed_default_tenant(connection):
+    """Creates the tenant configured in config.constants and gives it every unassigned row."""
+    from config import constants
+
+    tenants = Tenant.__table__
+    tenant_id = connection.execute(
+        select(tenants.c.id).where(tenants.c.slug == constants.DEFAULT_TENANT_SLUG)
+    ).scalar()
+    if tenant_id is None:
+        tenant_id = connection.execute(
+            tenants.insert().values(
+                slug=constants.DEFAULT_TENANT_SLUG,
+                name=constants.DEFAULT_TENANT_NAME,
+                parade_header=constants.DEFAULT_PARADE_HEADER,
+                ic_group_chat_id=constants.IC_GROUP_CHAT_ID,
+                cadet_chat_id=constants.CADET_CHAT_ID,
+                movement_topic_id=constants.MOVEMENT_TOPIC_ID,
+                sft_topic_id=constants.SFT_TOPIC_ID,
+                parade_state_topic_id=constants.PARADE_STATE_TOPIC_ID,
+                cet_topic_id=constants.CET_TOPIC_ID,
+                cadet_cet_topic_id=constants.CADET_CET_TOPIC_ID,
+            )
+        ).inserted_primary_key[0]
+        print(f"BOOT: created default tenant {constants.DEFAULT_TENANT_SLUG}", flush=True)
+
+    for table in TENANT_SCOPED_TABLES:
+        assigned = connection.execute(
+            text(f"UPDATE {table} SET tenant_id = :tenant_id WHERE tenant_id IS NULL"),
+            {"tenant_id": tenant_id},
+        ).rowcount
+        if assigned:
+            print(f"BOOT: assigned {assigned} {table} row(s) to tenant {constants.DEFAULT_TENANT_SLUG}", flush=True)
+
+
+def _recorded_schema_version(engine) -> int | None:
+    try:
+        with engine.connect() as connection:
+            return connection.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+    except DBAPIError:
+        # Table not created yet
+        return None
+
 
 def init_db():
+    engine = get_engine()
+    recorded = _recorded_schema_version(engine)
+    if recorded is not None and recorded >= SCHEMA_VERSION:
+        # A newer release may have upgraded the database already (e.g. mid rolling deploy);
+        # running this release's migrations against its schema could undo them
+        if recorded > SCHEMA_VERSION:
+            print(f"BOOT: schema v{recorded} is newer than v{SCHEMA_VERSION}; skipping upgrade", flush=True)
+        else:
+            print(f"BOOT: schema v{SCHEMA_VERSION} is current", flush=True)
+        return
+
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        _migrate(connection)
+        _seed_default_tenant(connection)
+        connection.execute(SchemaVersion.__table__.delete())
+        connection.execute(SchemaVersion.__table__.insert().values(version=SCHEMA_VERSION))
+    print(f"BOOT: schema upgraded from v{recorded or 0} to v{SCHEMA_VERSION}", flush=True)
 
 if __name__ == "__main__":
     init_db()
@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, Boolean, Column, Date, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import BigInteger, Boolean, Column, Date, DateTime, ForeignKey, Index, Integer, String, Text, Time
 from sqlalchemy.orm import DeclarativeBase, relationship
 
 from utils.datetime_utils import now_sg
@@ -8,10 +8,33 @@ class Base(DeclarativeBase):
     pass
 
 
+class Tenant(Base):
+    """One wing served by the bot: its chats, topics and parade state settings."""
+
+    __tablename__ = "tenants"
+
+    id = Column(Integer, primary_key=True)
+    slug = Column(String, unique=True, nullable=False)
+    name = Column(String, nullable=False)
+    parade_header = Column(String, nullable=False)
+    ic_group_chat_id = Column(BigInteger, unique=True, nullable=False)
+    cadet_chat_id = Column(BigInteger, unique=True, nullable=True)
+    movement_topic_id = Column(Integer, nullable=True)
+    sft_topic_id = Column(Integer, nullable=True)
+    parade_state_topic_id = Column(Integer, nullable=True)
+    cet_topic_id = Column(Integer, nullable=True)
+    cadet_cet_topic_id = Column(Integer, nullable=True)
+    locations = Column(Text, nullable=True)  # JSON list; NULL uses LOCATIONS
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=now_sg)
+    updated_at = Column(DateTime, default=now_sg, onupdate=now_sg)
+
+
 class User(Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=True, index=True)
     telegram_id = Column(BigInteger, unique=True, nullable=True)
     telegram_username = Column(String, unique=True, nullable=True)
     full_name = Column(String, nullable=False)
@@ -29,15 +52,30 @@ class User(Base):
 
 class MovementLog(Base):
     __tablename__ = "movement_logs"
+    __table_args__ = (Index("ix_movement_logs_user_moved_at", "user_id", "moved_at"),)
 
     id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     from_location = Column(String, nullable=False)
     to_location = Column(String, nullable=False)
     time = Column(String, nullable=False)
-    created_by = Column(Integer, nullable=False)
+    moved_at = Column(DateTime, nullable=True, index=True)
+    created_by = Column(BigInteger, nullable=False)
     created_at = Column(DateTime, default=now_sg)
 
 
+class CurrentLocation(Base):
+    """Latest known location per cadet, maintained alongside movement_logs."""
+
+    __tablename__ = "current_locations"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    location = Column(String, nullable=False)
+    from_location = Column(String, nullable=True)
+    moved_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, default=now_sg, onupdate=now_sg)
+
+
 class MedicalEvent(Base):
     __tablename__ = "medical_events"
 
@@ -73,13 +111,17 @@ class MedicalStatus(Base):
 
 
 class SFTSession(Base):
+    """One SFT window. Several can be open at once; closed windows keep their submissions."""
+
     __tablename__ = "sft_sessions"
+    __table_args__ = (Index("ix_sft_sessions_date_start", "date", "start"),)
 
     id = Column(Integer, primary_key=True)
-    date = Column(String, nullable=False)
-    start = Column(String, nullable=False)
-    end = Column(String, nullable=False)
-    is_active = Column(Boolean, nullable=False, default=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=True, index=True)
+    date = Column(Date, nullable=False)
+    start = Column(Time, nullable=False)
+    end = Column(Time, nullable=False)
+    is_active = Column(Boolean, nullable=False, default=True, index=True)
     created_at = Column(DateTime, default=now_sg)
 
     submissions = relationship("SFTSubmission", back_populates="session", cascade="all, delete-orphan")
@@ -89,7 +131,7 @@ class SFTSubmission(Base):
     __tablename__ = "sft_submissions"
 
     id = Column(Integer, primary_key=True)
-    session_id = Column(Integer, ForeignKey("sft_sessions.id"), nullable=False)
+    session_id = Column(Integer, ForeignKey("sft_sessions.id"), nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     user_name = Column(String, nullable=False)
     activity = Column(String, nullable=False)
@@ -109,3 +151,101 @@ class AdminApproval(Base):
     action = Column(String, nullable=False, index=True)
     admin_telegram_id = Column(BigInteger, nullable=False, index=True)
     created_at = Column(DateTime, default=now_sg, index=True)
+
+
+class AppState(Base):
+    """Small key/value store for bot-wide state that must survive restarts."""
+
+    __tablename__ = "app_state"
+
+    key = Column(String, primary_key=True)
+    value = Column(Text, nullable=False)
+    updated_at = Column(DateTime, default=now_sg, onupdate=now_sg)
+
+
+class AuditEvent(Base):
+    """Append-only record of a state-changing action: who did what, to whom, when."""
+
+    __tablename__ = "audit_events"
+
+    id = Column(Integer, primary_key=True)
+    occurred_at = Column(DateTime, nullable=False, index=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=True, index=True)
+    actor_telegram_id = Column(BigInteger, nullable=True, index=True)
+    actor_name = Column(String, nullable=True)
+    action = Column(String, nullable=False, index=True)
+    subject = Column(String, nullable=True)
+    details = Column(Text, nullable=True)  # JSON object
+
+
+class IdempotencyKey(Base):
+    """A send or confirm that is running or has run; the unique key makes a repeat a no-op."""
+
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    created_at = Column(DateTime, default=now_sg)
+    # Until completed_at is set, expires_at is the end of the running claim's lease
+    expires_at = Column(DateTime, nullable=False, index=True)
+    completed_at = Column(DateTime, nullable=True)
+
+
+class CallbackValue(Base):
+    """A free-text button value and the id its callback_data carries; rows are never deleted."""
+
+    __tablename__ = "callback_values"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(String, unique=True, nullable=False)
+
+
+class CacheGeneration(Base):
+    """Counter bumped by every write to the data behind a per-process cache, so each process can tell its copy is stale."""
+
+    __tablename__ = "cache_generations"
+
+    name = Column(String, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+
+
+class BroadcastSchedule(Base):
+    """A message posted to a chat/topic whenever its cron expression fires (SG time)."""
+
+    __tablename__ = "broadcast_schedules"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    cron = Column(String, nullable=False)
+    chat_id = Column(BigInteger, nullable=False)
+    topic_id = Column(Integer, nullable=True)
+    template = Column(Text, nullable=False)
+    parse_mode = Column(String, nullable=True)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=now_sg)
+    updated_at = Column(DateTime, default=now_sg, onupdate=now_sg)
+
+
+class ScheduledJob(Base):
+    """A cron job run by ``bot.scheduler`` and the firing it last ran, shared by every replica."""
+
+    __tablename__ = "scheduled_jobs"
+
+    name = Column(String, primary_key=True)
+    cron = Column(String, nullable=False)
+    grace_seconds = Column(Integer, nullable=False)
+    is_active = Column(Boolean, default=True, nullable=False)
+    last_due_at = Column(DateTime, nullable=True)
+    last_run_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=now_sg, onupdate=now_sg)
+
+
+class SchemaVersion(Base):
+    """Single row recording which ``db.init_db.SCHEMA_VERSION`` the database was brought up to."""
+
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+    applied_at = Column(DateTime, default=now_sg)
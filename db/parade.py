@@ -1,5 +1,13 @@
-from datetime import date
-from db.models import User, MedicalEvent, MedicalStatus
+import json
+import threading
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import update
+
+from db.models import CacheGeneration, User, MedicalEvent, MedicalStatus
 
 def generate_parade_state(db, target_date: date):
     # --- Strength ---
@@ -38,3 +46,342 @@ def generate_parade_state(db, target_date: date):
         "status_counts": status_counts,
         "status_text": status_text,
     }
+
+
+# =========================
+# MATERIALISED READ MODEL
+# =========================
+
+# Undiagnosed events of these types are listed until a diagnosis is recorded.
+EVENT_SECTIONS = ("MA", "RSO", "RSI")
+# Statuses of these types are listed on each day between start and end date.
+STATUS_SECTIONS = ("MC", "LD", "EUL", "RMJ")
+
+
+# cache_generations row bumped in the transaction of every write to medical events,
+# medical statuses or the users they name (seeded by db.init_db)
+MEDICAL_GENERATION = "medical"
+
+
+def medical_generation(session) -> int:
+    generation = session.query(CacheGeneration.generation).filter(CacheGeneration.name == MEDICAL_GENERATION).scalar()
+    return generation or 0
+
+
+def bump_medical_generation(session) -> int:
+    """Bumps the counter inside the caller's transaction and returns the new value.
+
+    The UPDATE holds the row lock until commit, so concurrent writers get consecutive values.
+    """
+    return session.execute(
+        update(CacheGeneration)
+        .where(CacheGeneration.name == MEDICAL_GENERATION)
+        .values(generation=CacheGeneration.generation + 1)
+        .returning(CacheGeneration.generation)
+    ).scalar() or 0
+
+
+@dataclass(frozen=True, slots=True)
+class ParadeRow:
+    """One parade state entry, denormalised so rendering needs no further queries."""
+
+    key: str
+    record_id: int
+    user_id: int
+    section: str
+    rank: str
+    full_name: str
+    tenant_id: int | None = None
+    symptoms: str | None = None
+    diagnosis: str | None = None
+    appointment_type: str | None = None
+    location: str | None = None
+    event_datetime: datetime | None = None
+    endorsed_by: str | None = None
+    start_date: date | None = None
+    end_date: date | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class ParadeSnapshot:
+    day: date
+    events: dict[str, list[ParadeRow]]
+    statuses: dict[str, list[ParadeRow]]
+    counts: dict[str, int]
+
+
+def _is_open_event(event: MedicalEvent) -> bool:
+    return not (event.diagnosis and event.diagnosis.strip())
+
+
+def event_row(event: MedicalEvent, user: User) -> ParadeRow:
+    # The column is naive; drop tzinfo so fresh writes match rows read back from the database.
+    event_datetime = event.event_datetime.replace(tzinfo=None) if event.event_datetime else None
+    return ParadeRow(
+        key=f"E{event.id}",
+        record_id=event.id,
+        user_id=user.id,
+        section=event.event_type,
+        rank=user.rank,
+        full_name=user.full_name,
+        tenant_id=user.tenant_id,
+        symptoms=event.symptoms,
+        diagnosis=event.diagnosis,
+        appointment_type=event.appointment_type,
+        location=event.location,
+        event_datetime=event_datetime,
+        endorsed_by=event.endorsed_by,
+    )
+
+
+def status_row(status: MedicalStatus, user: User, event: MedicalEvent) -> ParadeRow:
+    return ParadeRow(
+        key=f"S{status.id}",
+        record_id=status.id,
+        user_id=user.id,
+        section=status.status_type,
+        rank=user.rank,
+        full_name=user.full_name,
+        tenant_id=user.tenant_id,
+        symptoms=event.symptoms,
+        diagnosis=event.diagnosis,
+        start_date=status.start_date,
+        end_date=status.end_date,
+    )
+
+
+class ParadeReadModel:
+    """Parade state rows kept up to date by the medical writes in ``db.crud``.
+
+    Open events are held per section; statuses are bucketed per day they cover, with a
+    per-day counter, so reading a day's parade state is a dictionary lookup. The model
+    hydrates itself from the database on first read and after ``invalidate()``.
+
+    Writes may come from other processes, so the model remembers the medical generation
+    it has caught up to. A local write whose generation is the next one is applied in
+    place; any other gap, or a newer generation seen on read, reloads the model.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._generation = 0
+        self._events: dict[str, dict[int, ParadeRow]] = {}
+        self._statuses: dict[int, ParadeRow] = {}
+        self._days: dict[date, dict[str, dict[int, ParadeRow]]] = {}
+        self._day_counts: dict[date, Counter] = {}
+
+    def _reset(self):
+        self._events = {section: {} for section in EVENT_SECTIONS}
+        self._statuses = {}
+        self._days = {}
+        self._day_counts = {}
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+            self._reset()
+
+    def _load(self):
+        from db.database import SessionLocal
+        from utils.datetime_utils import now_sg
+
+        today = now_sg().date()
+        self._reset()
+        with SessionLocal() as session:
+            # Read first: rows committed after this point only make the model look older
+            self._generation = medical_generation(session)
+            events = (
+                session.query(MedicalEvent, User)
+                .join(User, MedicalEvent.user_id == User.id)
+                .filter(MedicalEvent.event_type.in_(EVENT_SECTIONS))
+                .order_by(MedicalEvent.id)
+                .all()
+            )
+            statuses = (
+                session.query(MedicalStatus, User, MedicalEvent)
+                .join(User, MedicalStatus.user_id == User.id)
+                .join(MedicalEvent, MedicalStatus.source_event_id == MedicalEvent.id)
+                .filter(MedicalStatus.end_date >= today)
+                .order_by(MedicalStatus.id)
+                .all()
+            )
+        for event, user in events:
+            if _is_open_event(event):
+                self._put_event(event_row(event, user))
+        for status, user, event in statuses:
+            self._put_status(status_row(status, user, event))
+        self._loaded = True
+
+    def _ensure_current(self):
+        from db.database import SessionLocal
+
+        with SessionLocal() as session:
+            generation = medical_generation(session)
+        if not self._loaded or generation != self._generation:
+            self._load()
+
+    def _in_step(self, generation: int) -> bool:
+        """Whether a local write at ``generation`` should be applied in place."""
+        if not self._loaded or generation <= self._generation:
+            # Nothing to update, or the last load already read the write
+            return False
+        if generation != self._generation + 1:
+            # Another process wrote in between; the next read reloads
+            self.invalidate()
+            return False
+        self._generation = generation
+        return True
+
+    def _put_event(self, row: ParadeRow):
+        if row.section in self._events:
+            self._events[row.section][row.record_id] = row
+
+    def _put_status(self, row: ParadeRow):
+        if row.section not in STATUS_SECTIONS:
+            return
+        self._drop_status(row.record_id)
+        self._statuses[row.record_id] = row
+        day = row.start_date
+        while day <= row.end_date:
+            self._days.setdefault(day, {}).setdefault(row.section, {})[row.record_id] = row
+            self._day_counts.setdefault(day, Counter())[row.section] += 1
+            day += timedelta(days=1)
+
+    def _drop_status(self, status_id: int):
+        row = self._statuses.pop(status_id, None)
+        if not row:
+            return
+        day = row.start_date
+        while day <= row.end_date:
+            self._days.get(day, {}).get(row.section, {}).pop(status_id, None)
+            if day in self._day_counts:
+                self._day_counts[day][row.section] -= 1
+            day += timedelta(days=1)
+
+    # ---------- write side (called by db.crud after commit) ----------
+
+    def apply(self, generation: int, events: tuple[ParadeRow, ...] = (), statuses: tuple[ParadeRow, ...] = ()):
+        """Applies one committed write: events are added, updated or (once diagnosed) removed."""
+        with self._lock:
+            if not self._in_step(generation):
+                return
+            for row in events:
+                if row.section not in self._events:
+                    continue
+                if row.diagnosis and row.diagnosis.strip():
+                    self._events[row.section].pop(row.record_id, None)
+                else:
+                    self._put_event(row)
+            for row in statuses:
+                self._put_status(row)
+
+    def prune(self, generation: int, before: date):
+        """Drops day buckets and events removed by the expiry cleanup."""
+        with self._lock:
+            if not self._in_step(generation):
+                return
+            for status_id, row in list(self._statuses.items()):
+                if row.end_date < before:
+                    self._drop_status(status_id)
+            for day in [day for day in self._days if day < before]:
+                self._days.pop(day, None)
+                self._day_counts.pop(day, None)
+            for rows in self._events.values():
+                for event_id, row in list(rows.items()):
+                    if row.event_datetime and row.event_datetime.date() < before:
+                        rows.pop(event_id)
+
+    # ---------- read side ----------
+
+    def snapshot(self, day: date, tenant_id: int | None = None) -> ParadeSnapshot:
+        """The day's rows, for one tenant or for every tenant when ``tenant_id`` is None."""
+        with self._lock:
+            self._ensure_current()
+            events = {section: list(rows.values()) for section, rows in self._events.items()}
+            day_rows = self._days.get(day, {})
+            statuses = {section: list(day_rows.get(section, {}).values()) for section in STATUS_SECTIONS}
+            if tenant_id is None:
+                counts = {section: len(rows) for section, rows in events.items()}
+                counts.update({section: self._day_counts.get(day, Counter())[section] for section in STATUS_SECTIONS})
+        if tenant_id is not None:
+            events = {section: [row for row in rows if row.tenant_id == tenant_id] for section, rows in events.items()}
+            statuses = {section: [row for row in rows if row.tenant_id == tenant_id] for section, rows in statuses.items()}
+            counts = {section: len(rows) for section, rows in (*events.items(), *statuses.items())}
+        return ParadeSnapshot(day=day, events=events, statuses=statuses, counts=counts)
+
+
+parade_read_model = ParadeReadModel()
+
+
+# =========================
+# DELTA AGAINST LAST SENT
+# =========================
+
+# app_state key holding the encoded snapshot of the last parade state posted to the IC topic
+PARADE_LAST_SENT_KEY = "parade_state.last_sent"
+# app_state key holding the out-of-camp figure last typed in, which scheduled drafts start from
+PARADE_OUT_OF_CAMP_KEY = "parade_state.out_of_camp"
+# app_state key holding today's scheduled drafts as JSON, {draft_id: {tenant_id, messages, snapshot}}
+PARADE_DRAFTS_KEY = "parade_state.drafts"
+
+@dataclass(frozen=True, slots=True)
+class ParadeDelta:
+    added: list[ParadeRow]
+    removed: list[tuple[str, str]]  # (section, "RANK NAME") of rows no longer listed
+    changed: list[tuple[str, ParadeRow]]  # (previous section, current row)
+    previous_day: date | None
+    previous_out_of_camp: int | None
+    previous_total: int | None
+
+
+def _snapshot_rows(snapshot: ParadeSnapshot):
+    for rows in (*snapshot.events.values(), *snapshot.statuses.values()):
+        yield from rows
+
+
+def _row_fingerprint(row: ParadeRow) -> str:
+    fields = (
+        row.section, row.symptoms, row.diagnosis, row.appointment_type, row.location,
+        row.event_datetime, row.endorsed_by, row.start_date, row.end_date,
+    )
+    return format(zlib.crc32(repr(fields).encode()), "08x")
+
+
+def encode_sent_snapshot(snapshot: ParadeSnapshot, total_strength: int, out_of_camp: int) -> str:
+    """Compact form of a sent parade state: per row only its section, name and a fingerprint."""
+    return json.dumps(
+        {
+            "day": snapshot.day.isoformat(),
+            "total": total_strength,
+            "out": out_of_camp,
+            "rows": {
+                row.key: [row.section, f"{row.rank} {row.full_name}", _row_fingerprint(row)]
+                for row in _snapshot_rows(snapshot)
+            },
+        },
+        separators=(",", ":"),
+    )
+
+
+def diff_against_sent(snapshot: ParadeSnapshot, encoded: str | None) -> ParadeDelta:
+    previous = json.loads(encoded) if encoded else {"rows": {}}
+    previous_rows = previous["rows"]
+    added, changed = [], []
+    current_keys = set()
+    for row in _snapshot_rows(snapshot):
+        current_keys.add(row.key)
+        before = previous_rows.get(row.key)
+        if before is None:
+            added.append(row)
+        elif before[0] != row.section or before[2] != _row_fingerprint(row):
+            changed.append((before[0], row))
+    removed = [(section, name) for key, (section, name, _) in previous_rows.items() if key not in current_keys]
+    return ParadeDelta(
+        added=added,
+        removed=removed,
+        changed=changed,
+        previous_day=date.fromisoformat(previous["day"]) if "day" in previous else None,
+        previous_out_of_camp=previous.get("out"),
+        previous_total=previous.get("total"),
+    )
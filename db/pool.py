@@ -0,0 +1,132 @@
+"""Instrumented connection pool.
+
+``InstrumentedQueuePool`` records, per checkout, how long the caller waited for a
+connection (including opening a new one) and how long the ``pool_pre_ping`` round
+trip took, plus in-use and overflow counts. With adaptive sizing enabled it grows
+the persistent pool towards the observed peak concurrency, up to a ceiling, and
+shrinks it again when the peak falls.
+"""
+
+import math
+import threading
+import time
+
+from sqlalchemy.pool import QueuePool
+
+# A checkout waiting longer than this is logged straight away: the pool, not
+# Postgres, is holding requests up.
+SLOW_CHECKOUT_MS = 100
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.wait_ms_total = 0.0
+            self.wait_ms_max = 0.0
+            self.ping_ms_total = 0.0
+            self.ping_ms_max = 0.0
+            self.overflow_events = 0
+            self.peak_in_use = 0
+
+    def record(self, wait_ms: float, ping_ms: float, in_use: int, overflowed: bool):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+            self.ping_ms_total += ping_ms
+            self.ping_ms_max = max(self.ping_ms_max, ping_ms)
+            self.peak_in_use = max(self.peak_in_use, in_use)
+            if overflowed:
+                self.overflow_events += 1
+
+    def summary(self, pool) -> str:
+        with self._lock:
+            checkouts = self.checkouts or 1
+            return (
+                f"size {pool.size()}, in use {pool.checkedout()} (peak {self.peak_in_use}), "
+                f"checkouts {self.checkouts}, "
+                f"wait avg {self.wait_ms_total / checkouts:.1f} ms max {self.wait_ms_max:.1f} ms, "
+                f"pre-ping avg {self.ping_ms_total / checkouts:.1f} ms max {self.ping_ms_max:.1f} ms, "
+                f"overflow events {self.overflow_events}"
+            )
+
+
+class InstrumentedQueuePool(QueuePool):
+    def __init__(self, creator, *args, **kw):
+        super().__init__(creator, *args, **kw)
+        self.stats = PoolStats()
+        self._local = threading.local()
+        self._window_started = time.monotonic()
+        self.configure()
+
+    def configure(self, adaptive: bool = False, max_size: int | None = None, report_seconds: float = 300):
+        self._adaptive = adaptive
+        self._min_size = self.size()
+        self._max_size = max(max_size or self._min_size, self._min_size)
+        self._report_seconds = report_seconds
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.configure(self._adaptive, self._max_size, self._report_seconds)
+        pool._min_size = self._min_size
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        overflow_before = self._overflow
+        try:
+            return super()._do_get()
+        finally:
+            self._local.wait_ms = (time.perf_counter() - started) * 1000
+            # Beyond the persistent size: a connection was opened just for this checkout
+            self._local.overflowed = self._overflow > overflow_before and self._overflow > 0
+
+    def connect(self):
+        started = time.perf_counter()
+        self._local.wait_ms = 0.0
+        self._local.overflowed = False
+        connection = super().connect()
+        total_ms = (time.perf_counter() - started) * 1000
+        wait_ms = self._local.wait_ms
+        # What is left after the wait is dominated by the pre-ping round trip
+        self.stats.record(wait_ms, max(total_ms - wait_ms, 0.0), self.checkedout(), self._local.overflowed)
+        if wait_ms > SLOW_CHECKOUT_MS:
+            print(f"[DB POOL] slow checkout: waited {wait_ms:.0f} ms ({self.stats.summary(self)})", flush=True)
+        self._end_window_if_due()
+        return connection
+
+    def resize(self, size: int):
+        """Changes how many connections are kept open; overflow on top stays the same."""
+        with self._overflow_lock:
+            delta = size - self._pool.maxsize
+            self._pool.maxsize = size
+            self._overflow -= delta
+
+    def _end_window_if_due(self):
+        now = time.monotonic()
+        if now - self._window_started < self._report_seconds:
+            return
+        self._window_started = now
+        print(f"[DB POOL] {self.stats.summary(self)}", flush=True)
+        if self._adaptive:
+            self._adapt()
+        self.stats.reset()
+
+    def _adapt(self):
+        size = self.size()
+        peak = self.stats.peak_in_use
+        if self.stats.overflow_events or peak > size:
+            # Keep the observed peak open, with a little headroom
+            target = min(self._max_size, max(size + 1, math.ceil(peak * 1.25)))
+        elif peak < size - 1:
+            target = max(self._min_size, size - 1)
+        else:
+            return
+        if target != size:
+            self.resize(target)
+            print(f"[DB POOL] adaptive resize {size} -> {target} (peak in use {peak})", flush=True)
@@ -1,23 +1,23 @@
-from config.settings import BOT_TOKEN
-from config.constants import IC_GROUP_CHAT_ID
+from bot.startup import add_first_update_report, start_warmup, startup_report
+
+from config.settings import BOT_MODE, BOT_TOKEN, MAX_CONCURRENT_UPDATES
+from config.constants import PARADE_STATE_PREWARM_MINUTES, PARADE_STATE_TIMES, RETENTION_CRON, RETENTION_GRACE_HOURS
+from services.audit import audit_log
 from services.db_service import DatabaseService
+from services import idempotency
 
-from bot.features.import_users import import_user, import_user_callback, import_user_document
-from bot.features.debug import debug_ids
-from bot.features.navigation import cancel, menu
-from bot.features.notifications import notifications
-from bot.features.movement import start_movement
-from bot.features.parade import start_parade_state
-from bot.features.sft import quit_sft, start_sft
-from bot.features.start import start, start_menu_callback
-from bot.features.status import start_status
 from bot.router import callback_router, register_status_handlers, text_input_router
+from bot.shared.lazy import lazy_callback
+from bot.update_processor import PerUserUpdateProcessor
+
+from bot.cet import MEDIA_GROUP, TENANT_IC_GROUP, cet_handler
+from bot.broadcast import broadcast_scheduler
+from bot.scheduler import CronJob, job_scheduler
 
-from bot.cet import cet_handler
-from bot.daily_msg import send_daily_msg
-from core.pt_sft_admin import start_pt_admin, handle_pt_admin_callbacks
+from utils.cron import CronSchedule
+from utils.time_utils import SG_TZ
 
-from utils.time_utils import SG_TZ, DAILY_MSG_TIME
+from datetime import datetime, timedelta
 
 from telegram.ext import (
     ApplicationBuilder,
@@ -27,61 +27,85 @@ from telegram.ext import (
     filters,
 )
 
+ALLOWED_UPDATES = ["message", "callback_query"]
 
-def main():
-    print("BOOT: main entered", flush=True)
+# command -> (module, callback); modules are imported when the command is first used
+COMMANDS = {
+    "start": ("bot.features.start", "start"),
+    "start_sft": ("bot.features.sft", "start_sft"),
+    "quit_sft": ("bot.features.sft", "quit_sft"),
+    "start_status": ("bot.features.status", "start_status"),
+    "start_movement": ("bot.features.movement", "start_movement"),
+    "whereis": ("bot.features.movement", "where_is_everyone"),
+    "board": ("bot.features.movement", "post_headcount_board"),
+    "pt_admin": ("core.pt_sft_admin", "start_pt_admin"),
+    "pt_sft_admin": ("core.pt_sft_admin", "start_pt_admin"),
+    "start_parade_state": ("bot.features.parade", "start_parade_state"),
+    "import_user": ("bot.features.import_users", "import_user"),
+    "export": ("bot.features.export", "export"),
+    "medstats": ("bot.features.analytics", "medical_stats"),
+    "debug_ids": ("bot.features.debug", "debug_ids"),
+    "menu": ("bot.features.navigation", "menu"),
+    "cancel": ("bot.features.navigation", "cancel"),
+    "notifications": ("bot.features.notifications", "notifications"),
+    "tenant": ("bot.features.tenants", "tenant"),
+}
 
-    # -----------------------------
-    # Initialise Database
-    # -----------------------------
-    DatabaseService.initialise()
+# Imported in the background after boot so the first user of each does not wait for it
+WARM_IMPORTS = sorted({module for module, _ in COMMANDS.values()} | {
+    "bot.rso_handler",
+    "core.sft_manager",
+    "bot.parade_state",
+})
 
-    # -----------------------------
-    # Build Telegram Application
-    # -----------------------------
-    application = (
-        ApplicationBuilder()
-        .token(BOT_TOKEN)
-        .build()
-    )
 
+def _warm_imports():
+    import importlib
+
+    for module in WARM_IMPORTS:
+        importlib.import_module(module)
+
+
+def _warm_parade_read_model():
+    from db.parade import parade_read_model
+    from utils.datetime_utils import now_sg
+
+    parade_read_model.snapshot(now_sg().date())
+
+
+async def _flush_audit_log(application):
+    import asyncio
+
+    written = await asyncio.to_thread(audit_log.flush)
+    print(f"[AUDIT] Flushed {written} event(s) at shutdown", flush=True)
+
+
+def register_handlers(application):
+    """Adds every command, button and text handler; shared by main() and the tests."""
     # -----------------------------
     # Command Handlers
     # -----------------------------
-
     application.add_handler(
         MessageHandler(
-            filters.Chat(chat_id=IC_GROUP_CHAT_ID)
-            & (filters.TEXT | filters.CAPTION)
+            TENANT_IC_GROUP
+            & (filters.TEXT | filters.CAPTION | MEDIA_GROUP)
             & ~filters.COMMAND,
             cet_handler,
             block=False,
         )
     )
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("start_sft", start_sft))
-    application.add_handler(CommandHandler("quit_sft", quit_sft))
-    application.add_handler(CommandHandler("start_status", start_status))
-    application.add_handler(CommandHandler("start_movement", start_movement))
-    application.add_handler(CommandHandler("pt_admin", start_pt_admin))
-    application.add_handler(CommandHandler("pt_sft_admin", start_pt_admin))
-    application.add_handler(CommandHandler("start_parade_state", start_parade_state))
-    application.add_handler(CommandHandler("import_user", import_user))
-    application.add_handler(CommandHandler("debug_ids", debug_ids))
-    application.add_handler(CommandHandler("menu", menu))
-    application.add_handler(CommandHandler("cancel", cancel))
-    application.add_handler(CommandHandler("notifications", notifications))
+    for command, (module, name) in COMMANDS.items():
+        application.add_handler(CommandHandler(command, lazy_callback(module, name)))
     register_status_handlers(application)
 
-
     # -----------------------------
     # Callback Handlers (Buttons)
     # -----------------------------
     application.add_handler(
-        CallbackQueryHandler(handle_pt_admin_callbacks, pattern=r"^ptadmin:")
+        CallbackQueryHandler(lazy_callback("core.pt_sft_admin", "handle_pt_admin_callbacks"), pattern=r"^ptadmin:")
     )
     application.add_handler(
-        CallbackQueryHandler(start_menu_callback, pattern=r"^start_menu\|")
+        CallbackQueryHandler(lazy_callback("bot.features.start", "start_menu_callback"), pattern=r"^start_menu\|")
     )
     application.add_handler(
         CallbackQueryHandler(callback_router, pattern=r"^(mov|sft|parade)")
@@ -90,28 +114,91 @@ def main():
         MessageHandler(filters.TEXT & ~filters.COMMAND, text_input_router)
     )
     application.add_handler(
-        CallbackQueryHandler(import_user_callback, pattern=r"^import_user\|")
+        CallbackQueryHandler(lazy_callback("bot.features.import_users", "import_user_callback"), pattern=r"^import_user\|")
     )
     application.add_handler(
-        MessageHandler(filters.Document.ALL, import_user_document)
+        MessageHandler(filters.Document.ALL, lazy_callback("bot.features.import_users", "import_user_document"))
     )
 
 
+def main():
+    print("BOOT: main entered", flush=True)
+
     # -----------------------------
-    # Job Queue (Daily Message)
+    # Initialise Database
     # -----------------------------
-    application.job_queue.scheduler.timezone = SG_TZ
-    application.job_queue.run_daily(
-        send_daily_msg,
-        time=DAILY_MSG_TIME,
+    startup_report.mark("imports")
+    DatabaseService.initialise()
+    startup_report.mark("schema check")
+
+    from db.database import warm_pool
+
+    from services.tenants import tenant_registry
+
+    start_warmup({
+        "pool": warm_pool,
+        "tenants": tenant_registry.load,
+        "parade read model": _warm_parade_read_model,
+        "handler imports": _warm_imports,
+    })
+
+    # -----------------------------
+    # Build Telegram Application
+    # -----------------------------
+    application = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(PerUserUpdateProcessor(MAX_CONCURRENT_UPDATES))
+        .post_shutdown(_flush_audit_log)
+        .build()
     )
+    add_first_update_report(application)
+
+    register_handlers(application)
 
     # -----------------------------
-    # Start Bot (Polling)
+    # Job Queue (Background Tasks)
+    # -----------------------------
+    application.job_queue.scheduler.timezone = SG_TZ
+    audit_log.install(application.job_queue)
+
     # -----------------------------
+    # Scheduled Jobs (Parade State Drafts, Retention, Broadcasts)
+    # -----------------------------
+    for parade_hhmm in PARADE_STATE_TIMES:
+        parade_at = datetime.strptime(parade_hhmm, "%H%M")
+        prepare_at = parade_at - timedelta(minutes=PARADE_STATE_PREWARM_MINUTES)
+        # A draft is only worth preparing until the parade itself
+        job_scheduler.add(CronJob(
+            f"parade_draft_{parade_hhmm}",
+            CronSchedule(f"{prepare_at.minute} {prepare_at.hour} * * *"),
+            lazy_callback("bot.features.parade", "prepare_scheduled_parade_state"),
+            timedelta(minutes=PARADE_STATE_PREWARM_MINUTES),
+        ))
+    job_scheduler.add(CronJob(
+        "retention",
+        CronSchedule(RETENTION_CRON),
+        idempotency.delete_expired_keys,
+        timedelta(hours=RETENTION_GRACE_HOURS),
+    ))
+    job_scheduler.install(application.job_queue)
+    broadcast_scheduler.install(application.job_queue)
+
+    startup_report.mark("application setup")
+    print(f"BOOT: {startup_report.summary()}", flush=True)
+
+    # -----------------------------
+    # Start Bot (Webhook / Polling)
+    # -----------------------------
+    if BOT_MODE == "webhook":
+        from bot.webhook import run_webhook
+
+        run_webhook(application, allowed_updates=ALLOWED_UPDATES)
+        return
+
     application.run_polling(
         drop_pending_updates=True,
-        allowed_updates=["message", "callback_query"],
+        allowed_updates=ALLOWED_UPDATES,
     )
 
 
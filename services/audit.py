@@ -0,0 +1,114 @@
+"""Write-behind audit log of state-changing actions.
+
+Handlers call ``audit``, which only appends to an in-memory buffer, so no handler
+waits on an extra insert. A job-queue task writes the buffer in one multi-row insert
+every ``AUDIT_FLUSH_SECONDS``, sooner once ``AUDIT_FLUSH_BATCH_SIZE`` events are
+waiting, and once more at shutdown. A failed write puts the batch back for the next
+attempt. At most ``AUDIT_BUFFER_MAX`` events are kept; beyond that the oldest are dropped.
+"""
+
+import asyncio
+import json
+import threading
+
+from config.constants import AUDIT_BUFFER_MAX, AUDIT_FLUSH_BATCH_SIZE, AUDIT_FLUSH_SECONDS
+from db.crud import insert_audit_events
+from services.tenants import tenant_for_update
+from utils.datetime_utils import now_sg
+
+
+class AuditLog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffer: list[dict] = []
+        self._job_queue = None
+        self._flush_scheduled = False
+
+    def install(self, job_queue):
+        self._job_queue = job_queue
+        job_queue.run_repeating(self._flush_job, interval=AUDIT_FLUSH_SECONDS, first=AUDIT_FLUSH_SECONDS, name="audit_flush")
+
+    def record(
+        self,
+        action: str,
+        actor_telegram_id: int | None = None,
+        actor_name: str | None = None,
+        tenant_id: int | None = None,
+        subject: str | None = None,
+        **details,
+    ):
+        event = {
+            "occurred_at": now_sg(),
+            "tenant_id": tenant_id,
+            "actor_telegram_id": actor_telegram_id,
+            "actor_name": actor_name,
+            "action": action,
+            "subject": subject,
+            "details": json.dumps(details, default=str, separators=(",", ":")) if details else None,
+        }
+        with self._lock:
+            self._buffer.append(event)
+            self._trim()
+            flush_now = len(self._buffer) >= AUDIT_FLUSH_BATCH_SIZE and not self._flush_scheduled
+            if flush_now and self._job_queue:
+                self._flush_scheduled = True
+        if flush_now and self._job_queue:
+            self._job_queue.run_once(self._flush_job, when=0, name="audit_flush_batch")
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self) -> int:
+        """Writes everything buffered so far and returns how many events were written.
+
+        Blocks on the database, so call it off the event loop.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+                self._flush_scheduled = False
+            if not batch:
+                return 0
+            try:
+                insert_audit_events(batch)
+            except Exception as e:
+                self._requeue(batch)
+                print(f"[AUDIT] Failed to write {len(batch)} event(s), will retry: {e}", flush=True)
+                return 0
+            return len(batch)
+
+    def _requeue(self, batch: list[dict]):
+        with self._lock:
+            self._buffer[:0] = batch
+            self._trim()
+
+    def _trim(self):
+        # Called with the lock held
+        overflow = len(self._buffer) - AUDIT_BUFFER_MAX
+        if overflow > 0:
+            del self._buffer[:overflow]
+            print(f"[AUDIT] Buffer full, dropped the {overflow} oldest event(s)", flush=True)
+
+    async def _flush_job(self, context):
+        await asyncio.to_thread(self.flush)
+
+
+audit_log = AuditLog()
+
+
+def audit(update, action: str, subject: str | None = None, **details):
+    """Records ``action`` as done by the update's sender, in the update's tenant."""
+    user = update.effective_user if update else None
+    actor_name = None
+    if user:
+        actor_name = f"@{user.username}" if user.username else user.full_name
+    audit_log.record(
+        action,
+        actor_telegram_id=user.id if user else None,
+        actor_name=actor_name,
+        tenant_id=tenant_for_update(update).id if update else None,
+        subject=subject,
+        **details,
+    )
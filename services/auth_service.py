@@ -2,7 +2,8 @@ from config.constants import ADMIN_IDS
 from db.crud import get_admin_telegram_ids, get_user_by_telegram_id
 
 
-def is_admin_user(user_id: int | None) -> bool:
+def is_admin_user(user_id: int | None, tenant_id: int | None = None) -> bool:
+    """Owners (ADMIN_IDS) and active admins; with ``tenant_id``, only that tenant's admins."""
     if user_id is None:
         return False
 
@@ -10,8 +11,19 @@ def is_admin_user(user_id: int | None) -> bool:
         return True
 
     user = get_user_by_telegram_id(user_id)
-    return bool(user and user.is_admin and user.is_active)
+    if not (user and user.is_admin and user.is_active):
+        return False
+    return tenant_id is None or user.tenant_id == tenant_id
+
+
+def is_tenant_admin(update) -> bool:
+    """Whether the sender may run admin actions for the tenant the update belongs to."""
+    from services.tenants import tenant_for_update
+
+    user = update.effective_user
+    return is_admin_user(user.id if user else None, tenant_for_update(update).id)
 
 
-def get_all_admin_user_ids() -> list[int]:
-    return sorted(set(ADMIN_IDS) | set(get_admin_telegram_ids()))
+def get_all_admin_user_ids(tenant_id: int | None = None) -> list[int]:
+    """Owners (ADMIN_IDS) plus the admins of one tenant, or of every tenant."""
+    return sorted(set(ADMIN_IDS) | set(get_admin_telegram_ids(tenant_id)))
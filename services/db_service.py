@@ -1,15 +1,17 @@
 from collections import defaultdict
 from dataclasses import dataclass
+from datetime import date, time
 
 from db.crud import (
     add_sft_submission,
-    clear_active_sft_session,
-    clear_sft_submissions,
-    get_active_sft_session,
-    get_sft_submissions_for_date,
+    close_sft_session,
+    get_open_sft_sessions,
+    get_sft_session,
+    get_sft_submissions_for_session,
+    open_sft_session,
     remove_sft_submission,
-    set_active_sft_session,
 )
+from services.sft_occupancy import activity_key, activity_rules, capacity_check, window_counts
 
 
 def _display_instructor_name(instructor_name: str) -> str:
@@ -17,11 +19,32 @@ def _display_instructor_name(instructor_name: str) -> str:
     return parts[1] if len(parts) == 2 else instructor_name
 
 
-@dataclass
+@dataclass(frozen=True)
 class SFTWindow:
-    date: str
-    start: str
-    end: str
+    id: int
+    date: date
+    start: time
+    end: time
+
+    @property
+    def date_label(self) -> str:
+        return self.date.strftime("%d%m%Y")
+
+    @property
+    def start_hhmm(self) -> str:
+        return self.start.strftime("%H%M")
+
+    @property
+    def end_hhmm(self) -> str:
+        return self.end.strftime("%H%M")
+
+    @property
+    def label(self) -> str:
+        return f"{self.date_label} {self.start_hhmm}-{self.end_hhmm}"
+
+    @classmethod
+    def from_row(cls, row) -> "SFTWindow":
+        return cls(id=row.id, date=row.date, start=row.start, end=row.end)
 
 
 class DatabaseService:
@@ -34,56 +57,86 @@ class DatabaseService:
 
 class SFTService:
     @classmethod
-    def set_window(cls, date: str, start: str, end: str):
-        set_active_sft_session(date, start, end)
+    def open_window(cls, day: date, start: time, end: time, tenant_id: int | None = None) -> SFTWindow:
+        # Re-opening a closed window brings its submissions back; they count towards capacity
+        # because occupancy is always read from the stored submissions
+        return SFTWindow.from_row(open_sft_session(day, start, end, tenant_id))
+
+    @classmethod
+    def get_windows(cls, tenant_id: int | None = None) -> list[SFTWindow]:
+        return [SFTWindow.from_row(row) for row in get_open_sft_sessions(tenant_id)]
 
     @classmethod
-    def get_window(cls):
-        session = get_active_sft_session()
-        if not session:
+    def get_window(cls, window_id: int | None = None, tenant_id: int | None = None) -> SFTWindow | None:
+        """An open window of the tenant by id, or its only open window when no id is given."""
+        if window_id is None:
+            windows = cls.get_windows(tenant_id)
+            return windows[0] if len(windows) == 1 else None
+        row = get_sft_session(window_id)
+        if not row or not row.is_active:
+            return None
+        # Window ids arrive in callback data, so one from another wing is refused
+        if tenant_id is not None and row.tenant_id != tenant_id:
             return None
-        return SFTWindow(date=session.date, start=session.start, end=session.end)
+        return SFTWindow.from_row(row)
+
+    @classmethod
+    def close_window(cls, window_id: int | None = None):
+        close_sft_session(window_id)
 
     @classmethod
-    def clear_window(cls):
-        clear_active_sft_session()
+    def add_submission(cls, window_id: int, user_id: int, activity: str, location: str, start: str, end: str, user_name: str):
+        # Raises ValueError when the activity is full for part of the range
+        add_sft_submission(
+            window_id, user_id=user_id, user_name=user_name, activity=activity, location=location, start=start, end=end,
+            check=capacity_check(activity_key(activity, location), start, end),
+        )
 
     @classmethod
-    def add_submission(cls, user_id: int, activity: str, location: str, start: str, end: str, user_name: str):
-        add_sft_submission(user_id=user_id, user_name=user_name, activity=activity, location=location, start=start, end=end)
+    def remove_submission(cls, user_id: int, window_id: int | None = None) -> bool:
+        """Removes the user from one window, or from every open window."""
+        return remove_sft_submission(user_id, window_id)
 
     @classmethod
-    def remove_submission(cls, user_id: int) -> bool:
-        return remove_sft_submission(user_id)
+    def activity_counts(cls, window_id: int) -> dict[str, tuple[int, int]]:
+        """(participants, busiest-slot occupancy) per activity in the window."""
+        return window_counts(get_sft_submissions_for_session(window_id))
 
     @classmethod
-    def clear_submissions(cls):
-        clear_sft_submissions()
+    def shortfall(cls, window_id: int, key: str) -> int:
+        """How many more cadets ``key`` needs to reach its minimum group size."""
+        minimum, _ = activity_rules(key)
+        participants, _ = cls.activity_counts(window_id).get(key, (0, 0))
+        return max(minimum - participants, 0)
 
     @classmethod
-    def get_submissions_for_date(cls, date: str):
-        return get_sft_submissions_for_date(date)
+    def get_submissions(cls, window_id: int):
+        return get_sft_submissions_for_session(window_id)
 
     @classmethod
-    def generate_summary(cls, date: str, instructor_name: str, salutation: str) -> str:
+    def generate_summary(cls, window: SFTWindow, instructor_name: str, salutation: str) -> str:
         grouped = defaultdict(list)
-        submissions = cls.get_submissions_for_date(date)
+        submissions = cls.get_submissions(window.id)
+        date = window.date_label
 
         for s in submissions:
-            key = f"{s.activity} @ {s.location}" if s.location else s.activity
-            grouped[key].append(s)
+            grouped[activity_key(s.activity, s.location)].append(s)
 
         if not grouped:
-            return f"❌ No SFT submissions for {date}."
+            return f"❌ No SFT submissions for {window.label}."
 
-        invalid = [activity for activity, entries in grouped.items() if len(entries) < 2]
+        invalid = [
+            (activity, len(entries), activity_rules(activity)[0])
+            for activity, entries in grouped.items()
+            if len(entries) < activity_rules(activity)[0]
+        ]
         if invalid:
             lines = [
                 "❌ SFT summary cannot be generated.",
                 "",
-                "The following activities have fewer than 2 participants:",
+                "The following activities are below their minimum group size:",
             ]
-            lines.extend(f"- {activity}" for activity in invalid)
+            lines.extend(f"- {activity} ({count}/{minimum})" for activity, count, minimum in invalid)
             lines.extend(["", "Please resolve before generating summary."])
             return "\n".join(lines)
 
@@ -112,9 +165,5 @@ class SFTService:
         return "\n".join(lines).rstrip()
 
 
-def get_sft_window():
-    return SFTService.get_window()
-
-
-def set_sft_window(date: str, start: str, end: str):
-    SFTService.set_window(date=date, start=start, end=end)
+def get_sft_windows(tenant_id: int | None = None):
+    return SFTService.get_windows(tenant_id)
@@ -0,0 +1,85 @@
+"""Durable once-only guard for send and confirm buttons.
+
+Each rendering of a send/confirm button carries a fresh key in its callback_data
+(``once_callback``). The handler runs the action inside ``async with once_button(update)``,
+which claims the key with a single ``INSERT ... ON CONFLICT``: only the first press gets
+the claim, so a double tap, a tap replayed after a restart, or the same tap reaching two
+processes runs the action once. Actions without a button, such as a parade draft sent
+by whichever admin is first, use ``once`` with a key of their own.
+
+A claim is a lease until the action finishes. If the action raises, the key is released
+and a retry runs it; if the process dies mid-action, the lease lapses after
+``IDEMPOTENCY_LEASE_SECONDS``. Finished keys are kept for ``IDEMPOTENCY_TTL_HOURS`` and
+the scheduled retention job deletes them.
+"""
+
+import asyncio
+import secrets
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
+from config.constants import IDEMPOTENCY_LEASE_SECONDS, IDEMPOTENCY_TTL_HOURS
+from db.crud import (
+    claim_idempotency_key,
+    complete_idempotency_key,
+    delete_expired_idempotency_keys,
+    release_idempotency_key,
+)
+from utils.datetime_utils import now_sg
+
+
+KEY_MARKER = "!"
+
+
+def once_callback(action: str) -> str:
+    """callback_data ``<action>|!<key>`` for a button whose action must run only once."""
+    return f"{action}|{KEY_MARKER}{secrets.token_hex(6)}"
+
+
+def callback_action(data: str) -> str:
+    """The action of a ``once_callback`` payload (plain payloads are returned unchanged)."""
+    return data.split(f"|{KEY_MARKER}", 1)[0]
+
+
+def callback_key(update) -> str:
+    data = update.callback_query.data
+    if f"|{KEY_MARKER}" in data:
+        return data
+    # Buttons rendered before keys existed: one claim per message
+    message = update.effective_message
+    return f"{data}:{message.chat.id}:{message.message_id}"
+
+
+@asynccontextmanager
+async def once(key: str):
+    """Yields True to the one caller that should run the action for ``key``, else False.
+
+    Raising out of the block releases the key so the action can be retried; leaving
+    it normally marks the action done.
+    """
+    now = now_sg()
+    claimed = await asyncio.to_thread(
+        claim_idempotency_key, key, now + timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS), now
+    )
+    if not claimed:
+        yield False
+        return
+    try:
+        yield True
+    except BaseException:
+        await asyncio.to_thread(release_idempotency_key, key)
+        raise
+    now = now_sg()
+    await asyncio.to_thread(complete_idempotency_key, key, now + timedelta(hours=IDEMPOTENCY_TTL_HOURS), now)
+
+
+def once_button(update):
+    """``once`` for the pressed button's key."""
+    return once(callback_key(update))
+
+
+async def delete_expired_keys(context, due=None):
+    """Scheduler job: drops keys past their TTL."""
+    deleted = await asyncio.to_thread(delete_expired_idempotency_keys, now_sg())
+    if deleted:
+        print(f"[IDEMPOTENCY] Deleted {deleted} expired key(s)", flush=True)
@@ -0,0 +1,62 @@
+"""Occupancy of SFT windows, per activity and 15-minute slot.
+
+Worked out from the window's stored submissions whenever it is needed. Capacity is
+checked by ``crud.add_sft_submission`` inside the transaction that stores the
+submission, with the window locked, so two cadets confirming at the same moment,
+even on different replicas, cannot both take the last place.
+"""
+
+from collections import Counter
+
+from config.constants import ACTIVITIES, SFT_DEFAULT_MIN_GROUP
+
+SLOT_MINUTES = 15
+
+
+def activity_key(activity: str, location: str) -> str:
+    """The ACTIVITIES entry a stored (activity, location) pair belongs to."""
+    return f"{activity} @ {location}" if location else activity
+
+
+def activity_rules(key: str) -> tuple[int, int | None]:
+    """(minimum group size, capacity per slot or None) for an activity."""
+    rules = ACTIVITIES.get(key, {})
+    return rules.get("min", SFT_DEFAULT_MIN_GROUP), rules.get("max")
+
+
+def _slots(start: str, end: str) -> tuple[int, ...]:
+    start_m = int(start[:2]) * 60 + int(start[2:])
+    end_m = int(end[:2]) * 60 + int(end[2:])
+    return tuple(range(start_m - start_m % SLOT_MINUTES, end_m, SLOT_MINUTES))
+
+
+def capacity_check(key: str, start: str, end: str):
+    """The ``check`` for ``crud.add_sft_submission`` of a ``start``-``end`` place at ``key``.
+
+    It is given the (start, end) of the other places at the activity in the window and
+    raises ValueError when a slot in the range is already at capacity.
+    """
+    _, capacity = activity_rules(key)
+    slots = _slots(start, end)
+
+    def check(taken: list[tuple[str, str]]):
+        if capacity is None:
+            return
+        occupancy = Counter(slot for other_start, other_end in taken for slot in _slots(other_start, other_end))
+        full = [slot for slot in slots if occupancy[slot] >= capacity]
+        if full:
+            first = f"{full[0] // 60:02d}{full[0] % 60:02d}"
+            raise ValueError(f"{key} is full from {first} ({capacity} max). Please pick another activity or time.")
+
+    return check
+
+
+def window_counts(submissions) -> dict[str, tuple[int, int]]:
+    """(participants, busiest-slot occupancy) per activity for a window's submissions."""
+    participants = Counter()
+    slots: dict[str, Counter] = {}
+    for submission in submissions:
+        key = activity_key(submission.activity, submission.location)
+        participants[key] += 1
+        slots.setdefault(key, Counter()).update(_slots(submission.start, submission.end))
+    return {key: (participants[key], max(slots[key].values(), default=0)) for key in participants}
@@ -0,0 +1,173 @@
+"""Tenants (wings) served by this process, and which one an update belongs to.
+
+Tenants are few and rarely edited, so all of them are held in memory, indexed by id
+and by every chat they own: an update from a group resolves with one dictionary
+lookup. Private chats resolve through the sender's ``users.tenant_id``, read once per
+registered user and then cached. Imports and tenant edits call ``invalidate``, which
+bumps the ``tenants`` cache generation; every process checks it at most once per
+``TENANT_REGISTRY_CHECK_SECONDS`` and reloads when it moved.
+"""
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+
+from config.constants import DEFAULT_TENANT_SLUG, LOCATIONS, TENANT_REGISTRY_CHECK_SECONDS
+
+TENANTS_GENERATION = "tenants"
+
+
+@dataclass(frozen=True, slots=True)
+class TenantConfig:
+    id: int
+    slug: str
+    name: str
+    parade_header: str
+    ic_group_chat_id: int
+    cadet_chat_id: int | None
+    movement_topic_id: int | None
+    sft_topic_id: int | None
+    parade_state_topic_id: int | None
+    cet_topic_id: int | None
+    cadet_cet_topic_id: int | None
+    locations: tuple[str, ...]
+    is_default: bool
+
+    @classmethod
+    def from_row(cls, row, is_default: bool) -> "TenantConfig":
+        return cls(
+            id=row.id,
+            slug=row.slug,
+            name=row.name,
+            parade_header=row.parade_header,
+            ic_group_chat_id=row.ic_group_chat_id,
+            cadet_chat_id=row.cadet_chat_id,
+            movement_topic_id=row.movement_topic_id,
+            sft_topic_id=row.sft_topic_id,
+            parade_state_topic_id=row.parade_state_topic_id,
+            cet_topic_id=row.cet_topic_id,
+            cadet_cet_topic_id=row.cadet_cet_topic_id,
+            locations=tuple(json.loads(row.locations)) if row.locations else tuple(LOCATIONS),
+            is_default=is_default,
+        )
+
+    def state_key(self, key: str) -> str:
+        """The app_state key for this tenant; the default tenant keeps the pre-tenant keys."""
+        return key if self.is_default else f"{key}.{self.slug}"
+
+
+class TenantRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._by_id: dict[int, TenantConfig] = {}
+        self._by_chat: dict[int, TenantConfig] = {}
+        self._user_tenant: dict[int, int] = {}
+        self._default: TenantConfig | None = None
+        self._generation = 0
+        self._next_check = 0.0
+
+    def _check_generation(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        from db.crud import get_cache_generation
+
+        generation = get_cache_generation(TENANTS_GENERATION)
+        self._next_check = now + TENANT_REGISTRY_CHECK_SECONDS
+        if generation != self._generation:
+            self._generation = generation
+            self._user_tenant.clear()
+            self._loaded = False
+
+    def _ensure_loaded(self):
+        self._check_generation()
+        if self._loaded:
+            return
+        from db.crud import get_tenants
+
+        rows = get_tenants()
+        if not rows:
+            raise RuntimeError("No active tenant found; run db.init_db first")
+        default_id = next((row.id for row in rows if row.slug == DEFAULT_TENANT_SLUG), rows[0].id)
+        tenants = [TenantConfig.from_row(row, row.id == default_id) for row in rows]
+        self._by_id = {tenant.id: tenant for tenant in tenants}
+        self._by_chat = {tenant.ic_group_chat_id: tenant for tenant in tenants}
+        self._by_chat.update({tenant.cadet_chat_id: tenant for tenant in tenants if tenant.cadet_chat_id})
+        self._default = self._by_id[default_id]
+        self._loaded = True
+
+    def invalidate(self):
+        """Reloads tenants and user tenants here, and in other processes on their next check."""
+        from db.crud import bump_cache_generation
+
+        bump_cache_generation(TENANTS_GENERATION)
+        with self._lock:
+            self._next_check = 0.0
+
+    def load(self):
+        with self._lock:
+            self._ensure_loaded()
+
+    def all(self) -> list[TenantConfig]:
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._by_id.values())
+
+    def get(self, tenant_id: int | None) -> TenantConfig | None:
+        with self._lock:
+            self._ensure_loaded()
+            return self._by_id.get(tenant_id)
+
+    def default(self) -> TenantConfig:
+        with self._lock:
+            self._ensure_loaded()
+            return self._default
+
+    def for_chat(self, chat_id: int) -> TenantConfig | None:
+        """The tenant owning this IC group or cadet chat."""
+        with self._lock:
+            self._ensure_loaded()
+            return self._by_chat.get(chat_id)
+
+    def is_ic_group(self, chat_id: int) -> bool:
+        tenant = self.for_chat(chat_id)
+        return tenant is not None and tenant.ic_group_chat_id == chat_id
+
+    def for_user(self, telegram_id: int, telegram_username: str | None = None) -> TenantConfig:
+        """The user's tenant; unregistered users and users without one get the default."""
+        with self._lock:
+            self._ensure_loaded()
+            cached = telegram_id in self._user_tenant
+            tenant_id = self._user_tenant.get(telegram_id)
+        if not cached:
+            from db.crud import get_user_tenant_id
+
+            tenant_id = get_user_tenant_id(telegram_id, telegram_username)
+            if tenant_id is not None:
+                # Not remembered for unregistered users: an import in another process may add them
+                with self._lock:
+                    self._user_tenant[telegram_id] = tenant_id
+        with self._lock:
+            self._ensure_loaded()
+            return self._by_id.get(tenant_id) or self._default
+
+    def for_update(self, update) -> TenantConfig:
+        """The tenant of the chat the update came from, else of the user who sent it."""
+        chat = update.effective_chat
+        if chat and chat.type != "private":
+            tenant = self.for_chat(chat.id)
+            if tenant:
+                return tenant
+        user = update.effective_user
+        if user:
+            return self.for_user(user.id, user.username)
+        return self.default()
+
+
+tenant_registry = TenantRegistry()
+
+
+def tenant_for_update(update) -> TenantConfig:
+    return tenant_registry.for_update(update)
@@ -0,0 +1,143 @@
+import asyncio
+import os
+
+# The bot reads its configuration at import time; point it at an in-memory database
+# (shared between the pool's connections and the worker threads) before anything loads.
+os.environ["DATABASE_URL"] = "sqlite:///file:telebot_tests?mode=memory&cache=shared&uri=true&check_same_thread=false"
+os.environ.setdefault("BOT_TOKEN", "123456:TEST")
+
+import pytest
+from telegram import Bot
+from telegram.ext import ApplicationBuilder
+
+from fake_telegram import FakeTelegramRequest, FakeUser, FlowDriver
+
+IC_ADMIN = FakeUser(101, "Ada", "ic_admin")
+CADET = FakeUser(201, "Ben", "cadet_ben")
+# Members of a second wing; its cadet shares a name with CADET
+OTHER_ADMIN = FakeUser(102, "Eve", "other_admin")
+OTHER_CADET = FakeUser(202, "Ben", "other_ben")
+
+# (full_name, rank, role, telegram user, is_admin)
+ROSTER = [
+    ("ADA LIM", "LTA", "instructor", IC_ADMIN, True),
+    ("BEN TAN", "OCT", "cadet", CADET, False),
+    ("CARL NG", "OCT", "cadet", None, False),
+    ("DAN KOH", "OCT", "cadet", None, False),
+]
+
+
+def _reset_database():
+    from db.database import get_engine
+    from db.init_db import init_db
+    from db.models import Base
+
+    Base.metadata.drop_all(bind=get_engine())
+    init_db()
+
+
+def _reset_caches():
+    from bot.shared import callback_data
+    from db.analytics import medical_trends
+    from db.parade import parade_read_model
+    from services.audit import audit_log
+    from services.tenants import tenant_registry
+    from utils.rate_limiter import user_rate_limiter
+
+    callback_data._ids.clear()
+    callback_data._values.clear()
+    tenant_registry.invalidate()
+    parade_read_model.invalidate()
+    medical_trends.invalidate()
+    audit_log.flush()
+    user_rate_limiter._events.clear()
+
+
+def _seed_roster(tenant_id: int):
+    from db.crud import create_user
+
+    for index, (full_name, rank, role, user, is_admin) in enumerate(ROSTER):
+        create_user(
+            full_name=full_name,
+            rank=rank,
+            role=role,
+            telegram_id=user.id if user else None,
+            telegram_username=user.username if user else f"user{index}",
+            is_admin=is_admin,
+            tenant_id=tenant_id,
+        )
+
+
+@pytest.fixture
+def ic_admin():
+    return IC_ADMIN
+
+
+@pytest.fixture
+def cadet():
+    return CADET
+
+
+@pytest.fixture
+def tenant():
+    """A fresh database holding the default tenant and ``ROSTER``."""
+    _reset_database()
+    _reset_caches()
+    from services.tenants import tenant_registry
+
+    default = tenant_registry.default()
+    _seed_roster(default.id)
+    tenant_registry.invalidate()
+    # Reloaded here, so the first step of a test does not pay for it
+    return tenant_registry.default()
+
+
+@pytest.fixture
+def other_admin():
+    return OTHER_ADMIN
+
+
+@pytest.fixture
+def other_cadet():
+    return OTHER_CADET
+
+
+@pytest.fixture
+def other_tenant(tenant):
+    """A second wing with its own IC group, admin and a cadet named like ``CADET``."""
+    from db.crud import create_tenant, create_user, update_tenant
+    from services.tenants import tenant_registry
+
+    row = create_tenant("dis-15", "DIS 15", "DIS 15 PARADE STATE", -1009000000001)
+    update_tenant(row.id, cadet_chat_id=-1009000000002, parade_state_topic_id=7)
+    create_user(
+        full_name="EVE ONG", rank="LTA", role="instructor", telegram_id=OTHER_ADMIN.id,
+        telegram_username=OTHER_ADMIN.username, is_admin=True, tenant_id=row.id,
+    )
+    create_user(
+        full_name="BEN TAN", rank="OCT", role="cadet", telegram_id=OTHER_CADET.id,
+        telegram_username=OTHER_CADET.username, is_admin=False, tenant_id=row.id,
+    )
+    tenant_registry.invalidate()
+    return tenant_registry.get(row.id)
+
+
+@pytest.fixture
+def telegram(tenant):
+    """A FlowDriver over the real handlers, wired as in main.py."""
+    from db.database import get_engine
+    from main import register_handlers
+
+    loop = asyncio.new_event_loop()
+    request = FakeTelegramRequest()
+    bot = Bot(os.environ["BOT_TOKEN"], request=request, get_updates_request=FakeTelegramRequest())
+    application = ApplicationBuilder().bot(bot).updater(None).job_queue(None).build()
+    register_handlers(application)
+    loop.run_until_complete(application.initialize())
+
+    driver = FlowDriver(application, request, get_engine(), loop)
+    yield driver
+
+    driver.close()
+    loop.run_until_complete(application.shutdown())
+    loop.close()
@@ -0,0 +1,254 @@
+"""In-memory Telegram for driving the real handlers in tests.
+
+``FakeTelegramRequest`` stands in for the HTTP layer of a real ``telegram.Bot``:
+every Bot API call is recorded and answered from memory, and the messages the bot
+sends or edits are kept so a test can press the buttons it actually rendered.
+``FlowDriver`` scripts a conversation on top of it, one step per user action, and
+reports what each step cost: API calls, SQL statements and wall time.
+"""
+
+import asyncio
+import itertools
+import json
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from telegram import Update
+from telegram.request import BaseRequest
+
+BOT_USER = {"id": 7000000001, "is_bot": True, "first_name": "Telebot", "username": "telebot_test_bot"}
+
+# Shared by every fake so message ids never repeat within a test run
+_message_ids = itertools.count(1000)
+_update_ids = itertools.count(1)
+
+
+@dataclass(frozen=True, slots=True)
+class ApiCall:
+    method: str
+    params: dict
+
+    @property
+    def chat_id(self):
+        return self.params.get("chat_id")
+
+    @property
+    def text(self) -> str:
+        return self.params.get("text", "")
+
+
+@dataclass(frozen=True, slots=True)
+class FakeUser:
+    id: int
+    first_name: str
+    username: str | None = None
+
+    def to_dict(self) -> dict:
+        user = {"id": self.id, "is_bot": False, "first_name": self.first_name}
+        if self.username:
+            user["username"] = self.username
+        return user
+
+
+class FakeTelegramRequest(BaseRequest):
+    def __init__(self):
+        self.calls: list[ApiCall] = []
+        # (chat_id, message_id) -> message as Telegram would return it
+        self.messages: dict[tuple[int, int], dict] = {}
+        # (method, chat_id) of calls that fail once with 502 Bad Gateway
+        self._failures: list[tuple[str, int]] = []
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None, connect_timeout=None, pool_timeout=None):
+        api_method = url.rsplit("/", 1)[-1]
+        params = dict(request_data.parameters) if request_data else {}
+        if request_data and request_data.contains_files:
+            # Read here, as the HTTP client would, so an upload is seen as sent
+            params["files"] = {
+                name: (filename, content if isinstance(content, bytes) else content.read())
+                for name, (filename, content, _) in request_data.multipart_data.items()
+            }
+        self.calls.append(ApiCall(api_method, params))
+        if (api_method, params.get("chat_id")) in self._failures:
+            self._failures.remove((api_method, params.get("chat_id")))
+            return 502, json.dumps({"ok": False, "error_code": 502, "description": "Bad Gateway"}).encode()
+        result = self._answer(api_method, params)
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+    def fail_next(self, method: str, chat_id: int):
+        """Makes the next ``method`` call to ``chat_id`` fail as a network error."""
+        self._failures.append((method, chat_id))
+
+    def _answer(self, method: str, params: dict):
+        if method == "getMe":
+            return BOT_USER
+        if method in ("sendMessage", "sendDocument"):
+            return self._store(params["chat_id"], next(_message_ids), params)
+        if method == "editMessageText":
+            return self._store(params["chat_id"], params["message_id"], params, edited=True)
+        if method == "editMessageReplyMarkup":
+            message = self.messages[(params["chat_id"], params["message_id"])]
+            message["edit_date"] = int(time.time())
+            _set_markup(message, params.get("reply_markup"))
+            return message
+        return True
+
+    def _store(self, chat_id, message_id, params, edited=False) -> dict:
+        message = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": _chat(chat_id),
+            "from": BOT_USER,
+            "text": params.get("text", ""),
+        }
+        if params.get("message_thread_id"):
+            message["message_thread_id"] = params["message_thread_id"]
+        if edited:
+            message["edit_date"] = int(time.time())
+        # Like Telegram, an edit without a keyboard removes the old one
+        _set_markup(message, params.get("reply_markup"))
+        self.messages[(chat_id, message_id)] = message
+        return message
+
+    def messages_in(self, chat_id: int) -> list[dict]:
+        return [message for (chat, _), message in self.messages.items() if chat == chat_id]
+
+
+def _chat(chat_id: int) -> dict:
+    if chat_id > 0:
+        return {"id": chat_id, "type": "private", "first_name": "User"}
+    return {"id": chat_id, "type": "supergroup", "title": "Group", "is_forum": True}
+
+
+def _set_markup(message: dict, markup):
+    if isinstance(markup, str):
+        markup = json.loads(markup)
+    if markup:
+        message["reply_markup"] = markup
+    else:
+        message.pop("reply_markup", None)
+
+
+@dataclass(slots=True)
+class Step:
+    """What one user action cost."""
+
+    action: str
+    calls: list[ApiCall] = field(default_factory=list)
+    queries: int = 0
+    seconds: float = 0.0
+
+    def count(self, method: str) -> int:
+        return sum(call.method == method for call in self.calls)
+
+    def sent_to(self, chat_id: int) -> list[ApiCall]:
+        return [call for call in self.calls if call.method == "sendMessage" and call.chat_id == chat_id]
+
+    @property
+    def last_text(self) -> str:
+        """Text of the last message the bot sent or edited during the step."""
+        texts = [call.text for call in self.calls if call.method in ("sendMessage", "editMessageText")]
+        return texts[-1] if texts else ""
+
+    def assert_budget(self, calls: int | None = None, queries: int | None = None, seconds: float | None = None):
+        if calls is not None:
+            assert len(self.calls) <= calls, f"{self.action}: {len(self.calls)} API calls, budget {calls}: {[c.method for c in self.calls]}"
+        if queries is not None:
+            assert self.queries <= queries, f"{self.action}: {self.queries} SQL statements, budget {queries}"
+        if seconds is not None:
+            assert self.seconds <= seconds, f"{self.action}: took {self.seconds:.3f}s, budget {seconds}s"
+        return self
+
+
+class FlowDriver:
+    """Feeds updates from fake users through an initialised Application, one step at a time."""
+
+    def __init__(self, application, request: FakeTelegramRequest, engine, loop: asyncio.AbstractEventLoop):
+        self.application = application
+        self.request = request
+        self.loop = loop
+        self.steps: list[Step] = []
+        self._queries = 0
+        event.listen(engine, "before_cursor_execute", self._count_query)
+        self._engine = engine
+
+    def _count_query(self, *args):
+        self._queries += 1
+
+    def close(self):
+        event.remove(self._engine, "before_cursor_execute", self._count_query)
+
+    def _process(self, action: str, update_dict: dict) -> Step:
+        update = Update.de_json({"update_id": next(_update_ids), **update_dict}, self.application.bot)
+        first_call, first_query = len(self.request.calls), self._queries
+        started = time.perf_counter()
+        self.loop.run_until_complete(self.application.process_update(update))
+        step = Step(
+            action,
+            calls=self.request.calls[first_call:],
+            queries=self._queries - first_query,
+            seconds=time.perf_counter() - started,
+        )
+        self.steps.append(step)
+        return step
+
+    def _user_message(self, user: FakeUser, text: str, chat_id: int | None = None) -> dict:
+        return {
+            "message_id": next(_message_ids),
+            "date": int(time.time()),
+            "chat": _chat(chat_id) if chat_id else {"id": user.id, "type": "private", "first_name": user.first_name},
+            "from": user.to_dict(),
+            "text": text,
+        }
+
+    def command(self, user: FakeUser, text: str, chat_id: int | None = None) -> Step:
+        """Sends a command in the user's private chat, or in the group ``chat_id``."""
+        message = self._user_message(user, text, chat_id)
+        command = text.split()[0]
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        return self._process(text, {"message": message})
+
+    def text(self, user: FakeUser, text: str) -> Step:
+        return self._process(f"text {text!r}", {"message": self._user_message(user, text)})
+
+    def keyboard(self, user: FakeUser) -> dict:
+        """The newest message in the user's chat that still shows buttons."""
+        for message in sorted(self.request.messages_in(user.id), key=lambda m: m["message_id"], reverse=True):
+            if message.get("reply_markup"):
+                return message
+        raise AssertionError(f"No message with buttons in chat {user.id}")
+
+    def buttons(self, user: FakeUser) -> list[str]:
+        rows = self.keyboard(user)["reply_markup"]["inline_keyboard"]
+        return [button["text"] for row in rows for button in row]
+
+    def tap(self, user: FakeUser, label: str, message: dict | None = None) -> Step:
+        """Presses the button labelled ``label`` (or containing it) on ``message`` or the newest keyboard."""
+        message = message or self.keyboard(user)
+        buttons = [button for row in message["reply_markup"]["inline_keyboard"] for button in row]
+        matches = [button for button in buttons if button["text"] == label] or [
+            button for button in buttons if label in button["text"]
+        ]
+        if not matches:
+            raise AssertionError(f"No button {label!r} in {[button['text'] for button in buttons]}")
+        query = {
+            "id": str(next(_update_ids)),
+            "from": user.to_dict(),
+            "chat_instance": str(user.id),
+            "data": matches[0]["callback_data"],
+            "message": json.loads(json.dumps(message)),
+        }
+        return self._process(f"tap {label!r}", {"callback_query": query})
+
+    def calls_to(self, chat_id: int, method: str = "sendMessage") -> list[ApiCall]:
+        return [call for call in self.request.calls if call.method == method and call.chat_id == chat_id]
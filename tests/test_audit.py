@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from db.database import SessionLocal
+from db.models import AuditEvent
+from services.audit import AuditLog
+
+
+class _JobQueue:
+    def __init__(self):
+        self.once = []
+
+    def run_once(self, callback, when, name=None):
+        self.once.append(name)
+
+
+def _stored_actions() -> list[str]:
+    with SessionLocal() as session:
+        return [action for (action,) in session.query(AuditEvent.action).order_by(AuditEvent.id)]
+
+
+@pytest.fixture
+def log(tenant):
+    return AuditLog()
+
+
+def test_full_batch_is_flushed_early_once(log, monkeypatch):
+    monkeypatch.setattr("services.audit.AUDIT_FLUSH_BATCH_SIZE", 3)
+    log._job_queue = _JobQueue()
+    log.record("a")
+    log.record("b")
+    assert log._job_queue.once == []
+
+    log.record("c")
+    log.record("d")
+    # Scheduled once until that flush runs
+    assert log._job_queue.once == ["audit_flush_batch"]
+    assert log.flush() == 4
+    log.record("e")
+    log.record("f")
+    log.record("g")
+    assert log._job_queue.once == ["audit_flush_batch"] * 2
+
+
+def test_failed_write_is_retried_ahead_of_newer_events(log, monkeypatch):
+    def unreachable(batch):
+        raise ConnectionError("database unreachable")
+
+    log.record("a")
+    log.record("b")
+    with monkeypatch.context() as patch:
+        patch.setattr("services.audit.insert_audit_events", unreachable)
+        assert log.flush() == 0
+    log.record("c")
+
+    assert log.flush() == 3
+    assert _stored_actions() == ["a", "b", "c"]
+
+
+def test_oldest_events_are_dropped_beyond_the_cap(log, monkeypatch):
+    monkeypatch.setattr("services.audit.AUDIT_BUFFER_MAX", 3)
+    for action in "abcd":
+        log.record(action)
+    assert log.pending() == 3
+
+    with monkeypatch.context() as patch:
+        patch.setattr("services.audit.insert_audit_events", lambda batch: 1 / 0)
+        log.flush()
+    log.record("e")
+    assert log.flush() == 3
+    assert _stored_actions() == ["c", "d", "e"]
+
+
+def test_buffer_is_written_at_shutdown(log, monkeypatch):
+    from main import _flush_audit_log
+
+    monkeypatch.setattr("main.audit_log", log)
+    log.record("a")
+    asyncio.run(_flush_audit_log(None))
+    assert log.pending() == 0
+    assert _stored_actions() == ["a"]
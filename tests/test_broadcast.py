@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+
+from bot.broadcast import default_schedules, render_template
+from db.crud import get_active_broadcast_schedules, seed_broadcast_schedules
+from db.database import session_scope
+from db.models import BroadcastSchedule
+from utils.cron import CronSchedule
+from utils.datetime_utils import SG_TZ
+
+
+def _sg(*args) -> datetime:
+    return SG_TZ.localize(datetime(*args))
+
+
+@pytest.mark.parametrize(
+    "expression, after, expected",
+    [
+        # Friday evening to Monday morning
+        ("30 7 * * mon-fri", _sg(2026, 10, 16, 8, 0), _sg(2026, 10, 19, 7, 30)),
+        ("*/20 8-9 * * *", _sg(2026, 10, 19, 8, 40), _sg(2026, 10, 19, 9, 0)),
+        # Strictly after: a firing at ``after`` itself is skipped
+        ("0 9 * * *", _sg(2026, 10, 19, 9, 0), _sg(2026, 10, 20, 9, 0)),
+        # Both day fields restricted: either one matches (the 1st, or a Sunday)
+        ("0 9 1 * 0", _sg(2026, 10, 19, 10, 0), _sg(2026, 10, 25, 9, 0)),
+        ("0 0 29 feb *", _sg(2026, 1, 1), _sg(2028, 2, 29)),
+    ],
+)
+def test_next_firing(expression, after, expected):
+    assert CronSchedule(expression).next_after(after) == expected
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "0 9 * * fri-mon", "*/0 * * * *", "0 9 x * *"])
+def test_invalid_expressions_are_rejected(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_template_placeholders():
+    when = _sg(2026, 10, 19, 7, 30)
+    assert render_template("{day} {date} {time} {literal}", when) == "Monday 191026 0730 {literal}"
+
+
+def test_defaults_are_seeded_once(tenant):
+    defaults = default_schedules()
+    assert seed_broadcast_schedules(defaults) == len(defaults)
+
+    # Deleted by an admin: later boots and reloads must not bring them back
+    with session_scope() as session:
+        session.query(BroadcastSchedule).delete()
+    assert seed_broadcast_schedules(defaults) == 0
+    assert get_active_broadcast_schedules() == []
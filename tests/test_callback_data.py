@@ -0,0 +1,34 @@
+from bot.shared import callback_data
+from bot.shared.callback_data import pack_callback, pack_callbacks, unpack_callback
+
+
+def _restart():
+    callback_data._ids.clear()
+    callback_data._values.clear()
+
+
+def test_values_round_trip_and_stay_short(tenant):
+    long_name = "OCT " + "VERY LONG NAME " * 6
+    data = pack_callback("mov:name", long_name)
+    assert len(data.encode()) <= 64
+    assert unpack_callback(data) == ("mov:name", long_name)
+
+
+def test_buttons_decode_to_the_same_value_after_a_restart(tenant):
+    old_buttons = pack_callbacks("sft_activity", ["Swim", "Gym"])
+    _restart()
+    # The new process sees other values first; the old ids must not be reused for them
+    pack_callbacks("sft_activity", ["OCT BEN TAN", "Run"])
+    _restart()
+    assert [unpack_callback(data)[1] for data in old_buttons] == ["Swim", "Gym"]
+    assert pack_callbacks("sft_activity", ["Gym", "Swim"]) == old_buttons[::-1]
+
+
+def test_unknown_ids_are_rejected(tenant):
+    pack_callback("sft_activity", "Swim")
+    assert unpack_callback("sft_activity|~zz") == ("sft_activity", None)
+    assert unpack_callback("sft_activity|~!?") == ("sft_activity", None)
+
+
+def test_plain_payloads_pass_through(tenant):
+    assert unpack_callback("mov:back|names") == ("mov:back", "names")
@@ -0,0 +1,31 @@
+import gzip
+
+from db.crud import record_movement
+from db.database import session_scope
+from db.models import MovementLog
+
+
+def _document(step):
+    [call] = [call for call in step.calls if call.method == "sendDocument"]
+    [(filename, content)] = call.params["files"].values()
+    return call, filename, content
+
+
+def test_movement_export_notes_rows_of_deleted_users(telegram, tenant, ic_admin):
+    record_movement(["OCT BEN TAN", "OCT CARL NG"], "", "LIBRARY", "0900", ic_admin.id, tenant.id)
+    # As clear_user_data leaves a deleted cadet's movements
+    with session_scope() as session:
+        session.query(MovementLog).filter(MovementLog.id == 2).update({MovementLog.user_id: None})
+
+    call, filename, content = _document(telegram.command(ic_admin, "/export movements"))
+    assert filename.startswith("movements_") and filename.endswith(".csv")
+    lines = content.decode("utf-8-sig").splitlines()
+    assert len(lines) == 2 and "BEN TAN" in lines[1]
+    assert "1 row(s)" in call.params["caption"]
+    assert "1 row(s) of deleted users" in call.params["caption"]
+
+
+def test_compressed_export_is_uploaded_whole(telegram, ic_admin):
+    _, filename, content = _document(telegram.command(ic_admin, "/export roster gz"))
+    assert filename == "roster.csv.gz"
+    assert "ADA LIM" in gzip.decompress(content).decode("utf-8-sig")
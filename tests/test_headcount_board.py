@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+from bot.headcount_board import HeadcountBoard
+from db.crud import record_movement
+
+
+def _board_text(telegram, tenant) -> str:
+    return telegram.calls_to(tenant.ic_group_chat_id, "editMessageText")[-1].text
+
+
+def test_board_counts_movements_from_every_process(telegram, tenant, ic_admin):
+    bot = telegram.application.bot
+    # Two replicas, each with its own board object
+    this_process, other_process = HeadcountBoard(tenant), HeadcountBoard(tenant)
+    telegram.loop.run_until_complete(this_process.post(bot))
+
+    transitions = record_movement(["OCT BEN TAN", "OCT CARL NG"], "", "LIBRARY", "0900", ic_admin.id, tenant.id)
+    assert transitions == [(None, "LIBRARY"), (None, "LIBRARY")]
+    telegram.loop.run_until_complete(this_process._flush(SimpleNamespace(bot=bot)))
+    assert "LIBRARY: 2" in _board_text(telegram, tenant)
+
+    # Moved and refreshed by the other replica; this one's next edit still agrees
+    record_movement(["OCT BEN TAN"], "LIBRARY", "STADIUM", "0930", ic_admin.id, tenant.id)
+    telegram.loop.run_until_complete(other_process._flush(SimpleNamespace(bot=bot)))
+    telegram.loop.run_until_complete(this_process._flush(SimpleNamespace(bot=bot)))
+    text = _board_text(telegram, tenant)
+    assert "LIBRARY: 1" in text and "STADIUM: 1" in text
+
+
+def test_moves_that_change_nothing_are_not_reported(tenant, ic_admin):
+    record_movement(["OCT BEN TAN"], "", "LIBRARY", "0900", ic_admin.id, tenant.id)
+    assert record_movement(["OCT BEN TAN"], "LIBRARY", "LIBRARY", "0930", ic_admin.id, tenant.id) == []
+    # Back-dated behind the known position
+    assert record_movement(["OCT BEN TAN"], "", "STADIUM", "0800", ic_admin.id, tenant.id) == []
@@ -0,0 +1,41 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from db.crud import claim_idempotency_key
+from services.idempotency import once
+from utils.datetime_utils import now_sg
+
+
+async def _run_once(key: str, action=None) -> bool:
+    async with once(key) as first:
+        if first and action:
+            action()
+    return first
+
+
+def test_action_runs_once(tenant):
+    assert asyncio.run(_run_once("k")) is True
+    assert asyncio.run(_run_once("k")) is False
+
+
+def test_failed_action_releases_its_key(tenant):
+    def fail():
+        raise RuntimeError("send failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(_run_once("k", fail))
+    assert asyncio.run(_run_once("k")) is True
+    assert asyncio.run(_run_once("k")) is False
+
+
+def test_claim_of_a_dead_process_lapses_with_its_lease(tenant):
+    now = now_sg().replace(tzinfo=None)
+    # A process claimed the key and died before finishing
+    assert claim_idempotency_key("k", now + timedelta(seconds=60), now)
+    assert asyncio.run(_run_once("k")) is False
+
+    later = now + timedelta(seconds=61)
+    assert claim_idempotency_key("k", later + timedelta(seconds=60), later)
+    assert not claim_idempotency_key("k", later + timedelta(seconds=60), later)
@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+import db.init_db as init_db_module
+from db.init_db import SCHEMA_VERSION, init_db
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """A database of its own, so the upgrade can start from an old schema."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'bot.db'}")
+    monkeypatch.setattr(init_db_module, "get_engine", lambda: engine)
+    yield engine
+    engine.dispose()
+
+
+def _recorded(engine) -> list[int]:
+    with engine.connect() as connection:
+        return [row[0] for row in connection.execute(text("SELECT version FROM schema_version"))]
+
+
+def test_newer_schema_is_left_alone(engine, capsys):
+    init_db()
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE schema_version SET version = :version"), {"version": SCHEMA_VERSION + 1})
+
+    init_db()
+    assert "newer" in capsys.readouterr().out
+    assert _recorded(engine) == [SCHEMA_VERSION + 1]
+
+
+# The tables as schema v1 created them, where later versions changed them
+V1_TABLES = [
+    """CREATE TABLE users (
+        id INTEGER PRIMARY KEY, telegram_id BIGINT UNIQUE, telegram_username VARCHAR UNIQUE,
+        full_name VARCHAR NOT NULL, rank VARCHAR NOT NULL, role VARCHAR NOT NULL,
+        is_admin BOOLEAN, is_active BOOLEAN, created_at DATETIME, updated_at DATETIME)""",
+    """CREATE TABLE sft_sessions (
+        id INTEGER PRIMARY KEY, date VARCHAR NOT NULL, start VARCHAR NOT NULL,
+        "end" VARCHAR NOT NULL, is_active BOOLEAN NOT NULL, created_at DATETIME)""",
+    """CREATE TABLE movement_logs (
+        id INTEGER PRIMARY KEY, user_id INTEGER REFERENCES users (id), from_location VARCHAR NOT NULL,
+        to_location VARCHAR NOT NULL, time VARCHAR NOT NULL, moved_at DATETIME,
+        created_by BIGINT NOT NULL, created_at DATETIME)""",
+    "CREATE TABLE schema_version (version INTEGER PRIMARY KEY, applied_at DATETIME)",
+]
+
+
+def test_v1_database_is_upgraded_in_place(engine):
+    with engine.begin() as connection:
+        for statement in V1_TABLES:
+            connection.execute(text(statement))
+        connection.execute(text(
+            "INSERT INTO users (id, telegram_id, full_name, rank, role, is_admin, is_active)"
+            " VALUES (1, 201, 'BEN TAN', 'OCT', 'cadet', 0, 1)"
+        ))
+        connection.execute(text(
+            "INSERT INTO sft_sessions (id, date, start, \"end\", is_active) VALUES (1, '19102026', '1800', '1930', 1)"
+        ))
+        connection.execute(text("INSERT INTO schema_version (version) VALUES (1)"))
+
+    init_db()
+
+    assert _recorded(engine) == [SCHEMA_VERSION]
+    with engine.connect() as connection:
+        default_tenant = connection.execute(text("SELECT id FROM tenants")).scalar_one()
+        # Rows from before tenants belong to the default one
+        assert connection.execute(text("SELECT tenant_id FROM users")).scalar_one() == default_tenant
+        window = connection.execute(text("SELECT date, start, \"end\", tenant_id FROM sft_sessions")).one()
+        assert tuple(window) == ("2026-10-19", "18:00:00.000000", "19:30:00.000000", default_tenant)
+        # Columns and tables added since v1
+        connection.execute(text("SELECT completed_at FROM idempotency_keys"))
+        connection.execute(text("SELECT lease_owner FROM scheduled_jobs"))
+        generation = connection.execute(text("SELECT generation FROM cache_generations WHERE name = 'medical'"))
+        assert generation.scalar_one() == 0
+
+    # A second boot finds the schema current and changes nothing
+    init_db()
+    assert _recorded(engine) == [SCHEMA_VERSION]
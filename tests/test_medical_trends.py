@@ -0,0 +1,26 @@
+from db.analytics import MedicalTrends, medical_trends
+from db.crud import create_user_record
+from utils.datetime_utils import now_sg
+
+
+def _this_week_rso(trends, tenant) -> int:
+    return trends.weeks(4, now_sg().date(), tenant.id)[-1].counts["RSO"]
+
+
+def test_local_write_forgets_only_its_week(tenant):
+    assert _this_week_rso(medical_trends, tenant) == 0
+    closed = dict(medical_trends._closed)
+    assert len(closed) == 3
+
+    create_user_record(name="OCT BEN TAN", symptoms="FEVER")
+    assert medical_trends._closed == closed
+    assert _this_week_rso(medical_trends, tenant) == 1
+
+
+def test_write_from_another_process_is_picked_up(tenant):
+    # A second process's cache; the current week would otherwise be served for the TTL
+    replica = MedicalTrends()
+    assert _this_week_rso(replica, tenant) == 0
+
+    create_user_record(name="OCT BEN TAN", symptoms="FEVER")
+    assert _this_week_rso(replica, tenant) == 1
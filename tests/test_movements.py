@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from db.crud import get_current_locations, get_location_headcounts, get_movement_history, movement_datetime, record_movement
+from utils.datetime_utils import now_sg
+
+
+def _location(name: str):
+    return next(location for _, full_name, location, _ in get_current_locations() if full_name == name)
+
+
+def test_back_dated_report_is_logged_but_does_not_move_the_cadet(tenant, ic_admin):
+    record_movement(["OCT BEN TAN"], "", "LIBRARY", "1000", ic_admin.id, tenant.id)
+    # Reported late, for a move before the one already known
+    assert record_movement(["OCT BEN TAN"], "", "STADIUM", "0900", ic_admin.id, tenant.id) == []
+    assert _location("BEN TAN") == "LIBRARY"
+
+    history = get_movement_history("OCT BEN TAN", tenant_id=tenant.id)
+    assert [(log.to_location, log.time) for log in history] == [("LIBRARY", "1000"), ("STADIUM", "0900")]
+
+
+def test_later_report_moves_the_cadet(tenant, ic_admin):
+    record_movement(["OCT BEN TAN", "OCT CARL NG"], "", "LIBRARY", "0900", ic_admin.id, tenant.id)
+    transitions = record_movement(["OCT BEN TAN"], "LIBRARY", "STADIUM", "0930", ic_admin.id, tenant.id)
+    assert transitions == [("LIBRARY", "STADIUM")]
+    assert (_location("BEN TAN"), _location("CARL NG"), _location("DAN KOH")) == ("STADIUM", "LIBRARY", None)
+
+    counts, total = get_location_headcounts(tenant.id)
+    assert (counts, total) == ({"LIBRARY": 1, "STADIUM": 1}, 3)
+
+
+def test_unknown_names_are_ignored(tenant, ic_admin):
+    assert record_movement(["OCT NO ONE", "LTA BEN TAN"], "", "LIBRARY", "0900", ic_admin.id, tenant.id) == []
+    assert get_movement_history("OCT NO ONE", tenant_id=tenant.id) == []
+
+
+def test_time_ahead_of_now_is_yesterdays(tenant, ic_admin, monkeypatch):
+    after_midnight = now_sg().replace(hour=0, minute=10, second=0, microsecond=0)
+    monkeypatch.setattr("db.crud.now_sg", lambda: after_midnight)
+    # Reported late for last night; as tonight's it would outrank every move today
+    assert record_movement(["OCT BEN TAN"], "", "LIBRARY", "2350", ic_admin.id, tenant.id) == [(None, "LIBRARY")]
+    assert movement_datetime("2350", after_midnight.replace(tzinfo=None)).date() == after_midnight.date() - timedelta(days=1)
+
+    assert record_movement(["OCT BEN TAN"], "LIBRARY", "STADIUM", "0005", ic_admin.id, tenant.id) == [("LIBRARY", "STADIUM")]
+    assert _location("BEN TAN") == "STADIUM"
+    # A few minutes ahead of the clock is still today
+    assert movement_datetime("0020", after_midnight.replace(tzinfo=None)).date() == after_midnight.date()
@@ -0,0 +1,42 @@
+import copy
+from types import SimpleNamespace
+
+from utils.datetime_utils import now_sg
+
+
+def _prepare_drafts(telegram):
+    from bot.features.parade import prepare_scheduled_parade_state
+
+    # The scheduler's replica: nothing it keeps in memory reaches the replica handling the tap
+    context = SimpleNamespace(bot=telegram.application.bot, bot_data={})
+    telegram.loop.run_until_complete(prepare_scheduled_parade_state(context, now_sg()))
+
+
+def test_draft_is_sent_from_any_process(telegram, tenant, ic_admin):
+    telegram.command(ic_admin, "/start_parade_state")
+    telegram.text(ic_admin, "2")
+    telegram.tap(ic_admin, "Cancel")
+
+    _prepare_drafts(telegram)
+    assert "out of camp: 2" in telegram.calls_to(ic_admin.id)[-2].text
+
+    # Kept as delivered: the first tap removes the buttons
+    draft = copy.deepcopy(telegram.keyboard(ic_admin))
+    sent = telegram.tap(ic_admin, "Send", draft)
+    assert len(sent.sent_to(tenant.ic_group_chat_id)) == 1
+    assert "Parade state sent" in sent.last_text
+
+    repeat = telegram.tap(ic_admin, "Send", draft)
+    assert not repeat.sent_to(tenant.ic_group_chat_id)
+    assert "already sent" in repeat.last_text
+
+
+def test_unknown_draft_has_expired(telegram, ic_admin):
+    _prepare_drafts(telegram)
+    draft = telegram.keyboard(ic_admin)
+    for row in draft["reply_markup"]["inline_keyboard"]:
+        for button in row:
+            button["callback_data"] = button["callback_data"] + "0"
+
+    expired = telegram.tap(ic_admin, "Send", draft)
+    assert "Draft expired" in expired.last_text
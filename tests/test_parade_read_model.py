@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from db.crud import create_user_record, update_user_record
+from db.parade import ParadeReadModel, parade_read_model
+from utils.datetime_utils import now_sg
+
+
+def _count_loads(monkeypatch, model) -> list:
+    loads = []
+    original = model._load
+
+    def counting_load():
+        loads.append(1)
+        original()
+
+    monkeypatch.setattr(model, "_load", counting_load)
+    return loads
+
+
+def test_local_writes_are_applied_in_place(tenant, monkeypatch):
+    today = now_sg().date()
+    loads = _count_loads(monkeypatch, parade_read_model)
+    assert parade_read_model.snapshot(today).counts["RSO"] == 0
+
+    record = create_user_record(name="OCT BEN TAN", symptoms="FEVER")
+    snapshot = parade_read_model.snapshot(today)
+    assert [row.full_name for row in snapshot.events["RSO"]] == ["BEN TAN"]
+
+    start, end = today.strftime("%d%m%y"), (today + timedelta(days=1)).strftime("%d%m%y")
+    update_user_record(record.id, "FEVER", "VIRAL FEVER", "2 DAYS MC", start, end)
+    snapshot = parade_read_model.snapshot(today)
+    assert snapshot.counts["RSO"] == 0
+    assert [row.full_name for row in snapshot.statuses["MC"]] == ["BEN TAN"]
+    assert parade_read_model.snapshot(today + timedelta(days=1)).counts["MC"] == 1
+    assert parade_read_model.snapshot(today + timedelta(days=2)).counts["MC"] == 0
+
+    assert len(loads) == 1
+
+
+def test_writes_from_another_process_reload_the_model(tenant):
+    today = now_sg().date()
+    # A second process's model: it never sees this process's writes directly
+    replica = ParadeReadModel()
+    assert replica.snapshot(today).counts["RSO"] == 0
+
+    create_user_record(name="OCT BEN TAN", symptoms="FEVER")
+    assert [row.full_name for row in replica.snapshot(today).events["RSO"]] == ["BEN TAN"]
+
+
+def test_a_skipped_generation_reloads_instead_of_applying(tenant):
+    today = now_sg().date()
+    replica = ParadeReadModel()
+    replica.snapshot(today)
+
+    first = create_user_record(name="OCT BEN TAN", symptoms="FEVER")
+    second = create_user_record(name="OCT CARL NG", symptoms="COUGH")
+    # Only the second write reaches the replica; applying it alone would drop the first
+    replica.apply(replica._generation + 2, events=parade_read_model.snapshot(today).events["RSO"][1:])
+    rows = replica.snapshot(today).events["RSO"]
+    assert sorted(row.record_id for row in rows) == [first.id, second.id]
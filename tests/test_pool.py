@@ -0,0 +1,59 @@
+import sqlite3
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+from db.pool import InstrumentedQueuePool
+
+
+def _pool(size: int, overflow: int) -> InstrumentedQueuePool:
+    return InstrumentedQueuePool(lambda: sqlite3.connect(":memory:"), pool_size=size, max_overflow=overflow, timeout=0.05)
+
+
+def test_growing_under_held_checkouts_keeps_the_overflow_on_top():
+    pool = _pool(2, 1)
+    held = [pool.connect() for _ in range(3)]
+    assert pool.stats.overflow_events == 1
+
+    pool.resize(4)
+    held += [pool.connect() for _ in range(2)]
+    # Four kept open plus the one overflow, and no more
+    with pytest.raises(PoolTimeout):
+        pool.connect()
+    assert (pool.checkedout(), pool.stats.peak_in_use, pool.stats.overflow_events) == (5, 5, 2)
+
+    for connection in held:
+        connection.close()
+    assert (pool.size(), pool.checkedout(), pool.checkedin()) == (4, 0, 4)
+
+
+def test_shrinking_under_held_checkouts_closes_the_surplus_on_return():
+    pool = _pool(3, 0)
+    held = [pool.connect() for _ in range(3)]
+
+    pool.resize(1)
+    assert pool.checkedout() == 3
+    for connection in held:
+        connection.close()
+    assert (pool.size(), pool.checkedout(), pool.checkedin()) == (1, 0, 1)
+
+    kept = pool.connect()
+    with pytest.raises(PoolTimeout):
+        pool.connect()
+    kept.close()
+    assert pool.stats.overflow_events == 0
+
+
+def test_adaptive_sizing_follows_the_peak():
+    pool = _pool(2, 2)
+    pool.configure(adaptive=True, max_size=4, report_seconds=0)
+    held = [pool.connect() for _ in range(4)]
+    # The window ended on the last checkout, which overflowed: grown towards the peak
+    assert pool.size() == 4
+    for connection in held:
+        connection.close()
+
+    # A quiet window shrinks it one step at a time, never below the configured size
+    for expected in (3, 2, 2):
+        pool.connect().close()
+        assert pool.size() == expected
@@ -0,0 +1,168 @@
+"""RSO, RSI and MA flows driven end to end through the real handlers.
+
+Each step is held to a budget of Bot API calls and SQL statements, so a change
+that adds a round trip to a tap shows up here. The time budget is loose; it only
+catches a step that starts blocking (a sync query on the event loop, a retry sleep).
+"""
+
+from datetime import timedelta
+
+from utils.datetime_utils import now_sg
+
+STEP_SECONDS = 0.5
+
+
+def _start(telegram, user, menu_button):
+    telegram.command(user, "/start_status").assert_budget(calls=1, queries=4, seconds=STEP_SECONDS)
+    # The first name keyboard also assigns the names their callback ids
+    return telegram.tap(user, menu_button).assert_budget(calls=2, queries=4, seconds=STEP_SECONDS)
+
+
+def _active_statuses():
+    from db.parade import ParadeReadModel
+
+    # A fresh model reads what was committed, not this process's in-place updates
+    snapshot = ParadeReadModel().snapshot(now_sg().date())
+    return [row for rows in snapshot.statuses.values() for row in rows]
+
+
+def _send_batch(telegram, user):
+    telegram.tap(user, "Done").assert_budget(calls=2, queries=1, seconds=STEP_SECONDS)
+    return telegram.tap(user, "Send").assert_budget(calls=6, queries=8, seconds=STEP_SECONDS)
+
+
+def test_rso_report_reaches_ic_once(telegram, tenant, cadet, ic_admin):
+    from db.crud import get_user_records
+
+    _start(telegram, cadet, "Report RSO")
+    telegram.tap(cadet, "BEN TAN").assert_budget(calls=2, queries=1, seconds=STEP_SECONDS)
+    telegram.text(cadet, "FEVER AND COUGH").assert_budget(calls=2, queries=1, seconds=STEP_SECONDS)
+
+    preview = telegram.keyboard(cadet)
+    telegram.tap(cadet, "Confirm", preview).assert_budget(calls=2, queries=2, seconds=STEP_SECONDS)
+    sent = _send_batch(telegram, cadet)
+    to_ic = sent.sent_to(tenant.ic_group_chat_id)
+    assert len(to_ic) == 1
+    assert "OCT BEN TAN" in to_ic[0].text and "FEVER AND COUGH" in to_ic[0].text
+    assert to_ic[0].params.get("message_thread_id") == tenant.parade_state_topic_id
+    assert len(sent.sent_to(ic_admin.id)) == 1
+
+    # Replaying the preview's Confirm must not queue the report again
+    repeat = telegram.tap(cadet, "Confirm", preview).assert_budget(calls=2, queries=1)
+    assert "already confirmed" in repeat.last_text
+    assert not repeat.sent_to(tenant.ic_group_chat_id)
+
+    records = get_user_records("OCT BEN TAN")
+    assert [record.symptoms for record in records] == ["FEVER AND COUGH"]
+
+
+def test_failed_send_can_be_retried(telegram, tenant, cadet):
+    from db.crud import get_user_records
+
+    _start(telegram, cadet, "Report RSO")
+    telegram.tap(cadet, "BEN TAN")
+    telegram.text(cadet, "FEVER")
+    telegram.tap(cadet, "Confirm")
+    telegram.tap(cadet, "Done")
+
+    summary = telegram.keyboard(cadet)
+    telegram.request.fail_next("sendMessage", tenant.ic_group_chat_id)
+    failed = telegram.tap(cadet, "Send", summary)
+    assert failed.sent_to(tenant.ic_group_chat_id) and not get_user_records("OCT BEN TAN")
+
+    retry = telegram.tap(cadet, "Send", summary)
+    assert len(retry.sent_to(tenant.ic_group_chat_id)) == 1
+    assert "Sent to IC group" in retry.last_text
+    assert len(get_user_records("OCT BEN TAN")) == 1
+
+
+def test_batch_with_a_failing_report_saves_none_of_it(telegram, tenant, cadet):
+    from db.crud import get_user_records
+    from db.database import session_scope
+    from db.models import User
+
+    _start(telegram, cadet, "Report RSO")
+    telegram.tap(cadet, "BEN TAN")
+    telegram.text(cadet, "FEVER")
+    telegram.tap(cadet, "Confirm")
+    telegram.tap(cadet, "Report Another")
+    telegram.tap(cadet, "CARL NG")
+    telegram.text(cadet, "COUGH")
+    telegram.tap(cadet, "Confirm")
+    telegram.tap(cadet, "Done")
+
+    # The second cadet leaves the roster between confirming and sending
+    with session_scope() as session:
+        session.query(User).filter(User.full_name == "CARL NG").update({User.rank: "3SG"})
+    summary = telegram.keyboard(cadet)
+    telegram.tap(cadet, "Send", summary)
+    assert not get_user_records("OCT BEN TAN")
+
+    with session_scope() as session:
+        session.query(User).filter(User.full_name == "CARL NG").update({User.rank: "OCT"})
+    retry = telegram.tap(cadet, "Send", summary)
+    assert "Sent to IC group" in retry.last_text
+    assert len(get_user_records("OCT BEN TAN")) == len(get_user_records("OCT CARL NG")) == 1
+
+
+def test_rso_update_with_mc(telegram, tenant, cadet):
+    from db.crud import create_user_record, get_user_records
+
+    create_user_record(name="OCT BEN TAN", symptoms="Fever", diagnosis="")
+
+    _start(telegram, cadet, "Update RSO")
+    telegram.tap(cadet, "BEN TAN").assert_budget(calls=2, queries=2, seconds=STEP_SECONDS)
+    telegram.text(cadet, "VIRAL FEVER").assert_budget(calls=2, queries=1, seconds=STEP_SECONDS)
+    telegram.tap(cadet, "2").assert_budget(calls=2, queries=1, seconds=STEP_SECONDS)
+    telegram.tap(cadet, "Confirm").assert_budget(calls=2, queries=2, seconds=STEP_SECONDS)
+
+    sent = _send_batch(telegram, cadet)
+    to_ic = sent.sent_to(tenant.ic_group_chat_id)
+    assert len(to_ic) == 1
+    assert "2 DAYS MC" in to_ic[0].text
+
+    assert get_user_records("OCT BEN TAN")[-1].diagnosis == "VIRAL FEVER"
+    [status] = _active_statuses()
+    assert (status.full_name, status.section) == ("BEN TAN", "MC")
+    assert status.end_date - status.start_date == timedelta(days=1)
+
+
+def test_rsi_update(telegram, tenant, cadet):
+    from db.crud import create_rsi_record, get_user_rsi_records
+
+    create_rsi_record(name="OCT BEN TAN", symptoms="Sprained ankle", diagnosis="")
+
+    _start(telegram, cadet, "Update RSI")
+    telegram.tap(cadet, "BEN TAN").assert_budget(calls=2, queries=2, seconds=STEP_SECONDS)
+    telegram.text(cadet, "GRADE 1 SPRAIN").assert_budget(calls=2, queries=1, seconds=STEP_SECONDS)
+    telegram.tap(cadet, "3 days").assert_budget(calls=2, queries=1, seconds=STEP_SECONDS)
+    telegram.tap(cadet, "LD").assert_budget(calls=2, queries=1, seconds=STEP_SECONDS)
+    telegram.tap(cadet, "Confirm").assert_budget(calls=2, queries=2, seconds=STEP_SECONDS)
+
+    sent = _send_batch(telegram, cadet)
+    assert len(sent.sent_to(tenant.ic_group_chat_id)) == 1
+
+    assert get_user_rsi_records("OCT BEN TAN")[-1].diagnosis == "GRADE 1 SPRAIN"
+    [status] = _active_statuses()
+    assert (status.full_name, status.section) == ("BEN TAN", "LD")
+    assert status.end_date - status.start_date == timedelta(days=2)
+
+
+def test_ma_report_posts_to_cadet_chat(telegram, tenant, cadet):
+    from db.crud import get_ma_records
+
+    appointment = (now_sg() + timedelta(days=3)).strftime("%d%m%y")
+
+    _start(telegram, cadet, "Report MA")
+    telegram.tap(cadet, "BEN TAN").assert_budget(calls=2, queries=1, seconds=STEP_SECONDS)
+    for answer in ("DENTAL REVIEW", "CHANGI GENERAL HOSPITAL", appointment, "0930"):
+        telegram.text(cadet, answer).assert_budget(calls=2, queries=1, seconds=STEP_SECONDS)
+
+    confirm = telegram.tap(cadet, "Confirm").assert_budget(calls=4, queries=6, seconds=STEP_SECONDS)
+    to_cadets = confirm.sent_to(tenant.cadet_chat_id)
+    assert len(to_cadets) == 1
+    assert "DENTAL REVIEW" in to_cadets[0].text
+
+    records = get_ma_records("OCT BEN TAN")
+    assert len(records) == 1
+    assert records[0].location == "CHANGI GENERAL HOSPITAL"
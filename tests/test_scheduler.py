@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from bot.scheduler import CronJob, JobScheduler
+from db.crud import claim_scheduled_run, finish_scheduled_run, sync_scheduled_jobs
+from db.database import SessionLocal
+from db.models import ScheduledJob
+from utils.cron import CronSchedule
+from utils.datetime_utils import SG_TZ
+
+HOURLY = CronSchedule("0 * * * *")
+
+
+def _sg(*args) -> datetime:
+    return SG_TZ.localize(datetime(2026, 10, 19, *args))
+
+
+def _job(run=None, grace=timedelta(hours=2)) -> CronJob:
+    async def noop(context, due):
+        pass
+
+    return CronJob("hourly", HOURLY, run or noop, grace)
+
+
+def test_missed_firings_run_once_for_the_latest():
+    now = _sg(10, 5)
+    # Down since before 0700: 0700-1000 were missed
+    assert JobScheduler()._latest_due(_job(), _sg(7, 0), now) == _sg(10, 0)
+    # Only firings inside the grace period are candidates
+    assert JobScheduler()._latest_due(_job(grace=timedelta(minutes=90)), _sg(7, 0), now) == _sg(10, 0)
+    assert JobScheduler()._latest_due(_job(grace=timedelta(minutes=2)), _sg(7, 0), now) is None
+
+
+def test_a_firing_is_claimed_once_and_leased(tenant):
+    sync_scheduled_jobs([{"name": "hourly", "cron": HOURLY.expression, "grace_seconds": 60}])
+    now = datetime(2026, 10, 19, 9, 0)
+    lease = now + timedelta(minutes=5)
+
+    assert claim_scheduled_run("hourly", now, "a", lease, now)
+    assert not claim_scheduled_run("hourly", now, "b", lease, now)
+    # The next firing waits for the running one's lease
+    assert not claim_scheduled_run("hourly", now + timedelta(hours=1), "b", lease, now + timedelta(minutes=1))
+    # ...unless its owner died and the lease lapsed
+    later = lease + timedelta(seconds=1)
+    assert claim_scheduled_run("hourly", now + timedelta(hours=1), "b", later + timedelta(minutes=5), later)
+
+    # The dead owner finishing late does not release the new run's lease
+    finish_scheduled_run("hourly", "a", later)
+    with SessionLocal() as session:
+        assert session.get(ScheduledJob, "hourly").lease_owner == "b"
+
+
+def test_replicas_run_a_firing_once(tenant):
+    runs = []
+
+    async def record(context, due):
+        runs.append(due)
+        raise RuntimeError("chat not found")
+
+    job = _job(record)
+    this_replica, other_replica = JobScheduler(), JobScheduler()
+    other_replica._owner = "other-host:1"
+
+    async def fire_in_both():
+        await asyncio.to_thread(sync_scheduled_jobs, [{"name": job.name, "cron": HOURLY.expression, "grace_seconds": 7200}])
+        # One after the other: the tests' shared-cache SQLite fails concurrent writers
+        # rather than making them wait; the claim itself is covered above
+        await this_replica._run(None, job, _sg(9, 0))
+        await other_replica._run(None, job, _sg(9, 0))
+
+    asyncio.run(fire_in_both())
+    assert runs == [_sg(9, 0)]
+    with SessionLocal() as session:
+        row = session.get(ScheduledJob, job.name)
+        assert (row.last_due_at, row.lease_owner) == (datetime(2026, 10, 19, 9, 0), None)
+        assert row.last_error == "RuntimeError: chat not found"
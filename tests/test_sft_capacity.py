@@ -0,0 +1,83 @@
+import threading
+import time as clock
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from db.crud import create_user
+from services.db_service import SFTService
+from utils.datetime_utils import now_sg
+
+BADMINTON = ("Badminton", "Basketball court")
+
+
+def _cadets(tenant, count: int) -> list[int]:
+    return [
+        create_user(full_name=f"CADET {n}", rank="OCT", role="cadet", telegram_username=f"cadet{n}", tenant_id=tenant.id).id
+        for n in range(count)
+    ]
+
+
+def _submit(window, user_id, start="1800", end="1900"):
+    SFTService.add_submission(window.id, user_id, *BADMINTON, start, end, f"OCT CADET {user_id}")
+
+
+def test_last_places_are_not_overbooked_under_concurrency(tenant, monkeypatch):
+    monkeypatch.setattr("services.sft_occupancy.ACTIVITIES", {"Badminton @ Basketball court": {"min": 2, "max": 3}})
+    window = SFTService.open_window(now_sg().date(), time(18), time(19), tenant.id)
+    user_ids = _cadets(tenant, 8)
+    # All confirm at once, as if each tap reached a different replica
+    barrier = threading.Barrier(len(user_ids))
+
+    def confirm(user_id):
+        barrier.wait()
+        while True:
+            try:
+                _submit(window, user_id)
+                return True
+            except ValueError:
+                return False
+            except OperationalError as e:
+                # The tests' shared-cache SQLite fails a blocked writer instead of waiting; retry like a second tap
+                assert "locked" in str(e)
+                clock.sleep(0.01)
+
+    with ThreadPoolExecutor(max_workers=len(user_ids)) as executor:
+        accepted = sum(executor.map(confirm, user_ids))
+
+    stored = SFTService.get_submissions(window.id)
+    assert len(stored) == accepted == 3
+    assert SFTService.activity_counts(window.id)["Badminton @ Basketball court"] == (len(stored), len(stored))
+
+
+def test_capacity_counts_overlapping_slots_only(tenant, monkeypatch):
+    monkeypatch.setattr("services.sft_occupancy.ACTIVITIES", {"Badminton @ Basketball court": {"min": 2, "max": 1}})
+    window = SFTService.open_window(now_sg().date(), time(18), time(20), tenant.id)
+    first, second = _cadets(tenant, 2)
+
+    _submit(window, first, "1800", "1900")
+    _submit(window, second, "1900", "2000")
+    with pytest.raises(ValueError, match="full from 1830"):
+        _submit(window, second, "1830", "2000")
+    # The rejected change left the earlier submission in place
+    assert [(s.start, s.end) for s in SFTService.get_submissions(window.id) if s.user_id == second] == [("1900", "2000")]
+
+    # Moving within one's own place is not blocked by it
+    _submit(window, first, "1815", "1900")
+
+
+def test_reopened_window_counts_its_earlier_places(tenant, monkeypatch):
+    monkeypatch.setattr("services.sft_occupancy.ACTIVITIES", {"Badminton @ Basketball court": {"min": 2, "max": 1}})
+    day = now_sg().date()
+    window = SFTService.open_window(day, time(18), time(19), tenant.id)
+    first, second = _cadets(tenant, 2)
+    _submit(window, first)
+    SFTService.close_window(window.id)
+
+    reopened = SFTService.open_window(day, time(18), time(19), tenant.id)
+    assert reopened.id == window.id
+    assert SFTService.activity_counts(reopened.id)["Badminton @ Basketball court"] == (1, 1)
+    with pytest.raises(ValueError, match="full"):
+        _submit(reopened, second)
@@ -0,0 +1,17 @@
+import asyncio
+
+from telegram.ext import ApplicationBuilder
+
+from bot.startup import add_first_update_report
+
+
+def test_first_update_report_survives_concurrent_updates():
+    application = ApplicationBuilder().token("123456:TEST").updater(None).job_queue(None).build()
+    add_first_update_report(application)
+    [handler] = application.handlers[-100]
+
+    async def two_updates_at_once():
+        await asyncio.gather(handler.callback(None, None), handler.callback(None, None))
+
+    asyncio.run(two_updates_at_once())
+    assert -100 not in application.handlers
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+from db.crud import create_user_record, get_movement_history, get_user_records, record_movement
+
+
+def test_medical_records_stay_in_their_wing(tenant, other_tenant):
+    create_user_record("OCT BEN TAN", "FEVER", tenant_id=other_tenant.id)
+
+    assert get_user_records("OCT BEN TAN", tenant.id) == []
+    [record] = get_user_records("OCT BEN TAN", other_tenant.id)
+    assert record.symptoms == "FEVER"
+
+
+def test_status_report_from_a_wing_is_saved_and_sent_there(telegram, tenant, other_tenant, other_cadet):
+    telegram.command(other_cadet, "/start_status")
+    telegram.tap(other_cadet, "Report RSO")
+    telegram.tap(other_cadet, "BEN TAN")
+    telegram.text(other_cadet, "COUGH")
+    telegram.tap(other_cadet, "Confirm")
+    telegram.tap(other_cadet, "Done")
+    sent = telegram.tap(other_cadet, "Send")
+
+    assert sent.sent_to(other_tenant.ic_group_chat_id) and not sent.sent_to(tenant.ic_group_chat_id)
+    assert get_user_records("OCT BEN TAN", tenant.id) == []
+    assert len(get_user_records("OCT BEN TAN", other_tenant.id)) == 1
+
+
+def test_movement_history_is_per_wing(tenant, other_tenant):
+    record_movement(["OCT BEN TAN"], "CLASSROOM", "MEDICAL CENTRE", "0900", created_by=1, tenant_id=other_tenant.id)
+
+    assert get_movement_history("OCT BEN TAN", tenant_id=tenant.id) == []
+    assert len(get_movement_history("OCT BEN TAN", tenant_id=other_tenant.id)) == 1
+
+
+def test_admins_act_only_in_their_own_wing(telegram, tenant, other_tenant, ic_admin, other_admin):
+    refused = telegram.command(other_admin, "/start_parade_state", chat_id=tenant.ic_group_chat_id)
+    assert "not authorized" in refused.last_text
+
+    assert "Parade State started" in telegram.command(ic_admin, "/start_parade_state", chat_id=tenant.ic_group_chat_id).last_text
+    assert "Parade State started" in telegram.command(other_admin, "/start_parade_state", chat_id=other_tenant.ic_group_chat_id).last_text
+
+
+def test_sft_window_ids_from_another_wing_are_refused(tenant, other_tenant):
+    from datetime import time
+
+    from services.db_service import SFTService
+    from utils.datetime_utils import now_sg
+
+    window = SFTService.open_window(now_sg().date(), time(18, 0), time(19, 0), tenant_id=tenant.id)
+
+    assert SFTService.get_window(window.id, tenant.id) == window
+    assert SFTService.get_window(window.id, other_tenant.id) is None
+
+
+def _update(chat_id, chat_type, user_id=None, username=None):
+    user = SimpleNamespace(id=user_id, username=username) if user_id else None
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id, type=chat_type), effective_user=user)
+
+
+def test_tenant_resolution(tenant, other_tenant, other_cadet):
+    from services.tenants import tenant_for_update
+
+    # Group chats decide, whoever writes in them
+    assert tenant_for_update(_update(other_tenant.ic_group_chat_id, "supergroup", 201)) == other_tenant
+    assert tenant_for_update(_update(other_tenant.cadet_chat_id, "supergroup", 201)) == other_tenant
+    assert tenant_for_update(_update(tenant.ic_group_chat_id, "supergroup", other_cadet.id)) == tenant
+    # Private chats follow the user's wing; strangers and unknown groups get the default
+    assert tenant_for_update(_update(other_cadet.id, "private", other_cadet.id)) == other_tenant
+    assert tenant_for_update(_update(999, "private", 999, "stranger")) == tenant
+    assert tenant_for_update(_update(-100123, "supergroup", other_cadet.id)) == other_tenant
+    assert tenant_for_update(_update(-100123, "supergroup")) == tenant
+
+
+def test_edits_in_another_process_are_picked_up(tenant, other_tenant, monkeypatch):
+    from db.crud import create_user, update_tenant
+    from services.tenants import TenantRegistry, tenant_registry
+
+    monkeypatch.setattr("services.tenants.TENANT_REGISTRY_CHECK_SECONDS", 0)
+    # A second process's registry; it has seen a stranger before they were imported
+    replica = TenantRegistry()
+    assert replica.for_user(999, "stranger") == tenant
+
+    update_tenant(other_tenant.id, parade_state_topic_id=8)
+    create_user(full_name="FAY LEE", rank="OCT", role="cadet", telegram_id=999, telegram_username="stranger", tenant_id=other_tenant.id)
+    tenant_registry.invalidate()
+
+    assert replica.get(other_tenant.id).parade_state_topic_id == 8
+    assert replica.for_user(999, "stranger").id == other_tenant.id
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from telegram import Update
+
+from bot.update_processor import PerUserUpdateProcessor
+from fake_telegram import FakeUser
+
+
+def _update(user: FakeUser, update_id: int) -> Update:
+    message = {
+        "message_id": update_id,
+        "date": 0,
+        "chat": {"id": user.id, "type": "private", "first_name": user.first_name},
+        "from": user.to_dict(),
+        "text": "hi",
+    }
+    return Update.de_json({"update_id": update_id, "message": message}, None)
+
+
+def test_one_users_burst_does_not_hold_every_slot(cadet, ic_admin):
+    async def scenario():
+        processor = PerUserUpdateProcessor(2)
+        order = []
+        release = asyncio.Event()
+
+        async def slow(name):
+            order.append(f"start {name}")
+            await release.wait()
+            order.append(f"end {name}")
+
+        async def fast(name):
+            order.append(name)
+
+        burst = [
+            asyncio.create_task(processor.process_update(_update(cadet, n), slow(f"ben{n}")))
+            for n in range(3)
+        ]
+        await asyncio.sleep(0)
+        other = asyncio.create_task(processor.process_update(_update(ic_admin, 9), fast("ada")))
+        # Ada is served while Ben's first update still runs and the rest wait their turn
+        await asyncio.wait_for(other, timeout=1)
+        release.set()
+        await asyncio.gather(*burst)
+        return processor, order
+
+    processor, order = asyncio.run(scenario())
+    assert order == ["start ben0", "ada", "end ben0", "start ben1", "end ben1", "start ben2", "end ben2"]
+    assert processor._locks == {} and processor._queued == {}
+
+
+def test_unchecked_library_release_is_refused(monkeypatch):
+    monkeypatch.setattr("bot.update_processor._CHECKED_PTB_MAJORS", (99,))
+    with pytest.raises(RuntimeError, match="process_update"):
+        PerUserUpdateProcessor(2)
@@ -0,0 +1,90 @@
+"""Minimal five-field cron expressions: ``minute hour day-of-month month day-of-week``.
+
+Supports ``*``, lists (``1,15``), ranges (``1-5``), steps (``*/10``, ``8-18/2``) and
+three-letter month/day names. Day of week runs 0-6 from Sunday (7 is also Sunday).
+As in cron, when both day fields are restricted a day matching either one fires.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from utils.datetime_utils import SG_TZ
+
+_MONTHS = {name: i for i, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1
+)}
+_DAYS = {name: i for i, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+# Long enough for any valid expression to fire at least once (e.g. "0 0 29 2 *")
+_SEARCH_DAYS = 366 * 8
+
+
+def _parse_value(token: str, names: dict[str, int]) -> int:
+    token = token.lower()
+    if token in names:
+        return names[token]
+    if not token.isdigit():
+        raise ValueError(f"Invalid cron value: {token!r}")
+    return int(token)
+
+
+def _parse_field(field: str, low: int, high: int, names: dict[str, int] | None = None) -> frozenset[int]:
+    names = names or {}
+    values = set()
+    for part in field.split(","):
+        base, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if step < 1:
+            raise ValueError(f"Invalid cron step: {part!r}")
+        if base == "*":
+            start, end = low, high
+        elif "-" in base:
+            start, end = (_parse_value(v, names) for v in base.split("-", 1))
+        else:
+            start = _parse_value(base, names)
+            end = high if step > 1 else start
+        if not (low <= start <= high and low <= end <= high and start <= end):
+            raise ValueError(f"Cron value out of range {low}-{high}: {part!r}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronSchedule:
+    __slots__ = ("expression", "minutes", "hours", "days", "months", "weekdays", "_any_day", "_any_weekday")
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {len(fields)}: {expression!r}")
+        minute, hour, day, month, weekday = fields
+
+        self.expression = expression
+        self.minutes = sorted(_parse_field(minute, 0, 59))
+        self.hours = sorted(_parse_field(hour, 0, 23))
+        self.days = _parse_field(day, 1, 31)
+        self.months = _parse_field(month, 1, 12, _MONTHS)
+        self.weekdays = frozenset(d % 7 for d in _parse_field(weekday, 0, 7, _DAYS))
+        self._any_day = day == "*"
+        self._any_weekday = weekday == "*"
+
+    def _day_matches(self, day: date) -> bool:
+        if day.month not in self.months:
+            return False
+        day_ok = day.day in self.days
+        weekday_ok = (day.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, after: datetime) -> datetime:
+        """First firing time strictly after ``after``, as an aware SG datetime."""
+        start = after.astimezone(SG_TZ).replace(tzinfo=None, second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.date()
+        for _ in range(_SEARCH_DAYS):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = datetime.combine(day, time(hour, minute))
+                        if candidate >= start:
+                            return SG_TZ.localize(candidate)
+            day += timedelta(days=1)
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")